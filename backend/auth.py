@@ -6,10 +6,13 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from config import settings
-from database import get_db
+from database import get_async_db, AsyncDB
 from models import User
+from services.principal_cache import Principal, principal_cache
+from services.password_hasher import password_hasher, PasswordHasherBusy
+import time
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login", auto_error=False)
 
 
@@ -23,6 +26,27 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def _run_hasher(fn, *args):
+    try:
+        return await password_hasher.run(fn, *args)
+    except PasswordHasherBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-in attempts in progress, please retry",
+            headers={"Retry-After": "1"},
+        )
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password on the bcrypt pool, keeping the event loop free"""
+    return await _run_hasher(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash on the bcrypt pool, keeping the event loop free"""
+    return await _run_hasher(get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create JWT access token"""
     to_encode = data.copy()
@@ -30,12 +54,55 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": datetime.utcnow()})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
 
-def get_current_user(token: Optional[str] = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+def load_user(db: Session, user_id: int) -> Optional[User]:
+    """Load a user by id"""
+    return db.query(User).filter(User.id == user_id).first()
+
+
+def create_user_token(user: User) -> str:
+    """Access token for a user, carrying admin/active flags as signed claims
+    
+    The claims let requests resolve the caller without a users query for
+    AUTH_TOKEN_CLAIMS_MAX_AGE_SECONDS; after that, or after the user changes
+    in this process, the caller is checked against the database again.
+    """
+    return create_access_token(data={
+        "sub": str(user.id),  # sub must be a string for JWT compliance
+        "admin": bool(user.is_admin),
+        "active": bool(user.is_active)
+    })
+
+
+async def _resolve_principal(token: str, db: AsyncDB) -> Optional[Principal]:
+    """Principal for a token, or None if the token is invalid or its user is gone"""
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        # Convert string to int (JWT sub must be string)
+        user_id = int(payload.get("sub"))
+    except (JWTError, ValueError, TypeError):
+        return None
+    
+    # Signed claims, while the token is fresh and the user hasn't changed since
+    if "admin" in payload and "active" in payload and principal_cache.trusts_claims(user_id, payload.get("iat")):
+        return Principal(user_id, bool(payload["admin"]), bool(payload["active"]))
+    
+    principal = principal_cache.get(user_id, token)
+    if principal is None:
+        loaded_at = time.time()
+        user = await db.run_sync(load_user, user_id)
+        if user is None:
+            return None
+        principal = Principal.from_user(user)
+        principal_cache.put(token, principal, loaded_at)
+    return principal
+
+
+async def get_current_user(token: Optional[str] = Depends(oauth2_scheme), db: AsyncDB = Depends(get_async_db)) -> Principal:
     """Get current authenticated user from JWT token"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -44,23 +111,14 @@ def get_current_user(token: Optional[str] = Depends(oauth2_scheme), db: Session
     )
     if not token:
         raise credentials_exception
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id_str = payload.get("sub")
-        if user_id_str is None:
-            raise credentials_exception
-        # Convert string to int (JWT sub must be string)
-        user_id = int(user_id_str)
-    except (JWTError, ValueError, TypeError):
-        raise credentials_exception
     
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
+    principal = await _resolve_principal(token, db)
+    if principal is None or not principal.is_active:
         raise credentials_exception
-    return user
+    return principal
 
 
-def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_admin(current_user: Principal = Depends(get_current_user)) -> Principal:
     """Ensure current user is an admin"""
     if not current_user.is_admin:
         raise HTTPException(
@@ -70,19 +128,31 @@ def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
     return current_user
 
 
-def get_optional_user(token: Optional[str] = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Optional[User]:
+async def token_from_header_or_query(
+    token: Optional[str] = Depends(oauth2_scheme),
+    access_token: Optional[str] = None
+) -> Optional[str]:
+    """Bearer token, or the `access_token` query parameter for clients that
+    can't send headers (browser EventSource)"""
+    return token or access_token
+
+
+async def get_stream_admin(
+    token: Optional[str] = Depends(token_from_header_or_query),
+    db: AsyncDB = Depends(get_async_db)
+) -> Principal:
+    """get_current_admin for streaming endpoints, also accepting `?access_token=`"""
+    return await get_current_admin(await get_current_user(token, db))
+
+
+async def get_optional_user(token: Optional[str] = Depends(oauth2_scheme), db: AsyncDB = Depends(get_async_db)) -> Optional[Principal]:
     """Get current user if authenticated, otherwise return None (for public endpoints)"""
     if not token:
         return None
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id_str = payload.get("sub")
-        if user_id_str is None:
-            return None
-        # Convert string to int (JWT sub must be string)
-        user_id = int(user_id_str)
-        user = db.query(User).filter(User.id == user_id).first()
-        return user
-    except (JWTError, ValueError, TypeError, Exception):
+        principal = await _resolve_principal(token, db)
+    except Exception:
         return None
-
+    if principal is None or not principal.is_active:
+        return None
+    return principal
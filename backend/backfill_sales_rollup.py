@@ -0,0 +1,31 @@
+"""
+Rebuild the sales rollup (sales_rollups) behind /admin/sales from the orders table
+Run this once after migrating, and after editing orders directly in the database or restoring a backup
+
+Usage:
+    python backfill_sales_rollup.py [--from YYYY-MM-DD] [--to YYYY-MM-DD]
+"""
+import argparse
+from datetime import date
+from database import SessionLocal, engine, Base
+from services.sales_rollup_service import SalesRollupService
+
+# Create tables
+Base.metadata.create_all(bind=engine)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the sales rollup from completed orders")
+    parser.add_argument("--from", dest="start", type=date.fromisoformat, help="first completion day (UTC) to rebuild")
+    parser.add_argument("--to", dest="end", type=date.fromisoformat, help="last completion day (UTC) to rebuild")
+    args = parser.parse_args()
+    
+    print("Rebuilding sales rollup...")
+    db = SessionLocal()
+    try:
+        orders = SalesRollupService.backfill(db, args.start, args.end)
+        db.commit()
+        print(f"Orders counted: {orders}")
+        print("Sales rollup rebuilt!")
+    finally:
+        db.close()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Benchmark: sync (threadpool) vs. async database sessions under concurrency
+
+Runs the app in-process once per DATABASE_ASYNC mode against its own
+throwaway SQLite file, fires batches of concurrent read requests
+(plus POST /orders/ on PostgreSQL), and reports throughput, latency percentiles, and
+the worst event-loop stall seen by a probe task while the load was running.
+
+Each mode runs in a fresh subprocess because the engines are created at
+import time from settings. Pass a PostgreSQL URL as DATABASE_URL to compare
+asyncpg against psycopg2 instead.
+
+Usage:
+    python benchmarks/bench_async_db.py [concurrency] [requests]
+"""
+
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ADMIN_EMAIL", "admin@example.com")
+os.environ.setdefault("ADMIN_PASSWORD", "benchmark")
+os.environ.setdefault("PICKUP_SLOT_CAPACITY", "100000")  # room for every benchmark order
+
+CONCURRENCY = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+REQUESTS = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+SEED_ORDERS = 200
+
+
+def seed():
+    from database import Base, engine, SessionLocal
+    from models import Product
+    from schemas import OrderCreate, OrderItemCreate
+    from services.order_service import OrderService
+    
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    products = [Product(name=f"Product {i}", price=100.0 + i, is_available=True) for i in range(5)]
+    db.add_all(products)
+    db.commit()
+    product_ids = [product.id for product in products]
+    
+    order_data = OrderCreate(
+        customer_name="Benchmark Customer",
+        customer_phone="+233000000000",
+        items=[OrderItemCreate(product_id=pid, quantity=1) for pid in product_ids],
+    )
+    for _ in range(SEED_ORDERS):
+        OrderService.create_order(db, order_data)
+    db.close()
+    return product_ids
+
+
+async def probe_loop(stop: asyncio.Event, stalls: list):
+    """Measure how late a 1 ms sleep wakes up while requests are running"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        stalls.append(time.perf_counter() - start - 0.001)
+
+
+async def drive(client, method: str, path: str, body=None):
+    latencies = []
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.request(method, path, json=body)
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code < 400, response.text
+    
+    stop = asyncio.Event()
+    stalls = []
+    probe = asyncio.create_task(probe_loop(stop, stalls))
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(REQUESTS)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe
+    
+    latencies.sort()
+    return (
+        REQUESTS / elapsed,
+        statistics.median(latencies) * 1000,
+        latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        max(stalls, default=0.0) * 1000,
+    )
+
+
+def child():
+    import httpx
+    from config import settings
+    
+    product_ids = seed()
+    
+    from main import app
+    
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            order_body = {
+                "customer_name": "Benchmark Customer",
+                "customer_phone": "+233000000000",
+                "items": [{"product_id": pid, "quantity": 1} for pid in product_ids],
+            }
+            mode = "async" if settings.DATABASE_ASYNC else "sync"
+            endpoints = [
+                ("GET /orders/", "GET", "/orders/?limit=20", None),
+                ("GET /products/", "GET", "/products/", None),
+            ]
+            # SQLite fails concurrent writers with "database is locked" rather than queueing them
+            if not settings.DATABASE_URL.startswith("sqlite"):
+                endpoints.append(("POST /orders/", "POST", "/orders/", order_body))
+            for name, method, path, body in endpoints:
+                throughput, p50, p95, stall = await drive(client, method, path, body)
+                print(f"{mode:>6} {name:<14} {throughput:>8.0f} {p50:>8.1f} {p95:>8.1f} {stall:>10.1f}")
+    
+    asyncio.run(run())
+
+
+def main():
+    print(f"{CONCURRENCY} concurrent clients, {REQUESTS} requests per endpoint")
+    print(f"{'mode':>6} {'endpoint':<14} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'stall ms':>10}")
+    for mode in ("false", "true"):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, DATABASE_ASYNC=mode, BENCH_CHILD="1")
+            env.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+            subprocess.run(
+                [sys.executable, os.path.abspath(__file__), str(CONCURRENCY), str(REQUESTS)],
+                env=env,
+                check=True,
+            )
+
+
+if __name__ == "__main__":
+    if os.environ.get("BENCH_CHILD"):
+        child()
+    else:
+        main()
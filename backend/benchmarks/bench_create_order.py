@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark: database round trips per OrderService.create_order call
+
+Creates orders with a growing number of line items against a throwaway
+in-memory SQLite database and counts the SQL statements sent for each one.
+The count should stay the same no matter how many items an order has.
+
+Usage:
+    python benchmarks/bench_create_order.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ADMIN_EMAIL", "admin@example.com")
+os.environ.setdefault("ADMIN_PASSWORD", "benchmark")
+os.environ.setdefault("PICKUP_SLOT_CAPACITY", "100000")  # room for every benchmark order
+
+from sqlalchemy import create_engine, event  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+from database import Base  # noqa: E402
+from models import Product  # noqa: E402
+from schemas import OrderCreate, OrderItemCreate  # noqa: E402
+from services.order_service import OrderService  # noqa: E402
+
+ITEM_COUNTS = [1, 5, 20, 50, 100]
+RUNS_PER_SIZE = 20
+
+
+def main():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    
+    statements = {"count": 0}
+    
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements["count"] += 1
+    
+    db = Session()
+    products = [Product(name=f"Product {i}", price=100.0 + i, is_available=True) for i in range(max(ITEM_COUNTS))]
+    db.add_all(products)
+    db.commit()
+    product_ids = [product.id for product in products]
+    
+    print(f"{'items':>6} {'statements':>11} {'ms/order':>9}")
+    for item_count in ITEM_COUNTS:
+        order_data = OrderCreate(
+            customer_name="Benchmark Customer",
+            customer_phone="+233000000000",
+            items=[OrderItemCreate(product_id=pid, quantity=1) for pid in product_ids[:item_count]],
+        )
+        
+        statements["count"] = 0
+        start = time.perf_counter()
+        for _ in range(RUNS_PER_SIZE):
+            OrderService.create_order(db, order_data)
+        elapsed = time.perf_counter() - start
+        
+        print(f"{item_count:>6} {statements['count'] / RUNS_PER_SIZE:>11.1f} {elapsed / RUNS_PER_SIZE * 1000:>9.2f}")
+    
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Benchmark: fresh httpx client per call vs. the shared pooled provider clients
+
+Starts a local HTTPS stub server (self-signed certificate) that answers like a
+payment provider, then times sequential requests made the old way (a new
+AsyncClient, and so a new TCP+TLS handshake, per call) and through the shared
+clients in services/http_clients.py, which keep connections alive.
+
+Usage:
+    python benchmarks/bench_http_clients.py [requests]
+"""
+
+import asyncio
+import datetime
+import json
+import os
+import ssl
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ADMIN_EMAIL", "admin@example.com")
+os.environ.setdefault("ADMIN_PASSWORD", "benchmark")
+
+import httpx  # noqa: E402
+from cryptography import x509  # noqa: E402
+from cryptography.hazmat.primitives import hashes, serialization  # noqa: E402
+from cryptography.hazmat.primitives.asymmetric import ec  # noqa: E402
+from cryptography.x509.oid import NameOID  # noqa: E402
+from services.http_clients import HttpClients  # noqa: E402
+
+REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+
+class StubProviderHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True
+
+    def _reply(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        body = json.dumps({"status": True, "data": {"status": "success", "reference": "STUB"}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _reply
+    do_POST = _reply
+
+    def log_message(self, format, *args):
+        pass
+
+
+def write_self_signed_cert(directory):
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.utcnow()
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([x509.DNSName("localhost")]), critical=False)
+        .sign(key, hashes.SHA256())
+    )
+    cert_path = os.path.join(directory, "cert.pem")
+    key_path = os.path.join(directory, "key.pem")
+    with open(cert_path, "wb") as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as f:
+        f.write(key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        ))
+    return cert_path, key_path
+
+
+def start_stub_server(cert_path, key_path):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubProviderHandler)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert_path, key_path)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def summarize(label, timings):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label:<28} mean {statistics.mean(timings):7.2f} ms   p50 {statistics.median(timings):7.2f} ms   p95 {p95:7.2f} ms")
+    return statistics.mean(timings)
+
+
+async def fresh_client_per_call(url, cert_path):
+    timings = []
+    for _ in range(REQUESTS):
+        start = time.perf_counter()
+        async with httpx.AsyncClient(verify=cert_path) as client:
+            response = await client.post(url, json={"amount": 100}, timeout=10.0)
+            response.raise_for_status()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+async def shared_client(url, cert_path):
+    # Production pool and timeout settings, trusting the stub's certificate
+    clients = HttpClients(verify=cert_path)
+    clients.open()
+
+    timings = []
+    for _ in range(REQUESTS):
+        start = time.perf_counter()
+        response = await clients.get("paystack").post(url, json={"amount": 100})
+        response.raise_for_status()
+        timings.append((time.perf_counter() - start) * 1000)
+    await clients.aclose()
+    return timings
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as directory:
+        cert_path, key_path = write_self_signed_cert(directory)
+        server = start_stub_server(cert_path, key_path)
+        url = f"https://localhost:{server.server_address[1]}/transaction/initialize"
+
+        print(f"{REQUESTS} sequential requests to a local HTTPS stub\n")
+        fresh = summarize("fresh client per call", await fresh_client_per_call(url, cert_path))
+        shared = summarize("shared pooled client", await shared_client(url, cert_path))
+        print(f"\nsaved per call: {fresh - shared:.2f} ms ({fresh / shared:.1f}x faster)")
+
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
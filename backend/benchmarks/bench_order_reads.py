@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Benchmark: ORM vs. Core (OrderReads) read path for order lists and the export
+
+Seeds a large dataset with the load suite's seeder (--orders, default 100k)
+into DATABASE_URL (a throwaway SQLite file by default), then runs each read
+both ways and reports median latency and peak memory (tracemalloc):
+
+- orm:  db.query(Order) with selectinload(items) + joinedload(product),
+        paginate() and order_dict (the list endpoints before OrderReads);
+        the export walks orders with yield_per
+- core: services.order_reads.OrderReads, as the endpoints now use
+
+Both paths must return the same orders; the script exits non-zero otherwise.
+
+Usage:
+    python benchmarks/bench_order_reads.py [--orders 100000] [--runs 7]
+"""
+
+import argparse
+import gc
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ADMIN_EMAIL", "admin@example.com")
+os.environ.setdefault("ADMIN_PASSWORD", "benchmark")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'reads.db')}")
+
+from sqlalchemy.orm import selectinload  # noqa: E402
+from load_suite import seed  # noqa: E402
+from database import SessionLocal  # noqa: E402
+from models import Order, OrderItem, OrderStatus  # noqa: E402
+from pagination import paginate  # noqa: E402
+from services.order_reads import OrderReads  # noqa: E402
+
+OPEN_STATUSES = [OrderStatus.PENDING, OrderStatus.CONFIRMED, OrderStatus.READY]
+
+
+def order_dict(order: Order) -> dict:
+    """OrderResponse.from_orm_with_items(order).model_dump() without building or validating models"""
+    return {
+        "id": order.id,
+        "order_number": order.order_number,
+        "customer_id": order.customer_id,
+        "customer_name": order.customer_name,
+        "customer_phone": order.customer_phone,
+        "customer_email": order.customer_email,
+        "status": order.status,
+        "total_amount": float(order.total_amount),
+        "payment_status": order.payment_status,
+        "payment_method": order.payment_method,
+        "payment_reference": order.payment_reference,
+        "notes": order.notes,
+        "pickup_time": order.pickup_time,
+        "items": [
+            {
+                "id": item.id,
+                "product_id": item.product_id,
+                "product_name": item.product.name if item.product else None,
+                "quantity": item.quantity,
+                "unit_price": float(item.unit_price),
+                "customization": item.customization,
+                "subtotal": float(item.subtotal),
+            }
+            for item in order.items
+        ],
+        "created_at": order.created_at,
+        "updated_at": order.updated_at,
+        "completed_at": order.completed_at,
+    }
+
+
+def orm_page(db, limit, *conditions, descending=True):
+    query = db.query(Order).options(selectinload(Order.items).joinedload(OrderItem.product)).filter(*conditions)
+    orders, next_cursor = paginate(query, Order, None, limit, descending=descending)
+    return [order_dict(order) for order in orders], next_cursor
+
+
+def orm_export(db):
+    query = db.query(Order).options(selectinload(Order.items).joinedload(OrderItem.product))
+    return sum(1 for order in query.order_by(Order.id).yield_per(500) if order_dict(order))
+
+
+def core_export(db):
+    return sum(len(batch) for batch in OrderReads.batches(db, batch_size=500))
+
+
+def cases(customer_id):
+    """(name, orm callable, core callable); each takes a fresh session"""
+    return [
+        ("GET /orders/ (50)",
+         lambda db: orm_page(db, 50), lambda db: OrderReads.page(db, None, 50)),
+        ("GET /orders/ (200)",
+         lambda db: orm_page(db, 200), lambda db: OrderReads.page(db, None, 200)),
+        ("GET /orders/ (customer, 50)",
+         lambda db: orm_page(db, 50, Order.customer_id == customer_id),
+         lambda db: OrderReads.page(db, None, 50, Order.customer_id == customer_id)),
+        ("GET /admin/orders/pending (200)",
+         lambda db: orm_page(db, 200, Order.status.in_(OPEN_STATUSES), descending=False),
+         lambda db: OrderReads.page(db, None, 200, Order.status.in_(OPEN_STATUSES), descending=False)),
+        ("export walk (all orders)", orm_export, core_export),
+    ]
+
+
+def run(fn):
+    db = SessionLocal()
+    try:
+        return fn(db)
+    finally:
+        db.close()
+
+
+def measure(fn, runs):
+    timings = []
+    for _ in range(runs):
+        gc.collect()
+        start = time.perf_counter()
+        run(fn)
+        timings.append(time.perf_counter() - start)
+    
+    gc.collect()
+    tracemalloc.start()
+    run(fn)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--orders", type=int, default=100_000)
+    parser.add_argument("--customers", type=int, default=2_000)
+    parser.add_argument("--products", type=int, default=12)
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    
+    seconds = seed(args, random.Random(args.seed))
+    if seconds:
+        print(f"Seeded {args.orders:,} orders in {seconds:.1f}s\n")
+    
+    db = SessionLocal()
+    customer_id = db.query(Order.customer_id).filter(Order.customer_id.isnot(None)).limit(1).scalar()
+    db.close()
+    
+    print(f"{'read':<32} {'orm ms':>9} {'core ms':>9} {'speedup':>8} {'orm MiB':>8} {'core MiB':>9}")
+    for name, orm_fn, core_fn in cases(customer_id):
+        if run(orm_fn) != run(core_fn):
+            sys.exit(f"{name}: ORM and Core paths returned different orders")
+        
+        runs = 1 if name.startswith("export") else args.runs
+        orm_time, orm_peak = measure(orm_fn, runs)
+        core_time, core_peak = measure(core_fn, runs)
+        print(
+            f"{name:<32} {orm_time * 1000:>9.1f} {core_time * 1000:>9.1f} {orm_time / core_time:>7.1f}x"
+            f" {orm_peak / 2**20:>8.2f} {core_peak / 2**20:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Benchmark: reading and serializing a 5,000-order list, Pydantic path vs. the dict/orjson fast path
+
+Stores 5,000 orders (two items each) in a throwaway in-memory SQLite
+database, then times what the list endpoints run to turn them into a
+response body:
+
+- pydantic: ORM load (selectinload items + product), then
+  OrderResponse.from_orm_with_items per order, FastAPI's response_model
+  validation, jsonable_encoder and the stdlib JSONResponse (what GET
+  /orders/ did before)
+- fast:     services.order_reads.OrderReads.with_items over a Core select of
+  ORDER_COLUMNS, then ORJSONResponse (what GET /orders/ runs now)
+
+Prints CPU time (best of RUNS) and peak memory allocated (tracemalloc), and
+checks that both paths produce byte-identical JSON.
+
+Usage:
+    python benchmarks/bench_order_serialization.py [orders]
+"""
+
+import asyncio
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ADMIN_EMAIL", "admin@example.com")
+os.environ.setdefault("ADMIN_PASSWORD", "benchmark")
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+from sqlalchemy import create_engine, select  # noqa: E402
+from sqlalchemy.orm import selectinload, sessionmaker  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+from database import Base  # noqa: E402
+from models import Order, OrderItem, OrderStatus, PaymentMethod, PaymentStatus, Product  # noqa: E402
+from responses import ORJSONResponse  # noqa: E402
+from schemas import OrderResponse  # noqa: E402
+from services.order_reads import ORDER_COLUMNS, OrderReads  # noqa: E402
+
+ORDERS = 5000
+RUNS = 5
+
+RESPONSE_FIELD = create_response_field(name="Response_get_orders", type_=List[OrderResponse])
+
+
+def create_orders(count: int) -> sessionmaker:
+    """An in-memory database holding `count` orders; returns its session factory"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = Session()
+    
+    products = [Product(name=f"Product {i}", price=100.0 + i, is_available=True) for i in range(4)]
+    db.add_all(products)
+    db.flush()
+    
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for i in range(count):
+        order = Order(
+            order_number=f"CHK-20240101-{i:06d}",
+            customer_name=f"Customer {i}",
+            customer_phone="+233000000000",
+            customer_email=f"customer{i}@example.com" if i % 2 else None,
+            status=list(OrderStatus)[i % len(OrderStatus)],
+            payment_status=PaymentStatus.PENDING,
+            payment_method=PaymentMethod.PAYSTACK if i % 3 else None,
+            total_amount=0.0,
+            notes="Extra spicy" if i % 5 == 0 else None,
+            pickup_time=start + timedelta(hours=i % 48),
+            created_at=start + timedelta(seconds=i),
+        )
+        for product in products[i % 3:i % 3 + 2]:
+            order.items.append(OrderItem(product=product, quantity=2, unit_price=product.price, subtotal=product.price * 2))
+        order.total_amount = sum(item.subtotal for item in order.items)
+        db.add(order)
+    db.commit()
+    db.close()
+    return Session
+
+
+def pydantic_path(Session: sessionmaker) -> bytes:
+    db = Session()
+    try:
+        orders = db.query(Order).options(
+            selectinload(Order.items).joinedload(OrderItem.product)
+        ).order_by(Order.id).all()
+        content = [OrderResponse.from_orm_with_items(order) for order in orders]
+    finally:
+        db.close()
+    encoded = asyncio.run(serialize_response(field=RESPONSE_FIELD, response_content=content))
+    return JSONResponse(encoded).body
+
+
+def fast_path(Session: sessionmaker) -> bytes:
+    db = Session()
+    try:
+        rows = db.execute(select(*ORDER_COLUMNS).order_by(Order.id)).all()
+        content = OrderReads.with_items(db, rows)
+    finally:
+        db.close()
+    return ORJSONResponse(content).body
+
+
+def measure(fn, Session):
+    cpu = []
+    for _ in range(RUNS):
+        gc.collect()
+        start = time.process_time()
+        fn(Session)
+        cpu.append(time.process_time() - start)
+    
+    gc.collect()
+    tracemalloc.start()
+    fn(Session)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(cpu), peak
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else ORDERS
+    Session = create_orders(count)
+    
+    if pydantic_path(Session) != fast_path(Session):
+        sys.exit("Fast path output differs from the Pydantic path")
+    
+    db = Session()
+    items = db.query(OrderItem).count()
+    db.close()
+    print(f"{count} orders, {items} items; best of {RUNS} runs")
+    print(f"{'path':<10} {'cpu ms':>8} {'peak MiB':>9}")
+    results = {}
+    for name, fn in (("pydantic", pydantic_path), ("fast", fast_path)):
+        results[name] = measure(fn, Session)
+        cpu, peak = results[name]
+        print(f"{name:<10} {cpu * 1000:>8.1f} {peak / 2**20:>9.2f}")
+    
+    print(f"\nfast path: {results['pydantic'][0] / results['fast'][0]:.1f}x less CPU, "
+          f"{results['pydantic'][1] / results['fast'][1]:.1f}x lower peak memory")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Check: every endpoint stays within its query budget and sends no N+1 patterns
+
+Calls each endpoint through a TestClient against a throwaway SQLite file with
+enough orders that per-row queries would show, and counts the statements it
+sends with services.query_tracker.assert_max_queries. Exits non-zero if an
+endpoint exceeds its budget in QUERY_BUDGETS or repeats a statement shape
+QUERY_N_PLUS_ONE_THRESHOLD times.
+
+When a change legitimately needs more queries, raise the budget here in the
+same commit so the increase is reviewed.
+
+Usage:
+    python benchmarks/check_query_counts.py
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ADMIN_EMAIL", "admin@example.com")
+os.environ.setdefault("ADMIN_PASSWORD", "benchmark")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'query_counts.db')}"
+os.environ["QUERY_TRACKING_ENABLED"] = "true"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from database import SessionLocal  # noqa: E402
+from models import Order, OrderStatus, PaymentMethod, PaymentStatus, Product, User  # noqa: E402
+from auth import create_access_token, get_password_hash  # noqa: E402
+from services.query_tracker import assert_max_queries  # noqa: E402
+from main import app  # noqa: E402
+
+ORDERS = 60  # more than a page, so list endpoints would show per-row queries
+
+# Maximum statements per request, keyed by the name printed in the report
+QUERY_BUDGETS = {
+    "GET /products/": 1,  # 0 while the catalog cache is warm
+    "GET /products/{id}": 1,
+    "POST /products/": 3,
+    "PUT /products/{id}": 3,
+    "DELETE /products/{id}": 3,
+    "POST /auth/register": 3,
+    "POST /auth/login": 1,
+    "GET /auth/me": 1,
+    "POST /orders/": 7,  # 6 (including the pickup slot booking), plus reloading the catalog cache after the product edits above
+    "POST /orders/ (large)": 6,  # more birds than PICKUP_SLOT_CAPACITY: gets an empty slot to itself
+    "GET /orders/": 2,
+    "GET /orders/ (customer)": 2,
+    "GET /orders/pickup-slots": 1,  # 0 while the slot index is fresh
+    "GET /orders/{id}": 1,
+    "PUT /orders/{id}/status": 5,
+    "POST /orders/bulk-status": 6,
+    "GET /admin/dashboard": 1,
+    "GET /admin/orders/pending": 2,
+    "GET /admin/sales/today": 2,
+    "GET /admin/sales/daily": 2,
+    "GET /admin/sales": 2,
+    "GET /admin/orders/export": 2,
+    "PUT /admin/pickup-slots": 1,
+    "POST /payments/verify/{id}": 3,
+    "POST /payments/complete/{id}": 3,
+}
+
+
+def seed():
+    """An admin, a customer and the products; returns their ids"""
+    db = SessionLocal()
+    admin = User(name="Budget Admin", email="budget@example.com", phone="+233000000010",
+                 password_hash=get_password_hash("budget"), is_admin=True)
+    customer = User(name="Budget Customer", phone="+233000000011", is_admin=False)
+    products = [Product(name=f"Budget Chicken {i}", price=100.0 + i, is_available=True) for i in range(2)]
+    spare = Product(name="Budget Spare", price=50.0, is_available=True)  # never ordered, so it can be deleted
+    db.add_all([admin, customer, *products, spare])
+    db.commit()
+    ids = {
+        "admin": admin.id,
+        "customer": customer.id,
+        "products": [product.id for product in products],
+        "spare": spare.id,
+    }
+    db.close()
+    return ids
+
+
+def requests(client, ids):
+    """(name, method, url, kwargs) for every endpoint, in an order that keeps ids valid"""
+    admin = {"Authorization": f"Bearer {create_access_token({'sub': str(ids['admin'])})}"}
+    customer = {"Authorization": f"Bearer {create_access_token({'sub': str(ids['customer'])})}"}
+    order_body = {
+        "customer_name": "Budget Customer",
+        "customer_phone": "+233000000011",
+        "items": [{"product_id": product_id, "quantity": 2} for product_id in ids["products"]],
+    }
+    
+    # Orders for the list endpoints, created outside any budget
+    order_ids = [
+        client.post("/orders/", json=order_body, headers=customer).json()["id"]
+        for _ in range(ORDERS)
+    ]
+    db = SessionLocal()
+    db.query(Order).filter(Order.id == order_ids[-1]).update({
+        Order.payment_method: PaymentMethod.PAYSTACK,
+        Order.payment_reference: "budget-ref",
+        Order.payment_status: PaymentStatus.PROCESSING,
+    })
+    db.commit()
+    db.close()
+    
+    pickup_time = client.get(f"/orders/{order_ids[0]}", headers=admin).json()["pickup_time"]
+    product_body = {"name": "Budget Extra", "price": 99.0, "is_available": True}
+    large_order_body = {**order_body, "items": [{"product_id": ids["products"][0], "quantity": 30}]}
+    return [
+        ("GET /products/", "GET", "/products/", {}),
+        ("GET /products/{id}", "GET", f"/products/{ids['products'][0]}", {}),
+        ("POST /products/", "POST", "/products/", {"json": product_body, "headers": admin}),
+        ("PUT /products/{id}", "PUT", f"/products/{ids['products'][1]}", {"json": {"price": 120.0}, "headers": admin}),
+        ("POST /auth/register", "POST", "/auth/register",
+         {"json": {"name": "Budget New", "phone": "+233000000012", "password": "budget"}}),
+        ("POST /auth/login", "POST", "/auth/login", {"json": {"email": "budget@example.com", "password": "budget"}}),
+        ("GET /auth/me", "GET", "/auth/me", {"headers": admin}),
+        ("POST /orders/", "POST", "/orders/", {"json": order_body, "headers": customer}),
+        ("POST /orders/ (large)", "POST", "/orders/", {"json": large_order_body, "headers": customer}),
+        ("GET /orders/", "GET", "/orders/", {"headers": admin}),
+        ("GET /orders/ (customer)", "GET", "/orders/", {"headers": customer}),
+        ("GET /orders/pickup-slots", "GET", "/orders/pickup-slots?days=7", {}),
+        ("GET /orders/{id}", "GET", f"/orders/{order_ids[0]}", {"headers": admin}),
+        ("PUT /orders/{id}/status", "PUT", f"/orders/{order_ids[0]}/status",
+         {"json": {"status": OrderStatus.CONFIRMED.value}, "headers": admin}),
+        ("POST /orders/bulk-status", "POST", "/orders/bulk-status",
+         {"json": {"order_ids": order_ids[1:41], "status": OrderStatus.CONFIRMED.value}, "headers": admin}),
+        ("GET /admin/dashboard", "GET", "/admin/dashboard", {"headers": admin}),
+        ("GET /admin/orders/pending", "GET", "/admin/orders/pending", {"headers": admin}),
+        ("GET /admin/sales/today", "GET", "/admin/sales/today", {"headers": admin}),
+        ("GET /admin/sales/daily", "GET", "/admin/sales/daily", {"headers": admin}),
+        ("GET /admin/sales", "GET", "/admin/sales?from=2024-01-01&to=2030-12-31&granularity=month", {"headers": admin}),
+        ("GET /admin/orders/export", "GET", "/admin/orders/export", {"headers": admin}),
+        ("PUT /admin/pickup-slots", "PUT", "/admin/pickup-slots",
+         {"json": {"slot_start": pickup_time, "capacity": 40}, "headers": admin}),
+        ("POST /payments/verify/{id}", "POST", f"/payments/verify/{order_ids[-1]}", {"headers": admin}),
+        ("POST /payments/complete/{id}", "POST", f"/payments/complete/{order_ids[-2]}", {"headers": admin}),
+        ("DELETE /products/{id}", "DELETE", f"/products/{ids['spare']}", {"headers": admin}),
+    ]
+
+
+def main():
+    failures = 0
+    with TestClient(app) as client:
+        ids = seed()
+        for name, method, url, kwargs in requests(client, ids):
+            budget = QUERY_BUDGETS[name]
+            try:
+                with assert_max_queries(budget) as stats:
+                    response = client.request(method, url, **kwargs)
+                error = None if response.status_code < 400 else f"HTTP {response.status_code}: {response.text[:200]}"
+            except AssertionError as e:
+                error = str(e)
+            failures += bool(error)
+            
+            print(f"{'FAIL' if error else 'ok  '} {name:<32} {stats.count:>3} / {budget} queries")
+            if error:
+                print(f"       {error}")
+    
+    if failures:
+        print(f"\n{failures} endpoint(s) over budget or failing")
+        sys.exit(1)
+    print("\nAll endpoints within their query budgets")
+
+
+if __name__ == "__main__":
+    main()
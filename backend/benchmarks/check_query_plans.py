@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Check: hot order queries must not sequentially scan `orders` or `order_items`
+
+Runs the real query code behind the order list, kitchen board, order detail
+and sales report endpoints and the payment reconciler, captures the SQL they
+send, and prints the EXPLAIN plan for each statement. Exits non-zero if any plan scans `orders`
+or `order_items` without an index.
+
+On PostgreSQL the plans are taken with enable_seqscan = off, so a Seq Scan
+only shows up when no usable index exists, however small the table. By
+default the check runs against a throwaway SQLite file; point DATABASE_URL at
+a scratch PostgreSQL database to check the production planner (a few sample
+rows are inserted).
+
+Usage:
+    python benchmarks/check_query_plans.py
+"""
+
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ADMIN_EMAIL", "admin@example.com")
+os.environ.setdefault("ADMIN_PASSWORD", "benchmark")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'plans.db')}")
+
+from sqlalchemy import event  # noqa: E402
+from database import Base, engine, SessionLocal  # noqa: E402
+from models import Order, OrderStatus, Product, User  # noqa: E402
+from schemas import OrderCreate, OrderItemCreate  # noqa: E402
+from services.order_service import OrderService  # noqa: E402
+from services.principal_cache import Principal  # noqa: E402
+from routers.orders import _list_orders  # noqa: E402
+from routers.admin import _pending_orders, _daily_sales_stats  # noqa: E402
+from services.payment_reconciler import payment_reconciler  # noqa: E402
+
+SCANNED_TABLES = ("orders", "order_items")
+
+SEQ_SCAN = {
+    "postgresql": re.compile(r"Seq Scan on (%s)\b" % "|".join(SCANNED_TABLES)),
+    # SQLite reports index-driven scans as "SCAN orders USING INDEX ..."
+    "sqlite": re.compile(r"^SCAN (%s)\b(?!.*USING (COVERING )?INDEX)" % "|".join(SCANNED_TABLES)),
+}
+
+
+def seed(db):
+    """Make sure every code path has rows to page through"""
+    if db.query(Order.id).first():
+        return
+    
+    product = Product(name="Plan Check Chicken", price=100.0, is_available=True)
+    user = User(name="Plan Check", phone="+233000000001", is_admin=False)
+    db.add_all([product, user])
+    db.commit()
+    
+    order_data = OrderCreate(
+        customer_name="Plan Check",
+        customer_phone="+233000000001",
+        items=[OrderItemCreate(product_id=product.id, quantity=2)],
+    )
+    for _ in range(5):
+        OrderService.create_order(db, order_data, customer_id=user.id, use_catalog_cache=False)
+    order = db.query(Order).first()
+    OrderService.update_order_status(db, order.id, OrderStatus.CONFIRMED)
+    OrderService.update_order_status(db, order.id, OrderStatus.READY)
+    OrderService.update_order_status(db, order.id, OrderStatus.COMPLETED)
+
+
+def hot_queries(db):
+    """(name, callable) pairs running the endpoint query code"""
+    customer_id = db.query(Order.customer_id).filter(Order.customer_id.isnot(None)).limit(1).scalar()
+    customer = Principal(customer_id, False, True)
+    order_id = db.query(Order.id).limit(1).scalar()
+    
+    _, orders_cursor = _list_orders(db, None, None, None, 2)
+    _, pending_cursor = _pending_orders(db, None, 2)
+    
+    return [
+        ("GET /orders/", lambda: _list_orders(db, None, None, None, 50)),
+        ("GET /orders/ (page 2)", lambda: _list_orders(db, None, None, orders_cursor, 50)),
+        ("GET /orders/ (customer)", lambda: _list_orders(db, customer, None, None, 50)),
+        ("GET /orders/?status_filter", lambda: _list_orders(db, None, OrderStatus.PENDING, None, 50)),
+        ("GET /orders/{id}", lambda: OrderService.get_order_with_items(db, order_id)),
+        ("GET /admin/orders/pending", lambda: _pending_orders(db, None, 50)),
+        ("GET /admin/orders/pending (page 2)", lambda: _pending_orders(db, pending_cursor, 50)),
+        ("GET /admin/sales/today", lambda: _daily_sales_stats(db, datetime.utcnow().date())),
+        ("payment reconciler batch", lambda: payment_reconciler._load_batch(0)),
+    ]
+
+
+def capture(fn):
+    """Run fn and return the (statement, parameters) it sent"""
+    statements = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+    
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return statements
+
+
+def explain(conn, dialect: str, statement: str, parameters) -> list:
+    if dialect == "sqlite":
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+        return [row[-1] for row in rows]
+    rows = conn.exec_driver_sql("EXPLAIN " + statement, parameters).fetchall()
+    return [row[0] for row in rows]
+
+
+def main():
+    dialect = engine.dialect.name
+    if dialect not in SEQ_SCAN:
+        sys.exit(f"Unsupported database dialect: {dialect}")
+    
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    seed(db)
+    
+    captured = [(name, capture(fn)) for name, fn in hot_queries(db)]
+    db.close()
+    
+    failures = 0
+    with engine.connect() as conn:
+        if dialect == "postgresql":
+            conn.exec_driver_sql("SET enable_seqscan = off")
+        
+        for name, statements in captured:
+            for statement, parameters in statements:
+                if not re.search(r"\b(FROM|JOIN) (%s)\b" % "|".join(SCANNED_TABLES), statement):
+                    continue
+                plan = explain(conn, dialect, statement, parameters)
+                scans = [line for line in plan if SEQ_SCAN[dialect].search(line.strip())]
+                failures += bool(scans)
+                
+                print(f"{'FAIL' if scans else 'ok  '} {name}")
+                for line in plan:
+                    print(f"       {line}")
+    
+    if failures:
+        print(f"\n{failures} statement(s) scan orders/order_items sequentially")
+        sys.exit(1)
+    print("\nNo sequential scans over orders/order_items")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,526 @@
+#!/usr/bin/env python3
+"""
+Load suite: latency, throughput and queries per request for every API endpoint
+
+Seeds a configurable dataset (orders with items spread over the last 90 days,
+customers, products) into DATABASE_URL, then drives each endpoint in
+routers/ with a concurrent client. For every endpoint it reports
+p50/p95/p99 latency, throughput, error count and (in-process) SQL statements
+per request, and writes the results as JSON so runs can be compared between
+commits.
+
+By default the app runs in-process (httpx.ASGITransport) against a throwaway
+SQLite file. Point DATABASE_URL at a scratch PostgreSQL database to load it
+instead; set DATABASE_ASYNC=true to measure the async session path. With
+--url the requests go over HTTP to a running server, which must use the same
+DATABASE_URL and SECRET_KEY (queries per request are then not available).
+
+Reads run at --concurrency. On SQLite, writes run one at a time, because
+concurrent writers fail with "database is locked" rather than queueing.
+Every write request targets its own order, so the state machine never
+rejects one.
+
+Usage:
+    python benchmarks/load_suite.py [--orders 100000] [--requests 500] [--concurrency 20]
+                                    [--url http://localhost:8000] [--only orders] [--output results.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ADMIN_EMAIL", "admin@example.com")
+os.environ.setdefault("ADMIN_PASSWORD", "benchmark")
+# Room in the pickup slots for every order the suite places (bookings still go through the scheduler)
+os.environ.setdefault("PICKUP_SLOT_CAPACITY", "1000")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'load.db')}")
+
+import httpx  # noqa: E402
+from sqlalchemy import event, insert, text  # noqa: E402
+from config import settings  # noqa: E402
+from database import Base, engine, SessionLocal  # noqa: E402
+import database  # noqa: E402
+from models import Order, OrderItem, Product, User, OrderStatus, PaymentStatus, PaymentMethod  # noqa: E402
+from auth import create_user_token, get_password_hash  # noqa: E402
+from services.stats_service import StatsService  # noqa: E402
+from services.sales_rollup_service import SalesRollupService  # noqa: E402
+
+PASSWORD = "load-suite-password"
+CHUNK = 5000
+
+# Share of seeded orders in each status; the rest are completed
+STATUS_MIX = [
+    (OrderStatus.PENDING, 0.10),
+    (OrderStatus.CONFIRMED, 0.10),
+    (OrderStatus.READY, 0.05),
+    (OrderStatus.CANCELLED, 0.05),
+]
+PROCESSING_PAYMENTS = 0.01  # pending orders awaiting mobile money confirmation
+
+Request = Tuple[str, str, Optional[dict], Dict[str, str]]  # method, path, json body, headers
+
+
+class Scenario(NamedTuple):
+    name: str
+    write: bool
+    build: Callable[["Context"], List[Request]]  # called right before the scenario runs
+
+
+class Context:
+    """Seeded ids and tokens the scenarios draw their requests from"""
+    
+    def __init__(self, args, rng: random.Random):
+        self.args = args
+        self.rng = rng
+        self.admin_headers: Dict[str, str] = {}
+        self.customer_headers: Dict[str, str] = {}
+        self.admin_phone = ""
+        self.product_ids: List[int] = []
+        self.order_ids: List[int] = []
+        self.pools: Dict[str, List[int]] = {}
+    
+    def take(self, pool: str, count: int) -> List[int]:
+        """Remove and return up to `count` ids from a pool, so no order is written twice"""
+        ids = self.pools.get(pool, [])
+        taken, self.pools[pool] = ids[:count], ids[count:]
+        return taken
+
+
+def seed(args, rng: random.Random) -> float:
+    """Insert the dataset with multi-row INSERTs; returns seconds taken"""
+    start = time.perf_counter()
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if db.query(Order.id).first() is not None:
+            print("Database already has orders; reusing them", file=sys.stderr)
+            return 0.0
+        
+        products = [
+            Product(name=f"Load Chicken {i}", price=float(rng.randrange(80, 400, 5)), is_available=True, category="live")
+            for i in range(args.products)
+        ]
+        db.add_all(products)
+        db.add(User(name="Load Admin", phone="+233100000000", email="load-admin@example.com",
+                    password_hash=get_password_hash(PASSWORD), is_admin=True))
+        db.commit()
+        prices = {product.id: product.price for product in products}
+        product_ids = list(prices)
+        
+        db.execute(insert(User), [
+            {"name": f"Load Customer {i}", "phone": f"+2332{i:08d}", "is_admin": False, "is_active": True}
+            for i in range(args.customers)
+        ])
+        db.commit()
+        customer_ids = [user_id for (user_id,) in db.query(User.id).filter(User.is_admin.is_(False))]
+        
+        now = datetime.utcnow()
+        order_id = 0
+        for chunk_start in range(0, args.orders, CHUNK):
+            orders, items = [], []
+            for _ in range(min(CHUNK, args.orders - chunk_start)):
+                order_id += 1
+                created_at = now - timedelta(seconds=rng.randrange(90 * 86400))
+                
+                roll, status = rng.random(), OrderStatus.COMPLETED
+                for candidate, share in STATUS_MIX:
+                    if roll < share:
+                        status = candidate
+                        break
+                    roll -= share
+                
+                total = 0.0
+                for product_id in rng.sample(product_ids, rng.randint(1, min(4, len(product_ids)))):
+                    quantity = rng.randint(1, 5)
+                    subtotal = prices[product_id] * quantity
+                    total += subtotal
+                    items.append({
+                        "order_id": order_id, "product_id": product_id, "quantity": quantity,
+                        "unit_price": prices[product_id], "subtotal": subtotal,
+                    })
+                
+                payment_status, payment_method, payment_reference = PaymentStatus.PENDING, None, None
+                if status == OrderStatus.COMPLETED:
+                    payment_status, payment_method = PaymentStatus.COMPLETED, rng.choice([PaymentMethod.CASH, PaymentMethod.MOBILE_MONEY])
+                elif status == OrderStatus.PENDING and rng.random() < PROCESSING_PAYMENTS / 0.10:
+                    payment_status, payment_method = PaymentStatus.PROCESSING, PaymentMethod.MOBILE_MONEY
+                    payment_reference = f"MOBILE-LOAD-{order_id}"
+                
+                customer_id = rng.choice(customer_ids) if customer_ids and rng.random() < 0.6 else None
+                orders.append({
+                    "id": order_id,
+                    "order_number": f"CHK-LOAD-{order_id:08d}",
+                    "customer_id": customer_id,
+                    "customer_name": "Load Customer",
+                    "customer_phone": "+233200000000",
+                    "status": status,
+                    "total_amount": total,
+                    "payment_status": payment_status,
+                    "payment_method": payment_method,
+                    "payment_reference": payment_reference,
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                    "completed_at": (
+                        min(created_at + timedelta(minutes=rng.randint(20, 240)), now)
+                        if status == OrderStatus.COMPLETED else None
+                    ),
+                })
+            db.execute(insert(Order), orders)
+            db.execute(insert(OrderItem), items)
+            db.commit()
+            print(f"  seeded {order_id:,}/{args.orders:,} orders", file=sys.stderr, end="\r")
+        print(file=sys.stderr)
+        
+        if engine.dialect.name == "postgresql":
+            # Ids were inserted explicitly; move the sequence past them
+            db.execute(text("SELECT setval(pg_get_serial_sequence('orders', 'id'), (SELECT max(id) FROM orders))"))
+        StatsService.rebuild(db)
+        SalesRollupService.backfill(db)
+        db.commit()
+    finally:
+        db.close()
+    return time.perf_counter() - start
+
+
+def prepare(ctx: Context):
+    """Load tokens and the id pools write scenarios consume"""
+    db = SessionLocal()
+    try:
+        admin = db.query(User).filter(User.is_admin.is_(True)).order_by(User.id).first()
+        customer = db.query(User).filter(
+            User.is_admin.is_(False),
+            User.id.in_(db.query(Order.customer_id).filter(Order.customer_id.isnot(None)))
+        ).order_by(User.id).first()
+        ctx.admin_phone = admin.phone
+        ctx.admin_headers = {"Authorization": f"Bearer {create_user_token(admin)}"}
+        ctx.customer_headers = {"Authorization": f"Bearer {create_user_token(customer)}"} if customer else {}
+        
+        ctx.product_ids = [product_id for (product_id,) in db.query(Product.id).filter(Product.is_available.is_(True))]
+        ctx.order_ids = [order_id for (order_id,) in db.query(Order.id).order_by(Order.id.desc()).limit(10000)]
+        
+        unpaid_pending = [order_id for (order_id,) in db.query(Order.id).filter(
+            Order.status == OrderStatus.PENDING,
+            Order.payment_status == PaymentStatus.PENDING
+        ).order_by(Order.id)]
+        ctx.rng.shuffle(unpaid_pending)
+        third = len(unpaid_pending) // 3
+        ctx.pools["confirm"] = unpaid_pending[:third]
+        ctx.pools["pay"] = unpaid_pending[third:2 * third]
+        ctx.pools["complete_payment"] = unpaid_pending[2 * third:]
+        ctx.pools["bulk"] = [order_id for (order_id,) in db.query(Order.id).filter(
+            Order.status == OrderStatus.CONFIRMED
+        ).order_by(Order.id)]
+    finally:
+        db.close()
+
+
+def scenarios() -> List[Scenario]:
+    """One scenario per endpoint in routers/, reads first"""
+    def repeat(request: Callable[[Context, int], Request]):
+        return lambda ctx: [request(ctx, i) for i in range(ctx.args.requests)]
+    
+    def light(request: Callable[[Context, int], Request], divisor: int = 10):
+        # Expensive endpoints (bcrypt, full exports, reconciliation passes) get fewer requests
+        return lambda ctx: [request(ctx, i) for i in range(max(ctx.args.requests // divisor, 5))]
+    
+    def from_pool(pool: str, request: Callable[[Context, int], Request]):
+        return lambda ctx: [request(ctx, order_id) for order_id in ctx.take(pool, ctx.args.requests)]
+    
+    def bulk(ctx: Context) -> List[Request]:
+        requests = []
+        for _ in range(max(ctx.args.requests // 10, 1)):
+            order_ids = ctx.take("bulk", 20)
+            if order_ids:
+                requests.append(("POST", "/orders/bulk-status", {"order_ids": order_ids, "status": "ready"}, ctx.admin_headers))
+        return requests
+    
+    def created_products(ctx: Context) -> List[int]:
+        db = SessionLocal()
+        try:
+            return [product_id for (product_id,) in db.query(Product.id).filter(Product.name.like("Load Suite Product %"))]
+        finally:
+            db.close()
+    
+    def order_body(ctx: Context, i: int) -> dict:
+        return {
+            "customer_name": "Load Customer",
+            "customer_phone": "+233200000000",
+            "items": [
+                {"product_id": product_id, "quantity": ctx.rng.randint(1, 3)}
+                for product_id in ctx.rng.sample(ctx.product_ids, min(3, len(ctx.product_ids)))
+            ],
+        }
+    
+    today = datetime.utcnow().date()
+    since = (datetime.utcnow() - timedelta(days=1)).isoformat()
+    run_id = int(time.time())
+    
+    return [
+        # Reads
+        Scenario("GET /products/", False, repeat(lambda ctx, i: ("GET", "/products/", None, {}))),
+        Scenario("GET /products/{id}", False, repeat(
+            lambda ctx, i: ("GET", f"/products/{ctx.rng.choice(ctx.product_ids)}", None, {}))),
+        Scenario("GET /orders/ (admin)", False, repeat(
+            lambda ctx, i: ("GET", "/orders/?limit=50", None, ctx.admin_headers))),
+        Scenario("GET /orders/ (customer)", False, repeat(
+            lambda ctx, i: ("GET", "/orders/?limit=50", None, ctx.customer_headers))),
+        Scenario("GET /orders/?status_filter", False, repeat(
+            lambda ctx, i: ("GET", "/orders/?status_filter=ready&limit=50", None, ctx.admin_headers))),
+        Scenario("GET /orders/{id}", False, repeat(
+            lambda ctx, i: ("GET", f"/orders/{ctx.rng.choice(ctx.order_ids)}", None, ctx.admin_headers))),
+        Scenario("GET /orders/pickup-slots", False, repeat(
+            lambda ctx, i: ("GET", f"/orders/pickup-slots?days={1 + i % 14}", None, {}))),
+        Scenario("GET /auth/me", False, repeat(lambda ctx, i: ("GET", "/auth/me", None, ctx.admin_headers))),
+        Scenario("GET /admin/dashboard", False, repeat(
+            lambda ctx, i: ("GET", "/admin/dashboard", None, ctx.admin_headers))),
+        Scenario("GET /admin/orders/pending", False, repeat(
+            lambda ctx, i: ("GET", "/admin/orders/pending?limit=50", None, ctx.admin_headers))),
+        Scenario("GET /admin/sales/today", False, repeat(
+            lambda ctx, i: ("GET", "/admin/sales/today", None, ctx.admin_headers))),
+        Scenario("GET /admin/sales/daily", False, repeat(
+            lambda ctx, i: ("GET", f"/admin/sales/daily?date={today - timedelta(days=i % 30)}", None, ctx.admin_headers))),
+        Scenario("GET /admin/sales", False, repeat(lambda ctx, i: (
+            "GET", f"/admin/sales?from={today - timedelta(days=90)}&to={today}&granularity={('day', 'week', 'month')[i % 3]}",
+            None, ctx.admin_headers))),
+        Scenario("GET /admin/orders/export", False, light(
+            lambda ctx, i: ("GET", f"/admin/orders/export?format=ndjson&created_from={since}", None, ctx.admin_headers))),
+        Scenario("GET /admin/password-hashing", False, repeat(
+            lambda ctx, i: ("GET", "/admin/password-hashing", None, ctx.admin_headers))),
+        # Writes
+        Scenario("POST /auth/login", True, light(
+            lambda ctx, i: ("POST", "/auth/login", {"phone": ctx.admin_phone, "password": PASSWORD}, {}))),
+        Scenario("POST /auth/register", True, repeat(
+            lambda ctx, i: ("POST", "/auth/register", {"name": "Load Register", "phone": f"+2339{run_id % 10**6:06d}{i:05d}"}, {}))),
+        Scenario("POST /orders/", True, repeat(lambda ctx, i: ("POST", "/orders/", order_body(ctx, i), {}))),
+        Scenario("PUT /orders/{id}/status", True, from_pool("confirm", lambda ctx, order_id: (
+            "PUT", f"/orders/{order_id}/status", {"status": "confirmed"}, ctx.admin_headers))),
+        Scenario("POST /orders/bulk-status", True, bulk),
+        Scenario("PUT /admin/pickup-slots", True, light(lambda ctx, i: ("PUT", "/admin/pickup-slots", {
+            "slot_start": f"{today + timedelta(days=2 + i % 10)}T{8 + i % 10:02d}:00:00", "capacity": 1000 + i}, ctx.admin_headers))),
+        Scenario("POST /orders/{id}/payment", True, from_pool("pay", lambda ctx, order_id: (
+            "POST", f"/orders/{order_id}/payment?payment_method=cash", None, {}))),
+        Scenario("POST /payments/verify/{id}", True, lambda ctx: [
+            # Orders given a cash payment reference by the previous scenario
+            ("POST", f"/payments/verify/{order_id}", None, ctx.admin_headers)
+            for order_id in ctx.pools.get("verify", [])
+        ]),
+        Scenario("POST /payments/complete/{id}", True, from_pool("complete_payment", lambda ctx, order_id: (
+            "POST", f"/payments/complete/{order_id}", None, ctx.admin_headers))),
+        Scenario("POST /payments/reconcile", True, light(
+            lambda ctx, i: ("POST", "/payments/reconcile", None, ctx.admin_headers), divisor=100)),
+        Scenario("POST /products/", True, light(lambda ctx, i: ("POST", "/products/", {
+            "name": f"Load Suite Product {i}", "price": 150.0, "category": "live"}, ctx.admin_headers))),
+        Scenario("PUT /products/{id}", True, lambda ctx: [
+            ("PUT", f"/products/{product_id}", {"price": 175.0}, ctx.admin_headers)
+            for product_id in created_products(ctx)
+        ]),
+        Scenario("DELETE /products/{id}", True, lambda ctx: [
+            ("DELETE", f"/products/{product_id}", None, ctx.admin_headers)
+            for product_id in created_products(ctx)
+        ]),
+    ]
+
+
+SKIPPED = [
+    {"endpoint": "GET /admin/orders/stream", "reason": "long-lived Server-Sent Events stream, not request/response"},
+]
+
+
+class QueryCounter:
+    """Counts SQL statements sent through the app's engines (in-process only)"""
+    
+    def __init__(self):
+        self.count = 0
+        self.engines = [engine]
+        if database.async_engine is not None:
+            self.engines.append(database.async_engine.sync_engine)
+        for target in self.engines:
+            event.listen(target, "before_cursor_execute", self._record)
+    
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    requests: List[Request],
+    concurrency: int,
+    counter: Optional[QueryCounter]
+) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    status_codes: Dict[str, int] = {}
+    
+    async def one(method: str, path: str, body: Optional[dict], headers: Dict[str, str]):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.request(method, path, json=body, headers=headers)
+            await response.aread()
+            latencies.append(time.perf_counter() - start)
+            code = str(response.status_code)
+            status_codes[code] = status_codes.get(code, 0) + 1
+    
+    queries_before = counter.count if counter else 0
+    start = time.perf_counter()
+    await asyncio.gather(*(one(*request) for request in requests))
+    elapsed = time.perf_counter() - start
+    
+    latencies.sort()
+    ms = [latency * 1000 for latency in latencies]
+    return {
+        "endpoint": scenario.name,
+        "requests": len(requests),
+        "concurrency": concurrency,
+        "errors": sum(count for code, count in status_codes.items() if int(code) >= 400),
+        "status_codes": status_codes,
+        "throughput_rps": round(len(requests) / elapsed, 1) if elapsed else None,
+        "latency_ms": {
+            "p50": round(percentile(ms, 50), 2),
+            "p95": round(percentile(ms, 95), 2),
+            "p99": round(percentile(ms, 99), 2),
+            "mean": round(sum(ms) / len(ms), 2) if ms else 0.0,
+            "max": round(ms[-1], 2) if ms else 0.0,
+        },
+        "queries_per_request": (
+            round((counter.count - queries_before) / len(requests), 2) if counter and requests else None
+        ),
+    }
+
+
+async def drive(args, ctx: Context) -> List[dict]:
+    if args.url:
+        client = httpx.AsyncClient(
+            base_url=args.url,
+            timeout=60.0,
+            limits=httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        )
+        counter = None
+    else:
+        # The lifespan isn't run, so background workers add no queries of their own
+        from main import app
+        from services.payment_reconciler import payment_reconciler
+        from stub_payments import StubPaymentProvider
+        # Reconciliation passes must not reach real payment providers
+        payment_reconciler.verifier = StubPaymentProvider()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://load", timeout=60.0)
+        counter = QueryCounter()
+    
+    # SQLite fails concurrent writers with "database is locked" rather than queueing them
+    write_concurrency = 1 if engine.dialect.name == "sqlite" else args.concurrency
+    
+    results = []
+    async with client:
+        for scenario in scenarios():
+            if args.only and not any(term in scenario.name for term in args.only):
+                continue
+            requests = scenario.build(ctx)
+            if not requests:
+                print(f"{scenario.name:<32} skipped (no seeded rows to use)", file=sys.stderr)
+                continue
+            concurrency = write_concurrency if scenario.write else args.concurrency
+            result = await run_scenario(client, scenario, requests, concurrency, counter)
+            results.append(result)
+            
+            if scenario.name == "POST /orders/{id}/payment":
+                ctx.pools["verify"] = [int(path.split("/")[2]) for _, path, _, _ in requests]
+            
+            latency = result["latency_ms"]
+            queries = result["queries_per_request"]
+            print(
+                f"{scenario.name:<32} {result['requests']:>6} {result['throughput_rps'] or 0:>9.1f} "
+                f"{latency['p50']:>8.1f} {latency['p95']:>8.1f} {latency['p99']:>8.1f} "
+                f"{'-' if queries is None else queries:>8} {result['errors']:>6}",
+                file=sys.stderr
+            )
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load every API endpoint and report latency as JSON")
+    parser.add_argument("--orders", type=int, default=100_000, help="orders to seed (default 100000)")
+    parser.add_argument("--customers", type=int, default=1000, help="customer accounts to seed")
+    parser.add_argument("--products", type=int, default=20, help="products to seed")
+    parser.add_argument("--requests", type=int, default=500, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=20, help="concurrent requests for reads")
+    parser.add_argument("--url", help="drive a running server over HTTP instead of in-process")
+    parser.add_argument("--only", nargs="*", help="only endpoints whose name contains one of these")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for the dataset and requests")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+    
+    rng = random.Random(args.seed)
+    print(f"Seeding {args.orders:,} orders into {engine.url.render_as_string(hide_password=True)}", file=sys.stderr)
+    seed_seconds = seed(args, rng)
+    
+    ctx = Context(args, rng)
+    prepare(ctx)
+    
+    print(
+        f"{'endpoint':<32} {'reqs':>6} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'errors':>6}",
+        file=sys.stderr
+    )
+    results = asyncio.run(drive(args, ctx))
+    
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "mode": "http" if args.url else "in-process",
+            "url": args.url,
+            "database": engine.dialect.name,
+            "database_async": settings.DATABASE_ASYNC,
+            "python": platform.python_version(),
+            "orders": args.orders,
+            "requests_per_endpoint": args.requests,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "seed_seconds": round(seed_seconds, 1),
+        },
+        "endpoints": results,
+        "skipped": SKIPPED,
+    }
+    
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+        print(f"Wrote {args.output}", file=sys.stderr)
+    else:
+        print(output)
+    
+    if any(result["errors"] for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Stress test: order numbers stay unique across processes and restarts
+
+Starts several processes that each generate a large batch of order numbers
+through OrderNumberGenerator, then a second wave that takes over the same
+worker slots (simulating restarts while the first wave had run ahead of the
+clock). All numbers are checked for format, per-process ordering and global
+uniqueness. Exits non-zero on any duplicate.
+
+Usage:
+    python benchmarks/stress_order_numbers.py [processes] [numbers_per_process]
+"""
+
+import multiprocessing
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ADMIN_EMAIL", "admin@example.com")
+os.environ.setdefault("ADMIN_PASSWORD", "benchmark")
+
+from services.order_numbers import OrderNumberGenerator  # noqa: E402
+
+PROCESSES = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+PER_PROCESS = int(sys.argv[2]) if len(sys.argv) > 2 else 500_000
+WAVES = 2
+
+ORDER_NUMBER = re.compile(r"^CHK-\d{8}-[0-9A-Z]{6}$")
+
+
+def generate(lock_dir: str, count: int, out_path: str, start: multiprocessing.Barrier):
+    generator = OrderNumberGenerator(lock_dir=lock_dir)
+    start.wait()
+    numbers = [generator.next() for _ in range(count)]
+    with open(out_path, "w") as f:
+        f.write("\n".join(numbers))
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        lock_dir = os.path.join(tmp, "locks")
+        outputs = []
+        start_time = time.perf_counter()
+        
+        for wave in range(WAVES):
+            barrier = multiprocessing.Barrier(PROCESSES)
+            workers = []
+            for i in range(PROCESSES):
+                out_path = os.path.join(tmp, f"wave{wave}-proc{i}.txt")
+                outputs.append(out_path)
+                workers.append(multiprocessing.Process(
+                    target=generate, args=(lock_dir, PER_PROCESS, out_path, barrier)
+                ))
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+                if worker.exitcode != 0:
+                    sys.exit(f"Generator process failed with exit code {worker.exitcode}")
+        
+        elapsed = time.perf_counter() - start_time
+        
+        seen = set()
+        total = 0
+        malformed = 0
+        unordered = 0
+        for path in outputs:
+            with open(path) as f:
+                numbers = f.read().split("\n")
+            total += len(numbers)
+            malformed += sum(1 for number in numbers if not ORDER_NUMBER.match(number))
+            # Sorts by (date, suffix); within one process that's issue order
+            unordered += sum(1 for a, b in zip(numbers, numbers[1:]) if a >= b)
+            seen.update(numbers)
+    
+    duplicates = total - len(seen)
+    print(f"{total:,} numbers from {PROCESSES} processes x {WAVES} waves in {elapsed:.1f}s")
+    print(f"duplicates: {duplicates}  malformed: {malformed}  out of order: {unordered}")
+    if duplicates or malformed or unordered:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Stub payment provider for benchmarks and local reconciler runs
+
+Stands in for PaymentService as the PaymentReconciler's verifier, so
+reconciliation passes never reach a real payment provider:
+
+    from stub_payments import StubPaymentProvider
+    payment_reconciler.verifier = StubPaymentProvider(delay=0.05)
+"""
+
+import asyncio
+import os
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import PaymentMethod  # noqa: E402
+
+
+class StubPaymentProvider:
+    """Local stand-in for PaymentService.verify_payment
+    
+    Payments verify as `verified` unless listed in `outcomes` (reference ->
+    verified). `delay` simulates provider latency; references in `errors`
+    raise instead. Every call is recorded in `calls`, and `max_in_flight`
+    is the highest number of verifications seen running at once. It has no
+    VERIFIED_METHODS, so the reconciler checks every payment method with it.
+    """
+    
+    def __init__(
+        self,
+        verified: bool = True,
+        outcomes: Optional[Dict[str, bool]] = None,
+        errors: Iterable[str] = (),
+        delay: float = 0.0
+    ):
+        self.verified = verified
+        self.outcomes = outcomes or {}
+        self.errors = set(errors)
+        self.delay = delay
+        self.calls: List[Tuple[float, str, PaymentMethod]] = []  # (monotonic time, reference, method)
+        self.in_flight = 0
+        self.max_in_flight = 0
+    
+    async def verify_payment(self, payment_reference: str, payment_method: PaymentMethod) -> Dict:
+        self.calls.append((time.monotonic(), payment_reference, payment_method))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            if payment_reference in self.errors:
+                raise RuntimeError(f"Stub provider error for {payment_reference}")
+            verified = self.outcomes.get(payment_reference, self.verified)
+            return {"status": "completed" if verified else "failed", "verified": verified}
+        finally:
+            self.in_flight -= 1
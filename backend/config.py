@@ -1,16 +1,33 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional
 
 
 class Settings(BaseSettings):
     # Database (defaults to SQLite for development)
     DATABASE_URL: str = "sqlite:///./chickorder.db"
+    # Serve requests through asyncpg/aiosqlite instead of the sync driver
+    DATABASE_ASYNC: bool = False
     
     # JWT
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
+    # Password hashing: bcrypt work factor (log2 rounds; existing hashes keep
+    # verifying after a change) and the thread pool it runs in
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_QUEUE: int = 32  # calls allowed to wait for a worker before 503s
+    
+    # Resolve callers from signed admin/active token claims without a users query.
+    # Claims can't see changes made in another worker process or directly in the
+    # database, so they are only trusted this long after the token was issued
+    AUTH_TRUST_TOKEN_CLAIMS: bool = True
+    AUTH_TOKEN_CLAIMS_MAX_AGE_SECONDS: float = 60.0
+    # Callers resolved from the database are cached for this long (per user id + token)
+    AUTH_PRINCIPAL_CACHE_TTL_SECONDS: float = 30.0
+    AUTH_PRINCIPAL_CACHE_SIZE: int = 1024
+    
     # Admin
     ADMIN_EMAIL: str
     ADMIN_PASSWORD: str
@@ -23,6 +40,16 @@ class Settings(BaseSettings):
     PAYSTACK_SECRET_KEY: Optional[str] = None
     PAYSTACK_PUBLIC_KEY: Optional[str] = None
     
+    # Outbound HTTP (shared clients for payment and WhatsApp providers)
+    HUBTEL_TIMEOUT_SECONDS: float = 10.0
+    PAYSTACK_TIMEOUT_SECONDS: float = 10.0
+    WHATSAPP_TIMEOUT_SECONDS: float = 10.0
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    HTTP_POOL_MAX_CONNECTIONS: int = 20
+    HTTP_POOL_MAX_KEEPALIVE: int = 10
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    HTTP2_ENABLED: bool = False  # requires the optional 'h2' package
+    
     # Notifications
     TWILIO_ACCOUNT_SID: Optional[str] = None
     TWILIO_AUTH_TOKEN: Optional[str] = None
@@ -31,6 +58,75 @@ class Settings(BaseSettings):
     WHATSAPP_BUSINESS_ID: Optional[str] = None
     WHATSAPP_ACCESS_TOKEN: Optional[str] = None
     
+    # Notification outbox worker
+    # NOTIFICATION_PROVIDER: "default" sends via Twilio/WhatsApp (or logs when
+    # unconfigured); "fake" records messages in memory for local testing
+    NOTIFICATION_PROVIDER: str = "default"
+    NOTIFICATION_WORKERS: int = 4
+    NOTIFICATION_MAX_ATTEMPTS: int = 5
+    NOTIFICATION_RETRY_BACKOFF_SECONDS: float = 5.0  # doubles after each failed attempt
+    NOTIFICATION_POLL_INTERVAL_SECONDS: float = 2.0
+    NOTIFICATION_DRAIN_TIMEOUT_SECONDS: float = 10.0
+    
+    # Payment reconciler: re-verifies orders stuck in payment PROCESSING in the
+    # background. Off by default because Hubtel/mobile money verification in
+    # PaymentService is still a placeholder that always reports success; until
+    # it is implemented those orders are skipped (background and on demand),
+    # so for now the reconciler settles nothing
+    PAYMENT_RECONCILE_ENABLED: bool = False
+    PAYMENT_RECONCILE_INTERVAL_SECONDS: float = 60.0
+    PAYMENT_RECONCILE_MIN_AGE_SECONDS: float = 120.0  # leave time to approve the payment prompt first
+    PAYMENT_RECONCILE_MAX_AGE_HOURS: float = 24.0  # still unverified after this: payment FAILED
+    PAYMENT_RECONCILE_CONCURRENCY: int = 8
+    PAYMENT_RECONCILE_RATE_LIMITS: Dict[str, float] = {"paystack": 10.0, "hubtel": 5.0}  # verify calls/second per provider
+    PAYMENT_RECONCILE_DEFAULT_RATE_LIMIT: float = 5.0  # for payment methods not listed above
+    
+    # Order numbers: worker slots are claimed automatically per host via lock
+    # files in ORDER_NUMBER_LOCK_DIR (default: system temp dir). When running
+    # on several hosts, give every process its own ORDER_NUMBER_WORKER_ID (0-63).
+    ORDER_NUMBER_WORKER_ID: Optional[int] = None
+    ORDER_NUMBER_LOCK_DIR: Optional[str] = None
+    
+    # Idempotency-Key support on POST /orders/ and POST /orders/{id}/payment
+    IDEMPOTENCY_KEY_TTL_HOURS: int = 24  # how long a key replays its response
+    IDEMPOTENCY_LOCK_TIMEOUT_SECONDS: float = 30.0  # lease on an in-flight key; duplicates wait up to this long
+    
+    # Live order feed (SSE) for the kitchen board
+    ORDER_FEED_BUFFER_SIZE: int = 1000  # recent events kept for Last-Event-ID resume
+    ORDER_FEED_KEEPALIVE_SECONDS: float = 15.0
+    ORDER_FEED_MAX_STREAM_SECONDS: float = 300.0  # clients reconnect and resume after this
+    
+    # Product catalog cache: how long another worker process may serve a
+    # catalog that was changed elsewhere (this process invalidates on write)
+    CATALOG_CACHE_TTL_SECONDS: float = 60.0
+    
+    # Metrics: request/pool metrics served in Prometheus text format at /metrics.
+    # If METRICS_TOKEN is set, scrapers must send it as a Bearer token; with
+    # ENVIRONMENT=production the endpoint is off (404) until a token is set.
+    METRICS_ENABLED: bool = True
+    METRICS_TOKEN: Optional[str] = None
+    
+    # Query tracking: count statements and DB time per request. With DEBUG on
+    # they're sent as X-Query-* response headers and statements repeated
+    # QUERY_N_PLUS_ONE_THRESHOLD times in one request are logged as likely N+1s.
+    QUERY_TRACKING_ENABLED: bool = True
+    QUERY_N_PLUS_ONE_THRESHOLD: int = 5
+    
+    # Pickup slots: orders are booked into PICKUP_SLOT_MINUTES-long slots from
+    # PICKUP_OPENING_HOUR to PICKUP_CLOSING_HOUR (UTC, which is Ghana time). A slot
+    # takes PICKUP_SLOT_CAPACITY birds (total item quantity) unless an admin has
+    # set its own capacity (0 closes it); larger orders need an empty slot to
+    # themselves. Bookable slots start at least PICKUP_LEAD_MINUTES from
+    # now and within PICKUP_BOOKING_DAYS days. Each worker's in-memory slot index
+    # picks up other workers' bookings after PICKUP_SLOT_INDEX_TTL_SECONDS.
+    PICKUP_SLOT_MINUTES: int = 60
+    PICKUP_OPENING_HOUR: int = 8
+    PICKUP_CLOSING_HOUR: int = 18
+    PICKUP_SLOT_CAPACITY: int = 20
+    PICKUP_LEAD_MINUTES: int = 60  # time to kill and dress the birds
+    PICKUP_BOOKING_DAYS: int = 14
+    PICKUP_SLOT_INDEX_TTL_SECONDS: float = 30.0
+    
     # App Settings
     ENVIRONMENT: str = "development"
     DEBUG: bool = True
@@ -1,5 +1,9 @@
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import sessionmaker, declarative_base, Session
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from starlette.concurrency import run_in_threadpool
+from typing import Callable, TypeVar, Union
 from config import settings
 
 # Use SQLite-specific settings if using SQLite
@@ -39,3 +43,94 @@ def get_db():
     finally:
         db.close()
 
+
+def upsert_insert(db: Session):
+    """The dialect's insert() construct, which supports ON CONFLICT DO UPDATE (PostgreSQL and SQLite)"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert
+    if dialect == "sqlite":
+        return sqlite.insert
+    raise RuntimeError(f"Upserts are not implemented for {dialect}")
+
+
+# --- Async path (DATABASE_ASYNC=True) ---
+# Same database through asyncpg (PostgreSQL) or aiosqlite (SQLite), so queries
+# wait on the event loop instead of blocking it.
+
+def async_database_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto its async driver"""
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if url.startswith("postgresql+psycopg2:"):
+        return url.replace("postgresql+psycopg2:", "postgresql+asyncpg:", 1)
+    if url.startswith("postgresql:"):
+        return url.replace("postgresql:", "postgresql+asyncpg:", 1)
+    if url.startswith("postgres:"):
+        return url.replace("postgres:", "postgresql+asyncpg:", 1)
+    return url
+
+
+async_engine = None
+AsyncSessionLocal = None
+
+if settings.DATABASE_ASYNC:
+    if settings.DATABASE_URL.startswith("sqlite"):
+        async_engine = create_async_engine(async_database_url(settings.DATABASE_URL))
+    else:
+        # Same pool settings as the sync engine; asyncpg takes `ssl` instead of `sslmode`
+        async_engine = create_async_engine(
+            async_database_url(settings.DATABASE_URL),
+            connect_args={"ssl": "require"},
+            pool_pre_ping=True,
+            pool_recycle=300,
+            pool_size=5,
+            max_overflow=10,
+            pool_timeout=30,
+        )
+    
+    # expire_on_commit=False: attributes can't lazy-load outside run_sync
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False
+    )
+
+
+T = TypeVar("T")
+
+
+class ThreadedSession:
+    """Sync-mode counterpart of AsyncSession.run_sync.
+    
+    Runs each unit of session work in the threadpool so sync drivers don't
+    block the event loop either.
+    """
+    
+    def __init__(self, session: Session):
+        self.sync_session = session
+    
+    async def run_sync(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+    
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
+
+# Either session type; call `await db.run_sync(fn, *args)` and fn receives a sync Session
+AsyncDB = Union[AsyncSession, ThreadedSession]
+
+
+async def get_async_db():
+    """Dependency for a database session that doesn't block the event loop
+    
+    Yields an AsyncSession when DATABASE_ASYNC is enabled, otherwise a
+    ThreadedSession over the sync engine. Query code is written once against
+    the sync Session API and executed with `await db.run_sync(fn, *args)`.
+    """
+    if AsyncSessionLocal is not None:
+        db = AsyncSessionLocal()
+    else:
+        db = ThreadedSession(SessionLocal())
+    try:
+        yield db
+    finally:
+        await db.close()
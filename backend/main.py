@@ -1,8 +1,24 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from database import engine, Base
+from typing import Optional
+from database import engine, async_engine, Base
 from routers import auth, products, orders, admin, payments
 from config import settings
+from pagination import NEXT_CURSOR_HEADER
+from services.notification_worker import notification_worker
+from services.http_clients import http_clients
+from services.password_hasher import password_hasher
+from services.order_feed import order_feed
+from services.payment_reconciler import payment_reconciler
+from services.pickup_slots import pickup_slots
+from services.idempotency import REPLAYED_HEADER
+from services.metrics import metrics, MetricsMiddleware
+from services.query_tracker import (
+    query_tracker, QueryTrackingMiddleware, QUERY_COUNT_HEADER, QUERY_TIME_HEADER, N_PLUS_ONE_HEADER
+)
+import asyncio
+import hmac
 import logging
 
 logger = logging.getLogger(__name__)
@@ -14,10 +30,33 @@ try:
 except Exception as e:
     logger.warning(f"Could not create database tables: {e}. Continuing anyway...")
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared resources and start background workers; drain and close them on shutdown"""
+    http_clients.open()
+    order_feed.start()
+    try:
+        await asyncio.to_thread(pickup_slots.rebuild)
+    except Exception as e:
+        # Loaded on first use instead
+        logger.warning(f"Could not load the pickup slot index: {e}")
+    await notification_worker.start()
+    if settings.PAYMENT_RECONCILE_ENABLED:
+        await payment_reconciler.start()
+    yield
+    order_feed.close()
+    await payment_reconciler.stop()
+    await notification_worker.stop(drain=True)
+    await http_clients.aclose()
+    password_hasher.close()
+
+
 app = FastAPI(
     title="ChickOrder API",
     description="Web-based ordering and preparation management system for chicken seller",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -34,8 +73,24 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, REPLAYED_HEADER, QUERY_COUNT_HEADER, QUERY_TIME_HEADER, N_PLUS_ONE_HEADER],
 )
 
+# Per-request query counts and N+1 detection
+if settings.QUERY_TRACKING_ENABLED:
+    query_tracker.instrument_engine(engine)
+    if async_engine is not None:
+        query_tracker.instrument_engine(async_engine.sync_engine)
+    app.add_middleware(QueryTrackingMiddleware)
+
+# Request and connection-pool metrics, served at /metrics
+if settings.METRICS_ENABLED:
+    metrics.instrument_engine(engine, "sync")
+    if async_engine is not None:
+        metrics.instrument_engine(async_engine.sync_engine, "async")
+    metrics.add_collector(password_hasher.samples)
+    app.add_middleware(MetricsMiddleware, registry=metrics)
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(products.router)
@@ -60,6 +115,19 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint(authorization: Optional[str] = Header(None)):
+    """Prometheus scrape endpoint (this process only)"""
+    # In production the endpoint stays off until a token is configured
+    if not settings.METRICS_ENABLED or (settings.ENVIRONMENT == "production" and not settings.METRICS_TOKEN):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if settings.METRICS_TOKEN and not hmac.compare_digest(
+        authorization or "", f"Bearer {settings.METRICS_TOKEN}"
+    ):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
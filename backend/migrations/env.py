@@ -2,8 +2,9 @@ import os
 import sys
 from logging.config import fileConfig
 
-from sqlalchemy import engine_from_config, pool
+from sqlalchemy import engine_from_config, inspect, pool
 from alembic import context
+from alembic.script import ScriptDirectory
 
 # Add the backend directory to sys.path so models can be imported
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -50,6 +51,23 @@ def run_migrations_offline() -> None:
         context.run_migrations()
 
 
+def stamp_create_all_schema(connection) -> None:
+    """Record the revision of a database whose tables init_db.py created.
+
+    Deploys used to run only init_db.py (Base.metadata.create_all), so
+    existing databases have the tables but no alembic_version row, and
+    upgrading them would start by re-creating every table. Without the
+    outbox's notification columns the tables are the initial schema (0001);
+    with them, they were created from the current models (head).
+    """
+    tables = inspect(connection).get_table_names()
+    if "alembic_version" in tables or "users" not in tables:
+        return
+    columns = {column["name"] for column in inspect(connection).get_columns("notifications")}
+    revision = "head" if "attempts" in columns else "0001"
+    context.get_context().stamp(ScriptDirectory.from_config(config), revision)
+
+
 def run_migrations_online() -> None:
     """Run migrations in 'online' mode.
 
@@ -66,6 +84,7 @@ def run_migrations_online() -> None:
         context.configure(connection=connection, target_metadata=target_metadata)
 
         with context.begin_transaction():
+            stamp_create_all_schema(connection)
             context.run_migrations()
 
 
@@ -9,6 +9,7 @@ from typing import Sequence, Union
 
 from alembic import op
 import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
 
 # revision identifiers, used by Alembic.
 revision: str = "0001"
@@ -34,6 +35,8 @@ def upgrade() -> None:
     order_status.create(op.get_bind(), checkfirst=True)
     payment_status.create(op.get_bind(), checkfirst=True)
     payment_method.create(op.get_bind(), checkfirst=True)
+    # The columns below refer to these types with create_type=False, so
+    # create_table doesn't try to create them a second time
 
     # --- users ---
     op.create_table(
@@ -89,10 +92,10 @@ def upgrade() -> None:
         sa.Column("customer_name", sa.String(), nullable=False),
         sa.Column("customer_phone", sa.String(), nullable=False),
         sa.Column("customer_email", sa.String(), nullable=True),
-        sa.Column("status", sa.Enum("pending", "confirmed", "ready", "completed", "cancelled", name="orderstatus"), nullable=False),
+        sa.Column("status", postgresql.ENUM(name="orderstatus", create_type=False), nullable=False),
         sa.Column("total_amount", sa.Float(), nullable=False),
-        sa.Column("payment_status", sa.Enum("pending", "processing", "completed", "failed", "refunded", name="paymentstatus"), nullable=False),
-        sa.Column("payment_method", sa.Enum("cash", "mobile_money", "card", "hubtel", "paystack", name="paymentmethod"), nullable=True),
+        sa.Column("payment_status", postgresql.ENUM(name="paymentstatus", create_type=False), nullable=False),
+        sa.Column("payment_method", postgresql.ENUM(name="paymentmethod", create_type=False), nullable=True),
         sa.Column("payment_reference", sa.String(), nullable=True),
         sa.Column("notes", sa.Text(), nullable=True),
         sa.Column("pickup_time", sa.DateTime(timezone=True), nullable=True),
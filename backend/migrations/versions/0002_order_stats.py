@@ -0,0 +1,40 @@
+"""Add order_stats rollup table for the admin dashboard
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Single-row table; populated on first dashboard read or by rebuild_stats.py
+    op.create_table(
+        "order_stats",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("total_orders", sa.Integer(), nullable=False),
+        sa.Column("pending_orders", sa.Integer(), nullable=False),
+        sa.Column("completed_orders", sa.Integer(), nullable=False),
+        sa.Column("total_revenue", sa.Float(), nullable=False),
+        sa.Column("today_revenue", sa.Float(), nullable=False),
+        sa.Column("revenue_date", sa.Date(), nullable=True),
+        sa.Column("wait_time_total", sa.Float(), nullable=False),
+        sa.Column("wait_time_count", sa.Integer(), nullable=False),
+        sa.Column("paid_orders", sa.Integer(), nullable=False),
+        sa.Column("digital_paid_orders", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("order_stats")
@@ -0,0 +1,41 @@
+"""Add retry bookkeeping to notifications for the outbox worker
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "notifications",
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.add_column(
+        "notifications",
+        sa.Column("next_attempt_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.add_column("notifications", sa.Column("last_error", sa.Text(), nullable=True))
+    op.create_index(
+        "ix_notifications_status_next_attempt_at",
+        "notifications",
+        ["status", "next_attempt_at"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_notifications_status_next_attempt_at", table_name="notifications")
+    op.drop_column("notifications", "last_error")
+    op.drop_column("notifications", "next_attempt_at")
+    op.drop_column("notifications", "attempts")
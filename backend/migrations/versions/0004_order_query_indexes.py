@@ -0,0 +1,66 @@
+"""Add composite indexes for order listing, dashboard and sales queries
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    # Keyset pagination on (created_at, id): all / per customer / per status
+    ("ix_orders_created_at_id", "orders", ["created_at", "id"]),
+    ("ix_orders_customer_id_created_at_id", "orders", ["customer_id", "created_at", "id"]),
+    ("ix_orders_status_created_at_id", "orders", ["status", "created_at", "id"]),
+    # Sales reports and the stats rebuild
+    ("ix_orders_status_completed_at", "orders", ["status", "completed_at"]),
+    ("ix_order_items_order_id", "order_items", ["order_id"]),
+]
+
+# SQLite pages on strftime(created_at) (see pagination.py); index that expression too
+SQLITE_KEYSET_INDEXES = [
+    ("ix_orders_created_at_key_id", ""),
+    ("ix_orders_customer_id_created_at_key_id", "customer_id, "),
+    ("ix_orders_status_created_at_key_id", "status, "),
+]
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        # CONCURRENTLY can't run inside a transaction; it builds without
+        # blocking order writes on a live database
+        with op.get_context().autocommit_block():
+            for name, table, columns in INDEXES:
+                op.create_index(name, table, columns, postgresql_concurrently=True)
+        return
+
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+    if op.get_bind().dialect.name == "sqlite":
+        for name, leading in SQLITE_KEYSET_INDEXES:
+            op.execute(
+                f"CREATE INDEX {name} ON orders "
+                f"({leading}strftime('%Y-%m-%d %H:%M:%f', created_at), id)"
+            )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            for name, table, _ in reversed(INDEXES):
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
+        return
+
+    if op.get_bind().dialect.name == "sqlite":
+        for name, _ in reversed(SQLITE_KEYSET_INDEXES):
+            op.drop_index(name, table_name="orders")
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
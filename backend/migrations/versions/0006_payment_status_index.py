@@ -0,0 +1,35 @@
+"""Index orders by payment status for the payment reconciler
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.create_index(
+                "ix_orders_payment_status_id", "orders", ["payment_status", "id"],
+                postgresql_concurrently=True
+            )
+        return
+    op.create_index("ix_orders_payment_status_id", "orders", ["payment_status", "id"])
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.drop_index("ix_orders_payment_status_id", table_name="orders", postgresql_concurrently=True)
+        return
+    op.drop_index("ix_orders_payment_status_id", table_name="orders")
@@ -0,0 +1,36 @@
+"""Add sales_rollups table for hourly/daily per-product sales reports
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Populated as orders complete; run backfill_sales_rollup.py once for existing orders
+    op.create_table(
+        "sales_rollups",
+        sa.Column("granularity", sa.String(), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("product_id", sa.Integer(), nullable=False),
+        sa.Column("payment_method", sa.String(), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("revenue", sa.Float(), nullable=False),
+        sa.Column("order_count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("granularity", "bucket_start", "product_id", "payment_method"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("sales_rollups")
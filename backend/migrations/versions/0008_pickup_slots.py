@@ -0,0 +1,32 @@
+"""Add pickup_slots table for capacity-aware pickup scheduling
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing orders' pickup_time was never set, so nothing is booked yet
+    op.create_table(
+        "pickup_slots",
+        sa.Column("slot_start", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("capacity", sa.Integer(), nullable=True),
+        sa.Column("booked", sa.Integer(), nullable=False, server_default="0"),
+        sa.PrimaryKeyConstraint("slot_start"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("pickup_slots")
@@ -1,9 +1,10 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Enum as SQLEnum, Text
+from sqlalchemy import Column, Integer, String, Float, Boolean, Date, DateTime, ForeignKey, Enum as SQLEnum, Text, Index, UniqueConstraint, event
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime
 import enum
 from database import Base
+from pagination import SQLITE_SORT_FORMAT
 
 
 class OrderStatus(str, enum.Enum):
@@ -89,6 +90,37 @@ class Order(Base):
     customer = relationship("User", back_populates="orders")
     items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
     notifications = relationship("Notification", back_populates="order")
+    
+    __table_args__ = (
+        # Keyset pagination on (created_at, id): all orders, a customer's
+        # orders, orders in a status (also the kitchen board's open orders)
+        Index("ix_orders_created_at_id", "created_at", "id"),
+        Index("ix_orders_customer_id_created_at_id", "customer_id", "created_at", "id"),
+        Index("ix_orders_status_created_at_id", "status", "created_at", "id"),
+        # Sales reports and the stats rebuild: completed orders by completion time
+        Index("ix_orders_status_completed_at", "status", "completed_at"),
+        # Payment reconciler: orders still in payment PROCESSING, in id order
+        Index("ix_orders_payment_status_id", "payment_status", "id"),
+    )
+
+
+# On SQLite keyset pagination orders by strftime(created_at) rather than the
+# column (see pagination._sort_key), so the keyset indexes above get
+# expression-based twins there. Index name -> leading columns.
+SQLITE_KEYSET_INDEXES = {
+    "ix_orders_created_at_key_id": [],
+    "ix_orders_customer_id_created_at_key_id": ["customer_id"],
+    "ix_orders_status_created_at_key_id": ["status"],
+}
+
+
+@event.listens_for(Order.__table__, "after_create")
+def _create_sqlite_keyset_indexes(target, connection, **kw):
+    if connection.dialect.name != "sqlite":
+        return
+    for name, leading in SQLITE_KEYSET_INDEXES.items():
+        columns = ", ".join(leading + [f"strftime('{SQLITE_SORT_FORMAT}', created_at)", "id"])
+        connection.exec_driver_sql(f"CREATE INDEX {name} ON orders ({columns})")
 
 
 class OrderItem(Base):
@@ -104,6 +136,11 @@ class OrderItem(Base):
     
     order = relationship("Order", back_populates="items")
     product = relationship("Product", back_populates="order_items")
+    
+    __table_args__ = (
+        # Loading an order's items, and joins from orders in sales reports
+        Index("ix_order_items_order_id", "order_id"),
+    )
 
 
 class Notification(Base):
@@ -114,9 +151,95 @@ class Notification(Base):
     recipient_phone = Column(String, nullable=False)
     message = Column(Text, nullable=False)
     notification_type = Column(String, nullable=False)  # sms, whatsapp
-    status = Column(String, default="pending")  # pending, sent, failed
+    status = Column(String, default="pending")  # pending, sending, sent, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=True)  # retry time, or lease expiry while sending
+    last_error = Column(Text, nullable=True)
     sent_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     order = relationship("Order", back_populates="notifications")
+    
+    __table_args__ = (
+        Index("ix_notifications_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+
+class OrderStats(Base):
+    """Running dashboard totals, updated in the same transaction as order writes.
+    
+    Holds a single row (id=1); see services/stats_service.py.
+    """
+    __tablename__ = "order_stats"
+    
+    id = Column(Integer, primary_key=True)
+    total_orders = Column(Integer, nullable=False, default=0)
+    pending_orders = Column(Integer, nullable=False, default=0)  # pending, confirmed or ready
+    completed_orders = Column(Integer, nullable=False, default=0)
+    total_revenue = Column(Float, nullable=False, default=0.0)  # sum of completed order totals
+    today_revenue = Column(Float, nullable=False, default=0.0)  # completed on revenue_date (UTC)
+    revenue_date = Column(Date, nullable=True)
+    wait_time_total = Column(Float, nullable=False, default=0.0)  # minutes, created -> completed
+    wait_time_count = Column(Integer, nullable=False, default=0)
+    paid_orders = Column(Integer, nullable=False, default=0)
+    digital_paid_orders = Column(Integer, nullable=False, default=0)
+
+
+class SalesRollup(Base):
+    """Completed-order sales per time bucket, product and payment method.
+    
+    Rows exist at two granularities: "hour" rows answer hourly reports and
+    "day" rows everything coarser, so a year reads at most 366 buckets.
+    product_id 0 holds whole-order totals (quantity of all items, order
+    total_amount, distinct orders) for the bucket and payment method. Updated when orders complete and rebuilt by
+    backfill_sales_rollup.py; see services/sales_rollup_service.py.
+    """
+    __tablename__ = "sales_rollups"
+    
+    granularity = Column(String, primary_key=True)  # hour, day
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)  # UTC
+    product_id = Column(Integer, primary_key=True)  # no FK: totals outlive deleted products
+    payment_method = Column(String, primary_key=True)  # PaymentMethod value, or "none"
+    quantity = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+    order_count = Column(Integer, nullable=False, default=0)
 
+
+class PickupSlot(Base):
+    """Birds booked for pickup in one slot (see services/pickup_slots.py).
+    
+    Rows are created by the first booking in a slot. `capacity` is NULL
+    unless an admin has overridden PICKUP_SLOT_CAPACITY for this slot;
+    `booked` only ever changes through conditional updates that keep it
+    within capacity.
+    """
+    __tablename__ = "pickup_slots"
+    
+    slot_start = Column(DateTime(timezone=True), primary_key=True)  # UTC
+    capacity = Column(Integer, nullable=True)  # birds; NULL = PICKUP_SLOT_CAPACITY
+    booked = Column(Integer, nullable=False, default=0)  # birds in open orders
+
+
+class IdempotencyKey(Base):
+    """Outcome of a request sent with an Idempotency-Key header.
+    
+    A row is claimed (`processing`, leased until locked_until) before the
+    request runs and holds the response once it completes, so retries replay
+    it instead of running again; see services/idempotency.py.
+    """
+    __tablename__ = "idempotency_keys"
+    
+    id = Column(Integer, primary_key=True)
+    scope = Column(String, nullable=False)  # endpoint, e.g. "orders.create"
+    key = Column(String, nullable=False)
+    fingerprint = Column(String, nullable=False)  # sha256 of the request that claimed the key
+    status = Column(String, nullable=False, default="processing")  # processing, completed
+    response_code = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    
+    __table_args__ = (
+        UniqueConstraint("scope", "key", name="uq_idempotency_keys_scope_key"),
+        Index("ix_idempotency_keys_created_at", "created_at"),
+    )
@@ -0,0 +1,118 @@
+"""
+Keyset (cursor) pagination for order listings.
+
+Pages are ordered on (created_at, id) and each page starts strictly after the
+last row of the previous one, so fetching page 500 costs the same as page 1.
+The cursor handed to clients is an opaque urlsafe-base64 encoding of that
+(created_at, id) pair.
+"""
+import base64
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Select, and_, func, literal_column, or_
+from sqlalchemy.orm import Query, Session
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Response header carrying the cursor for the next page (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# SQLite timestamp normalisation format. Rendered as a literal rather than a
+# bound parameter so queries match the expression indexes in models.py.
+SQLITE_SORT_FORMAT = "%Y-%m-%d %H:%M:%f"
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Encode a (created_at, id) position as an opaque cursor"""
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor produced by encode_cursor (raises ValueError if malformed)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except ValueError:
+        raise ValueError("Invalid pagination cursor")
+
+
+def _sort_key(session: Session):
+    """Expression to order and compare timestamps on.
+    
+    SQLite stores server-default timestamps as 'YYYY-MM-DD HH:MM:SS' but binds
+    Python datetimes with microseconds, so plain string comparison breaks ties.
+    Normalising both sides through strftime keeps the keyset order consistent
+    for local development; PostgreSQL compares the column directly.
+    """
+    if session.get_bind().dialect.name == "sqlite":
+        return lambda value: func.strftime(literal_column(f"'{SQLITE_SORT_FORMAT}'"), value)
+    return lambda value: value
+
+
+def paginate(
+    query: Query,
+    model,
+    cursor: Optional[str],
+    limit: int,
+    descending: bool = True,
+) -> Tuple[List, Optional[str]]:
+    """Apply keyset filtering, ordering and the page limit to a query.
+    
+    Returns the rows for this page and the cursor for the next one
+    (None when there are no more rows).
+    """
+    query = _keyset(query, _sort_key(query.session), model, cursor, limit, descending)
+    return _page(query.all(), limit)
+
+
+def paginate_select(
+    db: Session,
+    stmt: Select,
+    model,
+    cursor: Optional[str],
+    limit: int,
+    descending: bool = True,
+) -> Tuple[List, Optional[str]]:
+    """paginate() for a Core select(); it must include the model's created_at and id columns"""
+    stmt = _keyset(stmt, _sort_key(db), model, cursor, limit, descending)
+    return _page(db.execute(stmt).all(), limit)
+
+
+def _keyset(query, key, model, cursor: Optional[str], limit: int, descending: bool):
+    # Query and Select share filter/order_by/limit, so both go through here
+    created_col = key(model.created_at)
+    
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        created_val = key(created_at)
+        if descending:
+            query = query.filter(or_(
+                created_col < created_val,
+                and_(created_col == created_val, model.id < row_id)
+            ))
+        else:
+            query = query.filter(or_(
+                created_col > created_val,
+                and_(created_col == created_val, model.id > row_id)
+            ))
+    
+    if descending:
+        query = query.order_by(created_col.desc(), model.id.desc())
+    else:
+        query = query.order_by(created_col.asc(), model.id.asc())
+    
+    # Fetch one extra row to learn whether another page exists
+    return query.limit(limit + 1)
+
+
+def _page(rows: List, limit: int) -> Tuple[List, Optional[str]]:
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return rows, next_cursor
@@ -0,0 +1,22 @@
+"""
+Rebuild the dashboard stats rollup (order_stats) from the orders table
+Run this after editing orders directly in the database or restoring a backup
+"""
+from database import SessionLocal, engine, Base
+from services.stats_service import StatsService
+
+# Create tables
+Base.metadata.create_all(bind=engine)
+
+
+if __name__ == "__main__":
+    print("Rebuilding dashboard stats...")
+    db = SessionLocal()
+    try:
+        stats = StatsService.rebuild(db)
+        db.commit()
+        print(f"Orders: {stats.total_orders} total, {stats.pending_orders} pending, {stats.completed_orders} completed")
+        print(f"Revenue: GHS {stats.total_revenue:.2f} total, GHS {stats.today_revenue:.2f} today")
+        print("Dashboard stats rebuilt!")
+    finally:
+        db.close()
@@ -0,0 +1,19 @@
+from typing import Any
+from fastapi.responses import JSONResponse
+import orjson
+
+# Matches Pydantic's JSON: UTC datetimes end in `Z`
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response encoded with orjson, for content that is already plain data.
+    
+    Handlers that build dicts themselves (see services/order_reads.py)
+    return this directly, so FastAPI neither re-validates the content against
+    the response_model nor walks it with jsonable_encoder. Output matches
+    Pydantic's: enums as values, datetimes in ISO 8601 with UTC as `Z`.
+    """
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
@@ -1,143 +1,246 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
-from database import get_db
-from models import Order, OrderStatus, PaymentStatus, PaymentMethod, User, OrderItem
-from schemas import DashboardStats, OrderResponse, DailySalesStats
-from auth import get_current_admin
-from datetime import datetime, timedelta
-from typing import List
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from sqlalchemy import func, and_
+from database import get_async_db, AsyncDB
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
+from responses import ORJSONResponse
+from models import Order, OrderStatus, PaymentStatus, PaymentMethod, OrderItem, Product
+from schemas import (
+    DashboardStats, OrderResponse, DailySalesStats, SalesReport, PickupSlotCapacityUpdate, PickupSlotResponse
+)
+from auth import get_current_admin, get_stream_admin
+from services.principal_cache import Principal
+from services.export_service import ExportService
+from services.order_reads import OrderReads
+from services.stats_service import StatsService
+from services.sales_rollup_service import SalesRollupService
+from services.password_hasher import password_hasher
+from services.order_feed import order_feed
+from services.pickup_slots import pickup_slots
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Literal, Tuple
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
 
-@router.get("/dashboard", response_model=DashboardStats)
-async def get_dashboard_stats(
-    db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin)
-):
-    """Get dashboard statistics (admin only)"""
-    # Total orders
-    total_orders = db.query(func.count(Order.id)).scalar() or 0
-    
-    # Pending orders (orders not yet completed)
-    pending_orders = db.query(func.count(Order.id)).filter(
-        Order.status.in_([OrderStatus.PENDING, OrderStatus.CONFIRMED, OrderStatus.READY])
-    ).scalar() or 0
-    
-    # Completed orders
-    completed_orders = db.query(func.count(Order.id)).filter(
-        Order.status == OrderStatus.COMPLETED
-    ).scalar() or 0
-    
-    # Total revenue (count all completed orders - revenue is realized when order is picked up)
-    total_revenue = db.query(func.sum(Order.total_amount)).filter(
-        Order.status == OrderStatus.COMPLETED
-    ).scalar() or 0.0
-    
-    # Today's revenue (count all completed orders from today)
-    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    today_revenue = db.query(func.sum(Order.total_amount)).filter(
-        Order.status == OrderStatus.COMPLETED,
-        Order.completed_at >= today_start
-    ).scalar() or 0.0
-    
-    # Average wait time (time from created to completed)
-    completed_orders_with_time = db.query(Order).filter(
-        Order.status == OrderStatus.COMPLETED,
-        Order.completed_at.isnot(None)
-    ).all()
-    
-    average_wait_time = None
-    if completed_orders_with_time:
-        wait_times = []
-        for order in completed_orders_with_time:
-            if order.completed_at:
-                wait_time = (order.completed_at - order.created_at).total_seconds() / 60  # minutes
-                wait_times.append(wait_time)
-        if wait_times:
-            average_wait_time = sum(wait_times) / len(wait_times)
+def _dashboard_stats(db: Session) -> DashboardStats:
+    stats = StatsService.get(db)
     
     # Digital payment percentage
-    total_paid_orders = db.query(func.count(Order.id)).filter(
-        Order.payment_status == PaymentStatus.COMPLETED
-    ).scalar() or 0
-    
-    digital_paid_orders = db.query(func.count(Order.id)).filter(
-        Order.payment_status == PaymentStatus.COMPLETED,
-        Order.payment_method.in_([PaymentMethod.HUBTEL, PaymentMethod.PAYSTACK, PaymentMethod.MOBILE_MONEY, PaymentMethod.CARD])
-    ).scalar() or 0
-    
-    digital_payment_percentage = (digital_paid_orders / total_paid_orders * 100) if total_paid_orders > 0 else 0.0
+    digital_payment_percentage = (
+        stats.digital_paid_orders / stats.paid_orders * 100
+    ) if stats.paid_orders > 0 else 0.0
     
     return DashboardStats(
-        total_orders=total_orders,
-        pending_orders=pending_orders,
-        completed_orders=completed_orders,
-        total_revenue=float(total_revenue),
-        today_revenue=float(today_revenue),
-        average_wait_time=average_wait_time,
+        total_orders=stats.total_orders,
+        pending_orders=stats.pending_orders,
+        completed_orders=stats.completed_orders,
+        total_revenue=float(stats.total_revenue),
+        today_revenue=float(StatsService.today_revenue(stats)),
+        average_wait_time=StatsService.average_wait_time(stats),
         digital_payment_percentage=round(digital_payment_percentage, 2)
     )
 
 
+def _pending_orders(db: Session, cursor: Optional[str], limit: int) -> Tuple[List[Dict], Optional[str]]:
+    return OrderReads.page(
+        db, cursor, limit,
+        Order.status.in_([OrderStatus.PENDING, OrderStatus.CONFIRMED, OrderStatus.READY]),
+        descending=False
+    )
+
+
+@router.get("/dashboard", response_model=DashboardStats)
+async def get_dashboard_stats(
+    db: AsyncDB = Depends(get_async_db),
+    admin: Principal = Depends(get_current_admin)
+):
+    """Get dashboard statistics (admin only)
+    
+    Served from the order_stats rollup row, which order and payment writes
+    keep up to date (see StatsService).
+    """
+    return await db.run_sync(_dashboard_stats)
+
+
 @router.get("/orders/pending", response_model=List[OrderResponse])
 async def get_pending_orders(
-    db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncDB = Depends(get_async_db),
+    admin: Principal = Depends(get_current_admin)
 ):
-    """Get all pending orders (admin only)"""
-    orders = db.query(Order).options(
-        joinedload(Order.items).joinedload(OrderItem.product)
-    ).filter(
-        Order.status.in_([OrderStatus.PENDING, OrderStatus.CONFIRMED, OrderStatus.READY])
-    ).order_by(Order.created_at.asc()).all()
-    return [OrderResponse.from_orm_with_items(order) for order in orders]
+    """Get pending orders, oldest first (admin only)
+    
+    Paginated like GET /orders/ via `limit`, `cursor` and X-Next-Cursor.
+    """
+    try:
+        orders, next_cursor = await db.run_sync(_pending_orders, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    return ORJSONResponse(orders, headers={NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None)
 
 
-@router.get("/sales/today", response_model=DailySalesStats)
-async def get_today_sales_stats(
-    db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+@router.get("/orders/stream")
+async def stream_orders(
+    last_event_id: Optional[str] = Header(None),
+    admin: Principal = Depends(get_stream_admin)
 ):
-    """Get today's sales statistics with breakdown by product (admin only)"""
-    # Get today's start time
-    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    """Live feed of order_created / order_status_changed events (admin only)
     
-    # Get all orders completed today (picked up today)
-    today_orders = db.query(Order).options(
-        joinedload(Order.items).joinedload(OrderItem.product)
-    ).filter(
+    Server-Sent Events; each event's data is the order as returned by
+    GET /orders/{id}. Reconnect with the Last-Event-ID header (EventSource
+    does this automatically) to resume; a `reset` event means events were
+    missed and the board should refetch /admin/orders/pending. Browsers can
+    pass the token as `?access_token=` since EventSource can't set headers.
+    """
+    return StreamingResponse(
+        order_feed.subscribe(last_event_id),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # don't let a proxy buffer the stream
+        }
+    )
+
+
+def _daily_sales_stats(db: Session, day: date) -> DailySalesStats:
+    """Aggregate sales for orders completed on a given (UTC) day, in SQL"""
+    day_start = datetime.combine(day, datetime.min.time())
+    completed_on_day = and_(
         Order.status == OrderStatus.COMPLETED,
-        Order.completed_at >= today_start
-    ).all()
+        Order.completed_at >= day_start,
+        Order.completed_at < day_start + timedelta(days=1)
+    )
+    
+    # Chickens sold per product
+    rows = db.query(
+        Product.name,
+        func.sum(OrderItem.quantity)
+    ).select_from(OrderItem).join(
+        Order, OrderItem.order_id == Order.id
+    ).join(
+        Product, OrderItem.product_id == Product.id
+    ).filter(completed_on_day).group_by(Product.id, Product.name).all()
     
-    # Calculate statistics
-    total_chickens_sold = 0
     breakdown = {}
-    total_revenue = 0.0
+    for product_name, quantity in rows:
+        breakdown[product_name] = breakdown.get(product_name, 0) + int(quantity or 0)
     
-    for order in today_orders:
-        # Count revenue (all orders in this query are completed)
-        total_revenue += order.total_amount
-        
-        # Count chickens from order items
-        for item in order.items:
-            if item.product:
-                product_name = item.product.name
-                quantity = item.quantity
-                
-                total_chickens_sold += quantity
-                
-                # Add to breakdown
-                if product_name in breakdown:
-                    breakdown[product_name] += quantity
-                else:
-                    breakdown[product_name] = quantity
+    # Revenue (all orders in this query are completed)
+    total_revenue = db.query(func.sum(Order.total_amount)).filter(completed_on_day).scalar() or 0.0
     
     return DailySalesStats(
-        total_chickens_sold=total_chickens_sold,
+        total_chickens_sold=sum(breakdown.values()),
         breakdown=breakdown,
         total_revenue=float(total_revenue)
     )
 
+
+@router.get("/sales/today", response_model=DailySalesStats)
+async def get_today_sales_stats(
+    db: AsyncDB = Depends(get_async_db),
+    admin: Principal = Depends(get_current_admin)
+):
+    """Get today's sales statistics with breakdown by product (admin only)"""
+    return await db.run_sync(_daily_sales_stats, datetime.utcnow().date())
+
+
+@router.get("/sales/daily", response_model=DailySalesStats)
+async def get_daily_sales_stats(
+    sales_date: Optional[date] = Query(None, alias="date"),
+    db: AsyncDB = Depends(get_async_db),
+    admin: Principal = Depends(get_current_admin)
+):
+    """Get sales statistics for orders completed on `date` (YYYY-MM-DD, UTC; defaults to today) (admin only)"""
+    return await db.run_sync(_daily_sales_stats, sales_date or datetime.utcnow().date())
+
+
+@router.get("/sales", response_model=SalesReport)
+async def get_sales_report(
+    start: date = Query(..., alias="from"),
+    end: date = Query(..., alias="to"),
+    granularity: Literal["hour", "day", "week", "month", "year"] = "day",
+    db: AsyncDB = Depends(get_async_db),
+    admin: Principal = Depends(get_current_admin)
+):
+    """Get sales for orders completed from `from` to `to` (YYYY-MM-DD, inclusive, UTC) (admin only)
+    
+    Bucketed by hour (ranges up to 31 days), day, week (starting Monday),
+    month or year, with totals per product and per payment method. Read from
+    the sales_rollups table, so long ranges cost no more than a few days.
+    """
+    try:
+        return await db.run_sync(SalesRollupService.report, start, end, granularity)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+@router.get("/orders/export")
+async def export_orders(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    completed_from: Optional[datetime] = None,
+    completed_to: Optional[datetime] = None,
+    admin: Principal = Depends(get_current_admin)
+):
+    """Stream full order history with items as NDJSON or CSV (admin only)
+    
+    Date filters are inclusive of `*_from` and exclusive of `*_to`. Orders are
+    read and written in fixed-size batches, so memory use does not grow with
+    the size of the export.
+    """
+    filters = {
+        "created_from": created_from,
+        "created_to": created_to,
+        "completed_from": completed_from,
+        "completed_to": completed_to,
+    }
+    
+    if format == "csv":
+        content = ExportService.stream_csv(**filters)
+        media_type = "text/csv"
+    else:
+        content = ExportService.stream_ndjson(**filters)
+        media_type = "application/x-ndjson"
+    
+    return StreamingResponse(
+        content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="orders.{format}"'}
+    )
+
+
+@router.put("/pickup-slots", response_model=PickupSlotResponse)
+async def set_pickup_slot_capacity(
+    slot_update: PickupSlotCapacityUpdate,
+    db: AsyncDB = Depends(get_async_db),
+    admin: Principal = Depends(get_current_admin)
+):
+    """Set how many birds one pickup slot can take, e.g. with extra hands on a peak day (admin only)
+    
+    `capacity: null` restores PICKUP_SLOT_CAPACITY. Lowering it below what is
+    already booked keeps those orders but stops new bookings in the slot.
+    """
+    try:
+        return await db.run_sync(pickup_slots.set_capacity, slot_update.slot_start, slot_update.capacity)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+@router.get("/password-hashing")
+async def get_password_hashing_stats(admin: Principal = Depends(get_current_admin)):
+    """Bcrypt pool queue depth, rejections and average wait/run times (admin only)"""
+    return password_hasher.stats()
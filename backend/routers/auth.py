@@ -1,18 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from database import get_db
+from typing import Optional
+from database import get_async_db, AsyncDB
 from models import User
 from schemas import UserCreate, UserLogin, UserResponse, Token
-from auth import verify_password, get_password_hash, create_access_token, get_current_user
-from datetime import timedelta
-from config import settings
+from auth import verify_password_async, get_password_hash_async, create_user_token, get_current_user, load_user
+from services.principal_cache import Principal
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
-@router.post("/register", response_model=UserResponse)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
-    """Register a new user"""
+def _check_user_unique(db: Session, user_data: UserCreate):
+    """Reject a registration whose email or phone is already taken"""
     # Check if user exists
     if user_data.email:
         existing_user = db.query(User).filter(User.email == user_data.email).first()
@@ -28,9 +27,10 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Phone number already registered"
         )
-    
-    # Create user
-    password_hash = get_password_hash(user_data.password) if user_data.password else None
+
+
+def _create_user(db: Session, user_data: UserCreate, password_hash: Optional[str]) -> User:
+    """Create a customer account"""
     user = User(
         name=user_data.name,
         phone=user_data.phone,
@@ -45,15 +45,30 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     return user
 
 
+def _find_user(db: Session, credentials: UserLogin) -> Optional[User]:
+    """Find a user by email or phone"""
+    if credentials.email:
+        return db.query(User).filter(User.email == credentials.email).first()
+    elif credentials.phone:
+        return db.query(User).filter(User.phone == credentials.phone).first()
+    return None
+
+
+@router.post("/register", response_model=UserResponse)
+async def register(user_data: UserCreate, db: AsyncDB = Depends(get_async_db)):
+    """Register a new user"""
+    await db.run_sync(_check_user_unique, user_data)
+    
+    # Create user
+    password_hash = await get_password_hash_async(user_data.password) if user_data.password else None
+    return await db.run_sync(_create_user, user_data, password_hash)
+
+
 @router.post("/login", response_model=Token)
-async def login(credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(credentials: UserLogin, db: AsyncDB = Depends(get_async_db)):
     """Login user"""
     # Find user by email or phone
-    user = None
-    if credentials.email:
-        user = db.query(User).filter(User.email == credentials.email).first()
-    elif credentials.phone:
-        user = db.query(User).filter(User.phone == credentials.phone).first()
+    user = await db.run_sync(_find_user, credentials)
     
     if not user or not user.password_hash:
         raise HTTPException(
@@ -61,7 +76,7 @@ async def login(credentials: UserLogin, db: Session = Depends(get_db)):
             detail="Invalid credentials"
         )
     
-    if not verify_password(credentials.password, user.password_hash):
+    if not await verify_password_async(credentials.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
@@ -73,18 +88,23 @@ async def login(credentials: UserLogin, db: Session = Depends(get_db)):
             detail="User account is inactive"
         )
     
-    # Create access token (sub must be string for JWT)
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": str(user.id)},  # Convert to string for JWT compliance
-        expires_delta=access_token_expires
-    )
+    # Create access token (admin/active flags ride along as signed claims)
+    access_token = create_user_token(user)
     
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncDB = Depends(get_async_db)
+):
     """Get current user information"""
-    return current_user
-
+    user = await db.run_sync(load_user, current_user.id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
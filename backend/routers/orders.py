@@ -1,78 +1,57 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
 from sqlalchemy.orm import Session, joinedload
-from typing import List, Optional
-from database import get_db
-from models import Order, OrderStatus, PaymentStatus, User, OrderItem
-from schemas import OrderCreate, OrderUpdate, OrderResponse, OrderItemResponse
+from typing import Dict, List, Optional, Tuple
+from database import get_async_db, AsyncDB
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
+from responses import ORJSONResponse
+from models import Order, OrderStatus, PaymentStatus, PaymentMethod, OrderItem
+from schemas import (
+    OrderCreate, OrderUpdate, OrderResponse, OrderItemResponse,
+    BulkStatusUpdate, BulkStatusResult, BulkStatusResponse, PickupSlotResponse
+)
 from auth import get_current_user, get_current_admin, get_optional_user
+from services.principal_cache import Principal
 from services.order_service import OrderService
+from services.stats_service import StatsService
+from services.order_reads import OrderReads
+from services.pickup_slots import pickup_slots
 from services.payment_service import PaymentService
-from services.notification_service import NotificationService
+from services.notification_worker import notification_worker
+from services.idempotency import idempotency
+from config import settings
 from datetime import datetime
 
 router = APIRouter(prefix="/orders", tags=["Orders"])
 
 order_service = OrderService()
 payment_service = PaymentService()
-notification_service = NotificationService()
 
 
-@router.post("/", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
-async def create_order(
-    order_data: OrderCreate,
-    db: Session = Depends(get_db),
-    current_user: Optional[User] = Depends(get_optional_user)
-):
-    """Create a new order (public endpoint)"""
-    try:
-        customer_id = current_user.id if current_user else None
-        order = order_service.create_order(db, order_data, customer_id)
-        
-        # Send confirmation notification
-        await notification_service.send_order_confirmation(order)
-        
-        # Reload order with items and products
-        db.refresh(order)
-        for item in order.items:
-            db.refresh(item)
-            if item.product:
-                db.refresh(item.product)
-        
-        return OrderResponse.from_orm_with_items(order)
-    except ValueError as e:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=str(e)
-        )
+def _create_order(db: Session, order_data: OrderCreate, customer_id: Optional[int]) -> OrderResponse:
+    order = order_service.create_order(db, order_data, customer_id)
+    return OrderResponse.from_orm_with_items(order)
 
 
-@router.get("/", response_model=List[OrderResponse])
-async def get_orders(
-    status_filter: Optional[OrderStatus] = None,
-    db: Session = Depends(get_db),
-    current_user: Optional[User] = Depends(get_optional_user)
-):
-    """Get orders (customers see their own, admins see all)"""
-    query = db.query(Order).options(joinedload(Order.items).joinedload(OrderItem.product))
+def _list_orders(
+    db: Session,
+    current_user: Optional[Principal],
+    status_filter: Optional[OrderStatus],
+    cursor: Optional[str],
+    limit: int
+) -> Tuple[List[Dict], Optional[str]]:
+    conditions = []
     
     if current_user and not current_user.is_admin:
         # Customers see only their orders
-        query = query.filter(Order.customer_id == current_user.id)
+        conditions.append(Order.customer_id == current_user.id)
     
     if status_filter:
-        query = query.filter(Order.status == status_filter)
+        conditions.append(Order.status == status_filter)
     
-    orders = query.order_by(Order.created_at.desc()).all()
-    return [OrderResponse.from_orm_with_items(order) for order in orders]
+    return OrderReads.page(db, cursor, limit, *conditions)
 
 
-@router.get("/{order_id}", response_model=OrderResponse)
-async def get_order(
-    order_id: int,
-    db: Session = Depends(get_db),
-    current_user: Optional[User] = Depends(get_optional_user)
-):
-    """Get a single order"""
+def _get_order(db: Session, order_id: int, current_user: Optional[Principal]) -> OrderResponse:
     order = db.query(Order).options(
         joinedload(Order.items).joinedload(OrderItem.product)
     ).filter(Order.id == order_id).first()
@@ -93,34 +72,183 @@ async def get_order(
     return OrderResponse.from_orm_with_items(order)
 
 
+def _update_order_status(db: Session, order_id: int, status_update: OrderUpdate) -> OrderResponse:
+    order = order_service.update_order_status(
+        db,
+        order_id,
+        status_update.status,
+        status_update.payment_status
+    )
+    return OrderResponse.from_orm_with_items(order)
+
+
+def _bulk_update_status(db: Session, update: BulkStatusUpdate) -> BulkStatusResponse:
+    updated, errors = order_service.bulk_update_status(db, update.order_ids, update.status)
+    
+    results = []
+    for order_id in dict.fromkeys(update.order_ids):
+        if order_id in updated:
+            results.append(BulkStatusResult(
+                order_id=order_id,
+                success=True,
+                order=OrderResponse.from_orm_with_items(updated[order_id])
+            ))
+        else:
+            results.append(BulkStatusResult(order_id=order_id, success=False, error=errors[order_id]))
+    
+    return BulkStatusResponse(updated=len(updated), failed=len(errors), results=results)
+
+
+def _get_payable_order(db: Session, order_id: int, for_update: bool = False) -> Order:
+    query = db.query(Order).filter(Order.id == order_id)
+    if for_update:
+        query = query.with_for_update().populate_existing()
+    order = query.first()
+    if not order:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Order not found"
+        )
+    
+    # Check if payment is already completed
+    if order.payment_status == PaymentStatus.COMPLETED:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Payment has already been completed for this order"
+        )
+    return order
+
+
+def _record_payment_initiation(db: Session, order_id: int, payment_method: PaymentMethod, payment_reference: str):
+    # Check again with the row locked (PostgreSQL): the payment may have been
+    # completed while the provider was being contacted
+    order = _get_payable_order(db, order_id, for_update=True)
+    old_payment_status = order.payment_status
+    
+    # Update order with payment reference
+    order.payment_method = payment_method
+    order.payment_reference = payment_reference
+    
+    # For cash payments, keep status as pending (paid on pickup)
+    # For other methods, set to processing
+    if payment_method == PaymentMethod.CASH:
+        order.payment_status = PaymentStatus.PENDING
+    else:
+        order.payment_status = PaymentStatus.PROCESSING
+    
+    StatsService.record_payment_change(db, order, old_payment_status)
+    db.commit()
+
+
+@router.post("/", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
+async def create_order(
+    order_data: OrderCreate,
+    db: AsyncDB = Depends(get_async_db),
+    current_user: Optional[Principal] = Depends(get_optional_user),
+    idempotency_key: Optional[str] = Header(None)
+):
+    """Create a new order (public endpoint)
+    
+    Send an `Idempotency-Key` header to make retries safe: repeating the
+    request with the same key returns the original order instead of placing
+    (and texting about) another one.
+    
+    The order is booked into the pickup slot containing `pickup_time`, or
+    the earliest slot with room for its birds if none is given; a full slot
+    or no room at all is a 400.
+    """
+    customer_id = current_user.id if current_user else None
+    
+    async def create():
+        try:
+            order = await db.run_sync(_create_order, order_data, customer_id)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        
+        # Confirmation SMS was queued with the order; deliver it in the background
+        notification_worker.wake()
+        
+        return order
+    
+    return await idempotency.execute(
+        db,
+        idempotency_key,
+        "orders.create",
+        idempotency.fingerprint(order_data.dict(), customer_id),
+        create,
+        status.HTTP_201_CREATED
+    )
+
+
+@router.get("/", response_model=List[OrderResponse])
+async def get_orders(
+    status_filter: Optional[OrderStatus] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncDB = Depends(get_async_db),
+    current_user: Optional[Principal] = Depends(get_optional_user)
+):
+    """Get orders, newest first (customers see their own, admins see all)
+    
+    Results are paginated: pass the X-Next-Cursor response header back as
+    `cursor` to fetch the next page.
+    """
+    try:
+        orders, next_cursor = await db.run_sync(_list_orders, current_user, status_filter, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    # Plain dicts from trusted rows: skip response_model validation
+    return ORJSONResponse(orders, headers={NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None)
+
+
+@router.get("/pickup-slots", response_model=List[PickupSlotResponse])
+async def get_pickup_slots(
+    days: int = Query(7, ge=1, le=settings.PICKUP_BOOKING_DAYS),
+    birds: int = Query(1, ge=1),
+    db: AsyncDB = Depends(get_async_db)
+):
+    """Get pickup slots with room for `birds` over the next `days` days, earliest first
+    
+    Served from the in-memory slot index. Pass a slot's `slot_start` as the
+    order's `pickup_time` to book it.
+    """
+    slots = await db.run_sync(pickup_slots.available, days, birds)
+    return ORJSONResponse(slots)
+
+
+@router.get("/{order_id}", response_model=OrderResponse)
+async def get_order(
+    order_id: int,
+    db: AsyncDB = Depends(get_async_db),
+    current_user: Optional[Principal] = Depends(get_optional_user)
+):
+    """Get a single order"""
+    return await db.run_sync(_get_order, order_id, current_user)
+
+
 @router.put("/{order_id}/status", response_model=OrderResponse)
 async def update_order_status(
     order_id: int,
     status_update: OrderUpdate,
-    db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    db: AsyncDB = Depends(get_async_db),
+    admin: Principal = Depends(get_current_admin)
 ):
     """Update order status (admin only)"""
     try:
         if status_update.status:
-            order = order_service.update_order_status(
-                db,
-                order_id,
-                status_update.status,
-                status_update.payment_status
-            )
-            
-            # Send status update notification
-            await notification_service.send_status_update(order)
+            order = await db.run_sync(_update_order_status, order_id, status_update)
             
-            # Reload order with items and products
-            db.refresh(order)
-            for item in order.items:
-                db.refresh(item)
-                if item.product:
-                    db.refresh(item.product)
+            # Status update SMS was queued with the order; deliver it in the background
+            notification_worker.wake()
             
-            return OrderResponse.from_orm_with_items(order)
+            return order
         else:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -133,55 +261,63 @@ async def update_order_status(
         )
 
 
+@router.post("/bulk-status", response_model=BulkStatusResponse)
+async def bulk_update_order_status(
+    update: BulkStatusUpdate,
+    db: AsyncDB = Depends(get_async_db),
+    admin: Principal = Depends(get_current_admin)
+):
+    """Move several orders to one status in a single transaction (admin only)
+    
+    Each order is checked against the status flow on its own: orders that
+    can't make the transition are reported in `results` and left unchanged,
+    the rest are updated together.
+    """
+    result = await db.run_sync(_bulk_update_status, update)
+    
+    # Status update SMS were queued with the orders; deliver them in the background
+    if result.updated:
+        notification_worker.wake()
+    
+    return result
+
+
 @router.post("/{order_id}/payment", response_model=dict)
 async def initiate_payment(
     order_id: int,
     payment_method: str,
-    db: Session = Depends(get_db)
+    db: AsyncDB = Depends(get_async_db),
+    idempotency_key: Optional[str] = Header(None)
 ):
-    """Initiate payment for an order"""
-    order = db.query(Order).filter(Order.id == order_id).first()
-    if not order:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Order not found"
-        )
-    
-    # Check if payment is already completed
-    if order.payment_status == PaymentStatus.COMPLETED:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Payment has already been completed for this order"
-        )
+    """Initiate payment for an order
     
-    try:
-        from models import PaymentMethod
-        payment_method_enum = PaymentMethod(payment_method)
-        result = await payment_service.initiate_payment(order, payment_method_enum)
-        
-        # Update order with payment reference
-        order.payment_method = payment_method_enum
-        order.payment_reference = result["payment_reference"]
+    With an `Idempotency-Key` header, a retry returns the original payment
+    details instead of contacting the provider again.
+    """
+    async def initiate():
+        order = await db.run_sync(_get_payable_order, order_id)
         
-        # For cash payments, keep status as pending (paid on pickup)
-        # For other methods, set to processing
-        if payment_method_enum == PaymentMethod.CASH:
-            order.payment_status = PaymentStatus.PENDING
-        else:
-            order.payment_status = PaymentStatus.PROCESSING
-        
-        db.commit()
-        db.refresh(order)
+        try:
+            payment_method_enum = PaymentMethod(payment_method)
+            result = await payment_service.initiate_payment(order, payment_method_enum)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Payment initiation failed: {str(e)}"
+            )
         
+        await db.run_sync(_record_payment_initiation, order_id, payment_method_enum, result["payment_reference"])
         return result
-    except ValueError as e:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=str(e)
-        )
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Payment initiation failed: {str(e)}"
-        )
-
+    
+    return await idempotency.execute(
+        db,
+        idempotency_key,
+        "orders.payment",
+        idempotency.fingerprint(order_id, payment_method),
+        initiate
+    )
@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_async_db, AsyncDB
 from models import Order, PaymentMethod, PaymentStatus
 from services.payment_service import PaymentService
+from services.stats_service import StatsService
+from services.payment_reconciler import payment_reconciler
 from auth import get_current_admin
 
 router = APIRouter(prefix="/payments", tags=["Payments"])
@@ -10,19 +12,42 @@ router = APIRouter(prefix="/payments", tags=["Payments"])
 payment_service = PaymentService()
 
 
+def _get_order(db: Session, order_id: int, for_update: bool = False) -> Order:
+    query = db.query(Order).filter(Order.id == order_id)
+    if for_update:
+        query = query.with_for_update().populate_existing()
+    order = query.first()
+    if not order:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Order not found"
+        )
+    return order
+
+
+def _mark_payment_completed(db: Session, order_id: int):
+    # Re-read the order locked (PostgreSQL): it was loaded without a lock, maybe
+    # before a provider call, and a concurrent request or the reconciler may
+    # have completed the payment since, which must not be counted twice
+    order = _get_order(db, order_id, for_update=True)
+    if order.payment_status == PaymentStatus.COMPLETED:
+        db.commit()  # nothing to write; just release the lock (a rollback would expire the loaded order)
+        return
+    
+    old_payment_status = order.payment_status
+    order.payment_status = PaymentStatus.COMPLETED
+    StatsService.record_payment_change(db, order, old_payment_status)
+    db.commit()
+
+
 @router.post("/verify/{order_id}")
 async def verify_payment(
     order_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncDB = Depends(get_async_db),
     admin = Depends(get_current_admin)
 ):
     """Verify payment status for an order (admin only)"""
-    order = db.query(Order).filter(Order.id == order_id).first()
-    if not order:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Order not found"
-        )
+    order = await db.run_sync(_get_order, order_id)
     
     if not order.payment_method or not order.payment_reference:
         raise HTTPException(
@@ -38,8 +63,7 @@ async def verify_payment(
         
         # Update order payment status if verified
         if result.get("verified"):
-            order.payment_status = PaymentStatus.COMPLETED
-            db.commit()
+            await db.run_sync(_mark_payment_completed, order_id)
         
         return {
             "order_id": order_id,
@@ -57,24 +81,25 @@ async def verify_payment(
 @router.post("/complete/{order_id}")
 async def complete_payment_manually(
     order_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncDB = Depends(get_async_db),
     admin = Depends(get_current_admin)
 ):
     """Manually mark payment as completed (admin only)"""
-    order = db.query(Order).filter(Order.id == order_id).first()
-    if not order:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Order not found"
-        )
-    
-    order.payment_status = PaymentStatus.COMPLETED
-    db.commit()
-    db.refresh(order)
+    await db.run_sync(_mark_payment_completed, order_id)
     
     return {
         "message": "Payment marked as completed",
         "order_id": order_id,
-        "payment_status": order.payment_status.value
+        "payment_status": PaymentStatus.COMPLETED.value
     }
 
+
+@router.post("/reconcile")
+async def reconcile_payments(admin = Depends(get_current_admin)):
+    """Verify every order stuck in payment processing now (admin only)
+    
+    Runs the same pass as the background reconciler (PAYMENT_RECONCILE_ENABLED)
+    and returns how many orders were checked, completed and failed. Methods
+    whose verification is still a placeholder are skipped, not marked paid.
+    """
+    return await payment_reconciler.run_once()
@@ -1,36 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
-from typing import List
-from database import get_db
-from models import Product, User
+from typing import List, Optional
+from database import get_async_db, AsyncDB
+from models import Product
 from schemas import ProductCreate, ProductUpdate, ProductResponse
 from auth import get_current_admin
+from services.principal_cache import Principal
+from services.catalog_cache import Catalog, catalog_cache
 
 router = APIRouter(prefix="/products", tags=["Products"])
 
 
-@router.get("/", response_model=List[ProductResponse])
-async def get_products(
-    category: str = None,
-    available_only: bool = True,
-    db: Session = Depends(get_db)
-):
-    """Get all products (public endpoint)"""
-    query = db.query(Product)
-    
-    if available_only:
-        query = query.filter(Product.is_available == True)
-    
-    if category:
-        query = query.filter(Product.category == category)
-    
-    products = query.all()
-    return products
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so ignore a W/ prefix
+    return any(
+        tag.strip().removeprefix("W/") == etag
+        for tag in if_none_match.split(",")
+    )
 
 
-@router.get("/{product_id}", response_model=ProductResponse)
-async def get_product(product_id: int, db: Session = Depends(get_db)):
-    """Get a single product"""
+def _cached_response(request: Request, body: bytes, etag: str) -> Response:
+    # no-cache: clients may store the body but must revalidate, getting a 304 when unchanged
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _get_product(db: Session, product_id: int) -> Product:
     product = db.query(Product).filter(Product.id == product_id).first()
     if not product:
         raise HTTPException(
@@ -40,59 +41,92 @@ async def get_product(product_id: int, db: Session = Depends(get_db)):
     return product
 
 
-@router.post("/", response_model=ProductResponse, status_code=status.HTTP_201_CREATED)
-async def create_product(
-    product_data: ProductCreate,
-    db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin)
-):
-    """Create a new product (admin only)"""
+def _create_product(db: Session, product_data: ProductCreate) -> Product:
     product = Product(**product_data.dict())
     db.add(product)
     db.commit()
+    catalog_cache.invalidate()
     db.refresh(product)
     return product
 
 
-@router.put("/{product_id}", response_model=ProductResponse)
-async def update_product(
-    product_id: int,
-    product_data: ProductUpdate,
-    db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin)
-):
-    """Update a product (admin only)"""
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Product not found"
-        )
+def _update_product(db: Session, product_id: int, product_data: ProductUpdate) -> Product:
+    product = _get_product(db, product_id)
     
     update_data = product_data.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(product, field, value)
     
     db.commit()
+    catalog_cache.invalidate()
     db.refresh(product)
     return product
 
 
+def _delete_product(db: Session, product_id: int):
+    product = _get_product(db, product_id)
+    db.delete(product)
+    db.commit()
+    catalog_cache.invalidate()
+
+
+@router.get("/", response_model=List[ProductResponse])
+async def get_products(
+    request: Request,
+    category: str = None,
+    available_only: bool = True,
+    db: AsyncDB = Depends(get_async_db)
+):
+    """Get all products (public endpoint)
+    
+    Served from the in-process catalog cache with a strong ETag; send it back
+    in If-None-Match to get a 304 while the catalog is unchanged.
+    """
+    catalog = catalog_cache.current() or await db.run_sync(catalog_cache.get)
+    body, etag = catalog.listing(category, available_only)
+    return _cached_response(request, body, etag)
+
+
+@router.get("/{product_id}", response_model=ProductResponse)
+async def get_product(product_id: int, request: Request, db: AsyncDB = Depends(get_async_db)):
+    """Get a single product"""
+    catalog = catalog_cache.current() or await db.run_sync(catalog_cache.get)
+    cached = catalog.product(product_id)
+    if cached is None:
+        # Possibly created by another worker since the snapshot was taken
+        product = await db.run_sync(_get_product, product_id)
+        body = ProductResponse.model_validate(product).model_dump_json().encode()
+        cached = body, Catalog.etag(body)
+    return _cached_response(request, *cached)
+
+
+@router.post("/", response_model=ProductResponse, status_code=status.HTTP_201_CREATED)
+async def create_product(
+    product_data: ProductCreate,
+    db: AsyncDB = Depends(get_async_db),
+    admin: Principal = Depends(get_current_admin)
+):
+    """Create a new product (admin only)"""
+    return await db.run_sync(_create_product, product_data)
+
+
+@router.put("/{product_id}", response_model=ProductResponse)
+async def update_product(
+    product_id: int,
+    product_data: ProductUpdate,
+    db: AsyncDB = Depends(get_async_db),
+    admin: Principal = Depends(get_current_admin)
+):
+    """Update a product (admin only)"""
+    return await db.run_sync(_update_product, product_id, product_data)
+
+
 @router.delete("/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_product(
     product_id: int,
-    db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    db: AsyncDB = Depends(get_async_db),
+    admin: Principal = Depends(get_current_admin)
 ):
     """Delete a product (admin only)"""
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Product not found"
-        )
-    
-    db.delete(product)
-    db.commit()
+    await db.run_sync(_delete_product, product_id)
     return None
-
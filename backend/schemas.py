@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List
-from datetime import datetime
+from datetime import date, datetime
 from models import OrderStatus, PaymentStatus, PaymentMethod
 
 
@@ -109,6 +109,7 @@ class OrderCreate(BaseModel):
     items: List[OrderItemCreate]
     payment_method: Optional[PaymentMethod] = None
     notes: Optional[str] = None
+    pickup_time: Optional[datetime] = None  # booked into its pickup slot; None = earliest slot with room
 
 
 class OrderUpdate(BaseModel):
@@ -164,6 +165,24 @@ class OrderResponse(BaseModel):
         from_attributes = True
 
 
+class BulkStatusUpdate(BaseModel):
+    order_ids: List[int] = Field(..., min_length=1, max_length=200)
+    status: OrderStatus
+
+
+class BulkStatusResult(BaseModel):
+    order_id: int
+    success: bool
+    error: Optional[str] = None
+    order: Optional[OrderResponse] = None
+
+
+class BulkStatusResponse(BaseModel):
+    updated: int
+    failed: int
+    results: List[BulkStatusResult]
+
+
 # Payment Schemas
 class PaymentInitiate(BaseModel):
     order_id: int
@@ -192,3 +211,48 @@ class DailySalesStats(BaseModel):
     breakdown: dict  # {product_name: quantity}
     total_revenue: float
 
+
+class ProductSales(BaseModel):
+    product_id: int
+    product_name: Optional[str] = None  # None if the product has since been deleted
+    quantity: int
+    revenue: float
+    order_count: int  # orders containing the product
+
+
+class PaymentMethodSales(BaseModel):
+    payment_method: Optional[PaymentMethod] = None
+    quantity: int
+    revenue: float
+    order_count: int
+
+
+class SalesBucket(BaseModel):
+    bucket_start: datetime  # UTC
+    quantity: int
+    revenue: float
+    order_count: int
+    products: List[ProductSales]
+    payment_methods: List[PaymentMethodSales]
+
+
+class SalesReport(BaseModel):
+    start: date
+    end: date  # inclusive
+    granularity: str
+    quantity: int
+    revenue: float
+    order_count: int
+    buckets: List[SalesBucket]  # only buckets with sales, oldest first
+
+
+class PickupSlotResponse(BaseModel):
+    slot_start: datetime  # UTC
+    capacity: int  # birds
+    booked: int
+    remaining: int
+
+
+class PickupSlotCapacityUpdate(BaseModel):
+    slot_start: datetime  # any time within the slot
+    capacity: Optional[int] = Field(None, ge=0)  # None = back to PICKUP_SLOT_CAPACITY
@@ -0,0 +1,108 @@
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional, Tuple
+from models import Product
+from schemas import ProductResponse
+from config import settings
+import hashlib
+import threading
+import time
+
+
+class Catalog:
+    """Immutable snapshot of the product table.
+    
+    Each product is serialized once when the snapshot is built; list bodies
+    are assembled from those bytes on first request per filter and kept for
+    the snapshot's lifetime, together with their strong ETag.
+    """
+    
+    def __init__(self, products: List[ProductResponse]):
+        self.products: Dict[int, ProductResponse] = {product.id: product for product in products}
+        self._json: Dict[int, bytes] = {
+            product.id: product.model_dump_json().encode() for product in products
+        }
+        self._lists: Dict[Tuple[Optional[str], bool], Tuple[bytes, str]] = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def etag(body: bytes) -> str:
+        return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    
+    def product(self, product_id: int) -> Optional[Tuple[bytes, str]]:
+        """JSON body and ETag for one product, or None if it isn't in the snapshot"""
+        body = self._json.get(product_id)
+        if body is None:
+            return None
+        return body, self.etag(body)
+    
+    def listing(self, category: Optional[str], available_only: bool) -> Tuple[bytes, str]:
+        """JSON body and ETag for GET /products/ with the given filters"""
+        key = (category, available_only)
+        cached = self._lists.get(key)
+        if cached is not None:
+            return cached
+        
+        body = b"[" + b",".join(
+            self._json[product.id]
+            for product in self.products.values()
+            if (not available_only or product.is_available)
+            and (not category or product.category == category)
+        ) + b"]"
+        with self._lock:
+            return self._lists.setdefault(key, (body, self.etag(body)))
+
+
+class CatalogCache:
+    """In-process cache of the product catalog.
+    
+    The catalog is a handful of rows that change a few times a week, so the
+    whole table is loaded in one query and served from memory. Product writes
+    call `invalidate()` after committing, so this process never serves a
+    stale catalog; other worker processes pick changes up once the snapshot
+    is older than CATALOG_CACHE_TTL_SECONDS.
+    """
+    
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = ttl if ttl is not None else settings.CATALOG_CACHE_TTL_SECONDS
+        self._catalog: Optional[Catalog] = None
+        self._loaded_at = 0.0
+        self._generation = 0
+        self._lock = threading.Lock()
+    
+    def current(self) -> Optional[Catalog]:
+        """Snapshot if one is loaded and fresh, without touching the database"""
+        catalog = self._catalog
+        if catalog is not None and time.monotonic() - self._loaded_at < self.ttl:
+            return catalog
+        return None
+    
+    def get(self, db: Session) -> Catalog:
+        """Current snapshot, loading it from the database if missing or expired"""
+        catalog = self.current()
+        if catalog is not None:
+            return catalog
+        
+        generation = self._generation
+        products = [
+            ProductResponse.model_validate(product)
+            for product in db.query(Product).order_by(Product.id).all()
+        ]
+        catalog = Catalog(products)
+        
+        with self._lock:
+            # A write committed while we were loading: serve this snapshot
+            # once, but don't keep it
+            if generation == self._generation:
+                self._catalog = catalog
+                self._loaded_at = time.monotonic()
+        return catalog
+    
+    def invalidate(self):
+        """Drop the snapshot (call after committing a product change)"""
+        with self._lock:
+            self._generation += 1
+            self._catalog = None
+
+
+# Shared instance used by the products router and OrderService
+catalog_cache = CatalogCache()
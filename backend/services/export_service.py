@@ -0,0 +1,109 @@
+from typing import Dict, Iterator, List, Optional
+from datetime import datetime
+from database import SessionLocal
+from models import Order
+from responses import ORJSON_OPTIONS
+from services.order_reads import OrderReads
+import csv
+import io
+import orjson
+
+
+class ExportService:
+    """Service for streaming order history out of the database"""
+    
+    # Orders fetched per round trip; also the number of orders per emitted chunk
+    BATCH_SIZE = 500
+    
+    CSV_COLUMNS = [
+        "order_id", "order_number", "customer_name", "customer_phone", "customer_email",
+        "status", "total_amount", "payment_status", "payment_method", "payment_reference",
+        "created_at", "completed_at",
+        "item_id", "product_id", "product_name", "quantity", "unit_price", "subtotal",
+    ]
+    
+    @staticmethod
+    def _batches(
+        db,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        completed_from: Optional[datetime] = None,
+        completed_to: Optional[datetime] = None
+    ) -> Iterator[List[Dict]]:
+        """Yield orders (as OrderResponse-shaped dicts) in id order, BATCH_SIZE at a time.
+        
+        Reads go through OrderReads, so each batch is two queries over plain
+        rows and nothing accumulates in the session between batches.
+        """
+        conditions = []
+        if created_from:
+            conditions.append(Order.created_at >= created_from)
+        if created_to:
+            conditions.append(Order.created_at < created_to)
+        if completed_from:
+            conditions.append(Order.completed_at >= completed_from)
+        if completed_to:
+            conditions.append(Order.completed_at < completed_to)
+        
+        return OrderReads.batches(db, *conditions, batch_size=ExportService.BATCH_SIZE)
+    
+    @staticmethod
+    def _stream(render, **filters) -> Iterator[str]:
+        """Render orders with `render(order, buffer)` and yield one chunk per batch"""
+        db = SessionLocal()
+        try:
+            for batch in ExportService._batches(db, **filters):
+                buffer = io.StringIO()
+                for order in batch:
+                    render(order, buffer)
+                yield buffer.getvalue()
+        finally:
+            db.close()
+    
+    @staticmethod
+    def stream_ndjson(**filters) -> Iterator[str]:
+        """Stream orders as newline-delimited JSON, one order (with items) per line"""
+        def render(order: Dict, buffer: io.StringIO):
+            buffer.write(orjson.dumps(order, option=ORJSON_OPTIONS).decode())
+            buffer.write("\n")
+        
+        return ExportService._stream(render, **filters)
+    
+    @staticmethod
+    def stream_csv(**filters) -> Iterator[str]:
+        """Stream orders as CSV, one row per order item (order columns repeated)"""
+        def render(order: Dict, buffer: io.StringIO):
+            writer = csv.writer(buffer)
+            order_columns = [
+                order["id"],
+                order["order_number"],
+                order["customer_name"],
+                order["customer_phone"],
+                order["customer_email"] or "",
+                order["status"].value,
+                order["total_amount"],
+                order["payment_status"].value,
+                order["payment_method"].value if order["payment_method"] else "",
+                order["payment_reference"] or "",
+                order["created_at"].isoformat() if order["created_at"] else "",
+                order["completed_at"].isoformat() if order["completed_at"] else "",
+            ]
+            if not order["items"]:
+                writer.writerow(order_columns + [""] * 6)
+            for item in order["items"]:
+                writer.writerow(order_columns + [
+                    item["id"],
+                    item["product_id"],
+                    item["product_name"] or "",
+                    item["quantity"],
+                    item["unit_price"],
+                    item["subtotal"],
+                ])
+        
+        def with_header() -> Iterator[str]:
+            header = io.StringIO()
+            csv.writer(header).writerow(ExportService.CSV_COLUMNS)
+            yield header.getvalue()
+            yield from ExportService._stream(render, **filters)
+        
+        return with_header()
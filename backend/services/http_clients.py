@@ -0,0 +1,77 @@
+from typing import Dict, Optional, Union
+from config import settings
+import httpx
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class HttpClients:
+    """Long-lived, pooled httpx clients, one per external provider.
+    
+    Reusing a client keeps TCP+TLS connections to Hubtel, Paystack and the
+    WhatsApp Graph API alive between calls instead of paying a fresh
+    handshake (and SSL context setup) on every request. Clients are opened
+    in the app lifespan and closed on shutdown; `get` also creates them on
+    demand so standalone scripts keep working.
+    """
+    
+    PROVIDERS = ("hubtel", "paystack", "whatsapp")
+    
+    def __init__(self, verify: Union[bool, str] = True):
+        self.verify = verify  # CA bundle path for providers behind a private CA (or local stubs)
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+    
+    @staticmethod
+    def _timeout(provider: str) -> float:
+        return {
+            "hubtel": settings.HUBTEL_TIMEOUT_SECONDS,
+            "paystack": settings.PAYSTACK_TIMEOUT_SECONDS,
+            "whatsapp": settings.WHATSAPP_TIMEOUT_SECONDS,
+        }[provider]
+    
+    @staticmethod
+    def _http2_enabled() -> bool:
+        if not settings.HTTP2_ENABLED:
+            return False
+        try:
+            import h2  # noqa: F401 — optional dependency of httpx[http2]
+        except ImportError:
+            logger.warning("HTTP2_ENABLED is set but the 'h2' package is not installed; using HTTP/1.1")
+            return False
+        return True
+    
+    def _create(self, provider: str) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(self._timeout(provider), connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS),
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_POOL_MAX_KEEPALIVE,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS
+            ),
+            http2=self._http2_enabled(),
+            verify=self.verify
+        )
+    
+    def open(self):
+        """Create a client for every provider (called on app startup)"""
+        for provider in self.PROVIDERS:
+            self.get(provider)
+    
+    def get(self, provider: str) -> httpx.AsyncClient:
+        """Shared client for a provider, created on first use"""
+        client: Optional[httpx.AsyncClient] = self._clients.get(provider)
+        if client is None or client.is_closed:
+            client = self._create(provider)
+            self._clients[provider] = client
+        return client
+    
+    async def aclose(self):
+        """Close every client and its pooled connections (called on app shutdown)"""
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+
+# Shared instance opened and closed by the app lifespan in main.py
+http_clients = HttpClients()
@@ -0,0 +1,237 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from database import AsyncDB
+from models import IdempotencyKey
+from config import settings
+import asyncio
+import hashlib
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+class StoredKey(NamedTuple):
+    """What another request left under a key (response_code is None while it runs)"""
+    fingerprint: str
+    response_code: Optional[int]
+    response_body: Optional[str]
+
+
+class IdempotencyStore:
+    """Runs a request at most once per Idempotency-Key, replaying the stored response.
+    
+    Keys live in the `idempotency_keys` table, unique per (scope, key), so a
+    repeat is answered from a single indexed lookup. The first request claims
+    its key by inserting a `processing` row with a lease, runs, then stores
+    its response. Duplicates arriving meanwhile wait for it: in the same
+    process on an asyncio.Event, from other processes by re-reading the row.
+    
+    Only successful responses are stored. If the request fails the claim is
+    released, so the client's retry runs it again; a claim left behind by a
+    crashed process can be taken over once its lease expires. Keys expire
+    after IDEMPOTENCY_KEY_TTL_HOURS and are purged periodically.
+    """
+    
+    MAX_KEY_LENGTH = 255
+    POLL_INTERVAL = 0.1  # seconds between re-reads of a key held by another process
+    PURGE_INTERVAL = 600  # seconds between purges of expired keys
+    
+    def __init__(self, ttl: Optional[timedelta] = None, lock_timeout: Optional[float] = None):
+        self.ttl = ttl or timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+        self.lock_timeout = lock_timeout if lock_timeout is not None else settings.IDEMPOTENCY_LOCK_TIMEOUT_SECONDS
+        self._inflight: Dict[Tuple[str, str], asyncio.Event] = {}
+        self._last_purge = 0.0
+    
+    @staticmethod
+    def fingerprint(*parts: Any) -> str:
+        """Hash of everything that makes a request distinct (body, path params, caller)"""
+        data = json.dumps(jsonable_encoder(parts), sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(data.encode()).hexdigest()
+    
+    async def execute(
+        self,
+        db: AsyncDB,
+        key: Optional[str],
+        scope: str,
+        fingerprint: str,
+        handler: Callable[[], Awaitable[Any]],
+        status_code: int = status.HTTP_200_OK
+    ) -> Any:
+        """Run `handler` once for `key`, or replay what it returned the first time.
+        
+        Without a key the handler just runs. Reusing a key for a different
+        request is a 422; a key still in flight after IDEMPOTENCY_LOCK_TIMEOUT_SECONDS
+        is a 409 the client can retry.
+        """
+        if not key:
+            return await handler()
+        if len(key) > self.MAX_KEY_LENGTH:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{IDEMPOTENCY_KEY_HEADER} must be at most {self.MAX_KEY_LENGTH} characters"
+            )
+        
+        slot = (scope, key)
+        deadline = time.monotonic() + self.lock_timeout
+        while True:
+            inflight = self._inflight.get(slot)
+            if inflight is not None:
+                # Same key already running in this process: wait for it to finish
+                try:
+                    await asyncio.wait_for(inflight.wait(), max(deadline - time.monotonic(), 0))
+                except asyncio.TimeoutError:
+                    raise self._in_progress()
+                continue
+            
+            done = self._inflight[slot] = asyncio.Event()
+            try:
+                stored = await db.run_sync(self._claim, scope, key, fingerprint)
+                if stored is None:
+                    return await self._run(db, scope, key, handler, status_code)
+            finally:
+                del self._inflight[slot]
+                done.set()
+            
+            if stored.fingerprint != fingerprint:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail=f"{IDEMPOTENCY_KEY_HEADER} was already used for a different request"
+                )
+            if stored.response_code is not None:
+                return JSONResponse(
+                    content=json.loads(stored.response_body),
+                    status_code=stored.response_code,
+                    headers={REPLAYED_HEADER: "true"}
+                )
+            # Held by another process: re-read until it completes
+            if time.monotonic() >= deadline:
+                raise self._in_progress()
+            await asyncio.sleep(self.POLL_INTERVAL)
+    
+    async def _run(self, db: AsyncDB, scope: str, key: str, handler: Callable[[], Awaitable[Any]], status_code: int):
+        try:
+            result = await handler()
+        except Exception:
+            await db.run_sync(self._release, scope, key)
+            raise
+        
+        body = jsonable_encoder(result)
+        try:
+            await db.run_sync(self._complete, scope, key, status_code, json.dumps(body))
+        except Exception:
+            # The work is committed; a retry after the lease expires would repeat it
+            logger.exception(f"Could not store response for {IDEMPOTENCY_KEY_HEADER} {key!r} ({scope})")
+        return JSONResponse(content=body, status_code=status_code)
+    
+    def _in_progress(self) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"A request with this {IDEMPOTENCY_KEY_HEADER} is still in progress",
+            headers={"Retry-After": "1"}
+        )
+    
+    def _claim(self, db: Session, scope: str, key: str, fingerprint: str) -> Optional[StoredKey]:
+        """Claim the key (None) or return what is stored under it"""
+        now = datetime.utcnow()
+        self._maybe_purge(db, now)
+        
+        record = db.query(IdempotencyKey).filter(
+            IdempotencyKey.scope == scope,
+            IdempotencyKey.key == key
+        ).first()
+        
+        if record is None:
+            db.add(IdempotencyKey(
+                scope=scope,
+                key=key,
+                fingerprint=fingerprint,
+                status="processing",
+                locked_until=now + timedelta(seconds=self.lock_timeout),
+                created_at=now
+            ))
+            try:
+                db.commit()
+                return None
+            except IntegrityError:
+                # Another process claimed it first
+                db.rollback()
+                return self._claim(db, scope, key, fingerprint)
+        
+        expired = _naive(record.created_at) < now - self.ttl
+        abandoned = record.status == "processing" and _naive(record.locked_until) < now
+        if expired or (abandoned and record.fingerprint == fingerprint):
+            # Take over only if nobody else did since we read the row
+            taken = db.query(IdempotencyKey).filter(
+                IdempotencyKey.id == record.id,
+                IdempotencyKey.locked_until == record.locked_until
+            ).update({
+                IdempotencyKey.fingerprint: fingerprint,
+                IdempotencyKey.status: "processing",
+                IdempotencyKey.response_code: None,
+                IdempotencyKey.response_body: None,
+                IdempotencyKey.locked_until: now + timedelta(seconds=self.lock_timeout),
+                IdempotencyKey.created_at: now,
+            }, synchronize_session=False)
+            db.commit()
+            if taken:
+                return None
+            return self._claim(db, scope, key, fingerprint)
+        
+        stored = StoredKey(record.fingerprint, record.response_code, record.response_body)
+        db.rollback()  # end the read transaction so the next poll sees fresh data
+        return stored
+    
+    def _complete(self, db: Session, scope: str, key: str, response_code: int, response_body: str):
+        db.query(IdempotencyKey).filter(
+            IdempotencyKey.scope == scope,
+            IdempotencyKey.key == key
+        ).update({
+            IdempotencyKey.status: "completed",
+            IdempotencyKey.response_code: response_code,
+            IdempotencyKey.response_body: response_body,
+            IdempotencyKey.locked_until: None,
+        }, synchronize_session=False)
+        db.commit()
+    
+    def _release(self, db: Session, scope: str, key: str):
+        db.rollback()
+        db.query(IdempotencyKey).filter(
+            IdempotencyKey.scope == scope,
+            IdempotencyKey.key == key,
+            IdempotencyKey.status == "processing"
+        ).delete(synchronize_session=False)
+        db.commit()
+    
+    def _maybe_purge(self, db: Session, now: datetime):
+        if time.monotonic() - self._last_purge < self.PURGE_INTERVAL:
+            return
+        self._last_purge = time.monotonic()
+        purged = db.query(IdempotencyKey).filter(
+            IdempotencyKey.created_at < now - self.ttl
+        ).delete(synchronize_session=False)
+        db.commit()
+        if purged:
+            logger.info(f"Purged {purged} expired idempotency keys")
+
+
+def _naive(value: Optional[datetime]) -> datetime:
+    # PostgreSQL returns aware timestamps in the session time zone; they're written from utcnow()
+    if value is None:
+        return datetime.min
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+# Shared per-process instance used by the order and payment routes
+idempotency = IdempotencyStore()
@@ -0,0 +1,256 @@
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import threading
+import time
+
+# Upper bounds (seconds) for request latency and pool checkout wait buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+UNMATCHED_ROUTE = "<unmatched>"  # 404s and anything no route matched, so bad paths don't add series
+
+Sample = Tuple[str, str, str, float]  # name (without prefix), "counter" or "gauge", help text, value
+
+
+class Histogram:
+    """Fixed-bucket histogram; observe() is a bisect and two additions"""
+    
+    __slots__ = ("bounds", "counts", "sum", "count")
+    
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+    
+    def render(self, name: str, labels: str) -> List[str]:
+        lines = []
+        cumulative = 0
+        prefix = f"{labels}," if labels else ""
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{prefix}le="{bound:g}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {self.count}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {self.sum:.6f}")
+        lines.append(f"{name}_count{suffix} {self.count}")
+        return lines
+
+
+def _labels(**values) -> str:
+    escaped = (
+        (key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in values.items()
+    )
+    return ",".join(f'{key}="{value}"' for key, value in escaped)
+
+
+class Metrics:
+    """Per-process request and connection-pool metrics in Prometheus text format.
+    
+    Requests are keyed by route template (`/orders/{order_id}`), never the
+    raw path, so the number of series stays fixed. Recording takes a lock
+    and a few dict lookups; rendering happens only when /metrics is scraped.
+    Each worker process keeps its own numbers.
+    """
+    
+    PREFIX = "chickorder"
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests: Dict[Tuple[str, str, int], int] = {}
+        self._latency: Dict[Tuple[str, str], Histogram] = {}
+        self.in_progress = 0
+        self._pools: Dict[str, "PoolMetrics"] = {}
+        self._collectors: List[Callable[[], List[Sample]]] = []
+        self.started = time.time()
+    
+    def observe_request(self, method: str, route: str, status: int, seconds: float):
+        with self._lock:
+            key = (method, route, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            histogram = self._latency.get((method, route))
+            if histogram is None:
+                histogram = self._latency[(method, route)] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(seconds)
+    
+    def instrument_engine(self, engine: Engine, name: str):
+        """Track checkout wait and connections in use for an engine's pool"""
+        if name not in self._pools:
+            self._pools[name] = PoolMetrics(engine)
+    
+    def add_collector(self, collector: Callable[[], List["Sample"]]):
+        """Register a callable returning (name, type, help, value) samples, read at scrape time"""
+        self._collectors.append(collector)
+    
+    def render(self) -> str:
+        p = self.PREFIX
+        with self._lock:
+            requests = sorted(self._requests.items())
+            latency = sorted(self._latency.items())
+            in_progress = self.in_progress
+        
+        lines = [
+            f"# HELP {p}_http_requests_total Requests handled, by route template and status code",
+            f"# TYPE {p}_http_requests_total counter",
+        ]
+        for (method, route, status), count in requests:
+            lines.append(f"{p}_http_requests_total{{{_labels(method=method, route=route, status=status)}}} {count}")
+        
+        lines += [
+            f"# HELP {p}_http_request_duration_seconds Time from request start to the last byte of the response",
+            f"# TYPE {p}_http_request_duration_seconds histogram",
+        ]
+        for (method, route), histogram in latency:
+            lines += histogram.render(f"{p}_http_request_duration_seconds", _labels(method=method, route=route))
+        
+        lines += [
+            f"# HELP {p}_http_requests_in_progress Requests currently being handled",
+            f"# TYPE {p}_http_requests_in_progress gauge",
+            f"{p}_http_requests_in_progress {in_progress}",
+        ]
+        
+        if self._pools:
+            lines += [
+                f"# HELP {p}_db_pool_checkout_wait_seconds Time spent waiting for a pooled database connection",
+                f"# TYPE {p}_db_pool_checkout_wait_seconds histogram",
+            ]
+            for name, pool in self._pools.items():
+                lines += pool.wait_histogram().render(f"{p}_db_pool_checkout_wait_seconds", _labels(engine=name))
+            for metric, help_text, read in (
+                ("db_pool_connections_in_use", "Connections checked out of the pool", PoolMetrics.in_use),
+                ("db_pool_size", "Connections the pool keeps open (excluding overflow)", PoolMetrics.size),
+                ("db_pool_overflow", "Connections opened beyond the pool size", PoolMetrics.overflow),
+            ):
+                lines += [f"# HELP {p}_{metric} {help_text}", f"# TYPE {p}_{metric} gauge"]
+                for name, pool in self._pools.items():
+                    value = read(pool)
+                    if value is not None:
+                        lines.append(f"{p}_{metric}{{{_labels(engine=name)}}} {value}")
+        
+        for collector in self._collectors:
+            for name, kind, help_text, value in collector():
+                lines += [f"# HELP {p}_{name} {help_text}", f"# TYPE {p}_{name} {kind}", f"{p}_{name} {value:g}"]
+        
+        lines += [
+            f"# HELP {p}_process_start_time_seconds Unix time the process started serving",
+            f"# TYPE {p}_process_start_time_seconds gauge",
+            f"{p}_process_start_time_seconds {self.started:.0f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+class PoolMetrics:
+    """Checkout wait and in-use counts for one engine's connection pool"""
+    
+    def __init__(self, engine: Engine):
+        self.pool = engine.pool
+        self._lock = threading.Lock()
+        self._wait = Histogram(POOL_WAIT_BUCKETS)
+        self._in_use = 0
+        
+        # Pools have no "checkout requested" event, so time the pool's own
+        # acquire step, which is where a request blocks when the pool is exhausted
+        do_get = self.pool._do_get
+        
+        def timed_do_get():
+            start = time.perf_counter()
+            try:
+                return do_get()
+            finally:
+                waited = time.perf_counter() - start
+                with self._lock:
+                    self._wait.observe(waited)
+        
+        self.pool._do_get = timed_do_get
+        event.listen(self.pool, "checkout", self._checkout)
+        event.listen(self.pool, "checkin", self._checkin)
+    
+    def _checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self._in_use += 1
+    
+    def _checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self._in_use -= 1
+    
+    def wait_histogram(self) -> Histogram:
+        with self._lock:
+            snapshot = Histogram(self._wait.bounds)
+            snapshot.counts = list(self._wait.counts)
+            snapshot.sum = self._wait.sum
+            snapshot.count = self._wait.count
+            return snapshot
+    
+    def in_use(self) -> int:
+        return self._in_use
+    
+    def size(self) -> Optional[int]:
+        size = getattr(self.pool, "size", None)
+        return size() if callable(size) else None
+    
+    def overflow(self) -> Optional[int]:
+        overflow = getattr(self.pool, "overflow", None)
+        return max(overflow(), 0) if callable(overflow) else None
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request by route template.
+    
+    Written against raw ASGI rather than BaseHTTPMiddleware so it adds no
+    extra task per request and streaming responses (exports, SSE) pass
+    through untouched; their duration runs to the last byte sent.
+    """
+    
+    def __init__(self, app, registry: Metrics):
+        self.app = app
+        self.registry = registry
+        self._routes: Dict[Callable, str] = {}
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        status_code = 500
+        start = time.perf_counter()
+        
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+        
+        self.registry.in_progress += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.registry.in_progress -= 1
+            self.registry.observe_request(
+                scope["method"], self._route(scope), status_code, time.perf_counter() - start
+            )
+    
+    def _route(self, scope) -> str:
+        # The router stores the matched endpoint in the (shared) scope
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        route = self._routes.get(endpoint)
+        if route is None:
+            app = scope.get("app")
+            for candidate in getattr(app, "routes", []):
+                if getattr(candidate, "endpoint", None) is not None:
+                    self._routes[candidate.endpoint] = candidate.path
+            route = self._routes.setdefault(endpoint, UNMATCHED_ROUTE)
+        return route
+
+
+# Shared per-process registry fed by MetricsMiddleware and served at /metrics
+metrics = Metrics()
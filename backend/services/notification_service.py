@@ -1,8 +1,11 @@
-from typing import Optional
-from models import Order, OrderStatus
+from sqlalchemy.orm import Session
+from sqlalchemy import insert
+from typing import Optional, List, Dict
+from models import Order, OrderStatus, Notification
 from config import settings
+from services.http_clients import http_clients
 from twilio.rest import Client as TwilioClient
-import httpx
+import asyncio
 
 
 class NotificationService:
@@ -16,19 +19,20 @@ class NotificationService:
                 settings.TWILIO_AUTH_TOKEN
             )
     
-    async def send_order_confirmation(self, order: Order) -> bool:
-        """Send order confirmation SMS"""
-        message = (
+    @staticmethod
+    def order_confirmation_message(order: Order) -> str:
+        """Build the order confirmation SMS text"""
+        return (
             f"Order Confirmed! 🐔\n\n"
             f"Order #: {order.order_number}\n"
             f"Total: GHS {order.total_amount:.2f}\n"
             f"We are preparing your live chickens. We'll notify you when they are killed, dressed, and ready for pickup.\n\n"
             f"Thank you for your order!"
         )
-        return await self.send_sms(order.customer_phone, message)
     
-    async def send_status_update(self, order: Order) -> bool:
-        """Send order status update SMS"""
+    @staticmethod
+    def status_update_message(order: Order) -> str:
+        """Build the order status update SMS text"""
         status_messages = {
             OrderStatus.CONFIRMED: "Your order has been confirmed. We're preparing your chickens.",
             OrderStatus.READY: f"🎉 Your chickens are ready! Order #{order.order_number} has been killed, dressed, and is ready for pickup!",
@@ -36,12 +40,69 @@ class NotificationService:
             OrderStatus.CANCELLED: f"Your order #{order.order_number} has been cancelled."
         }
         
-        message = (
+        return (
             f"Order Update 🐔\n\n"
             f"Order #: {order.order_number}\n"
             f"{status_messages.get(order.status, 'Your order status has been updated.')}\n"
         )
-        return await self.send_sms(order.customer_phone, message)
+    
+    @staticmethod
+    def queue(db: Session, order: Order, message: str, notification_type: str = "sms") -> Notification:
+        """Add a notification to the outbox (committed with the caller's transaction)
+        
+        The notification worker picks it up and delivers it in the background.
+        """
+        notification = Notification(
+            order_id=order.id,
+            recipient_phone=order.customer_phone,
+            message=message,
+            notification_type=notification_type,
+            status="pending",
+            attempts=0
+        )
+        db.add(notification)
+        return notification
+    
+    @staticmethod
+    def queue_order_confirmation(db: Session, order: Order) -> Notification:
+        """Queue the order confirmation SMS"""
+        return NotificationService.queue(db, order, NotificationService.order_confirmation_message(order))
+    
+    @staticmethod
+    def queue_status_update(db: Session, order: Order) -> Notification:
+        """Queue the order status update SMS"""
+        return NotificationService.queue(db, order, NotificationService.status_update_message(order))
+    
+    @staticmethod
+    def queue_status_updates(db: Session, orders: List[Order]) -> None:
+        """Queue status update SMS for many orders with a single multi-row INSERT"""
+        if not orders:
+            return
+        db.execute(insert(Notification), [
+            {
+                "order_id": order.id,
+                "recipient_phone": order.customer_phone,
+                "message": NotificationService.status_update_message(order),
+                "notification_type": "sms",
+                "status": "pending",
+                "attempts": 0,
+            }
+            for order in orders
+        ])
+    
+    async def send_order_confirmation(self, order: Order) -> bool:
+        """Send order confirmation SMS immediately"""
+        return await self.send_sms(order.customer_phone, self.order_confirmation_message(order))
+    
+    async def send_status_update(self, order: Order) -> bool:
+        """Send order status update SMS immediately"""
+        return await self.send_sms(order.customer_phone, self.status_update_message(order))
+    
+    async def send(self, notification_type: str, phone: str, message: str) -> bool:
+        """Deliver a message over the given channel (used by the notification worker)"""
+        if notification_type == "whatsapp":
+            return await self.send_whatsapp(phone, message)
+        return await self.send_sms(phone, message)
     
     async def send_sms(self, phone: str, message: str) -> bool:
         """Send SMS via Twilio"""
@@ -50,7 +111,9 @@ class NotificationService:
             return True  # Return True in development mode
         
         try:
-            message = self.twilio_client.messages.create(
+            # The Twilio client is synchronous; keep it off the event loop
+            message = await asyncio.to_thread(
+                self.twilio_client.messages.create,
                 body=message,
                 from_=settings.TWILIO_PHONE_NUMBER,
                 to=phone
@@ -83,11 +146,34 @@ class NotificationService:
         }
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, json=payload, headers=headers, timeout=10.0)
-                response.raise_for_status()
-                return True
+            client = http_clients.get("whatsapp")
+            response = await client.post(url, json=payload, headers=headers)
+            response.raise_for_status()
+            return True
         except Exception as e:
             print(f"Error sending WhatsApp: {e}")
             return False
 
+
+class FakeNotificationProvider:
+    """In-memory stand-in for NotificationService.send, for local runs and tests
+    
+    Records every delivered message; `fail_first` makes the first N attempts
+    fail and `delay` simulates provider latency.
+    """
+    
+    def __init__(self, fail_first: int = 0, delay: float = 0.0):
+        self.sent: List[Dict] = []
+        self.attempts = 0
+        self.fail_first = fail_first
+        self.delay = delay
+    
+    async def send(self, notification_type: str, phone: str, message: str) -> bool:
+        self.attempts += 1
+        attempt = self.attempts
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if attempt <= self.fail_first:
+            return False
+        self.sent.append({"type": notification_type, "phone": phone, "message": message})
+        return True
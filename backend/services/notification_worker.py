@@ -0,0 +1,219 @@
+from typing import Optional, List, Tuple
+from datetime import datetime, timedelta
+from sqlalchemy import or_, and_
+from database import SessionLocal
+from models import Notification
+from config import settings
+from services.notification_service import NotificationService, FakeNotificationProvider
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationWorker:
+    """Background worker pool delivering rows from the notifications outbox.
+    
+    Order writes commit a pending `Notification` row and return immediately.
+    A poller claims due rows in batches and hands them to `concurrency`
+    sender tasks, which deliver through the provider and record the outcome.
+    Failed sends are retried with exponential backoff until
+    NOTIFICATION_MAX_ATTEMPTS is reached.
+    
+    Claimed rows are marked `sending` with a lease (next_attempt_at), so
+    several app processes can share one outbox, and rows held by a crashed
+    process become claimable again once the lease expires.
+    """
+    
+    BATCH_SIZE = 50
+    LEASE = timedelta(minutes=5)
+    
+    def __init__(
+        self,
+        provider=None,
+        session_factory=SessionLocal,
+        concurrency: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        retry_backoff: Optional[float] = None,
+        poll_interval: Optional[float] = None
+    ):
+        self.provider = provider
+        self.session_factory = session_factory
+        self.concurrency = concurrency or settings.NOTIFICATION_WORKERS
+        self.max_attempts = max_attempts or settings.NOTIFICATION_MAX_ATTEMPTS
+        self.retry_backoff = retry_backoff if retry_backoff is not None else settings.NOTIFICATION_RETRY_BACKOFF_SECONDS
+        self.poll_interval = poll_interval if poll_interval is not None else settings.NOTIFICATION_POLL_INTERVAL_SECONDS
+        
+        self._queue: Optional[asyncio.Queue] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self._claim_lock: Optional[asyncio.Lock] = None
+        self._stopping = False
+    
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+    
+    async def start(self):
+        """Start the poller and sender tasks on the running event loop"""
+        if self.running:
+            return
+        if self.provider is None:
+            self.provider = get_notification_provider()
+        
+        self._stopping = False
+        self._queue = asyncio.Queue(maxsize=self.BATCH_SIZE)
+        self._wakeup = asyncio.Event()
+        self._claim_lock = asyncio.Lock()
+        self._tasks = [asyncio.create_task(self._poll_loop())]
+        self._tasks += [asyncio.create_task(self._send_loop()) for _ in range(self.concurrency)]
+        logger.info(f"Notification worker started with {self.concurrency} senders")
+    
+    def wake(self):
+        """Signal that new notifications were committed (no-op if not running)"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+    
+    async def stop(self, drain: bool = True, timeout: Optional[float] = None):
+        """Stop the worker, first delivering everything currently due if `drain`"""
+        if not self.running:
+            return
+        
+        self._stopping = True
+        if drain:
+            timeout = timeout if timeout is not None else settings.NOTIFICATION_DRAIN_TIMEOUT_SECONDS
+            try:
+                await asyncio.wait_for(self.drain(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Notification worker drain timed out; undelivered rows stay in the outbox")
+        
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._wakeup = None
+    
+    async def drain(self):
+        """Deliver every notification that is due now, then return"""
+        while await self._enqueue_due():
+            pass
+        await self._queue.join()
+    
+    async def _poll_loop(self):
+        while not self._stopping:
+            try:
+                claimed = await self._enqueue_due()
+            except Exception as e:
+                logger.error(f"Notification worker poll failed: {e}")
+                claimed = 0
+            
+            if claimed >= self.BATCH_SIZE:
+                continue  # More may be waiting
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+    
+    async def _enqueue_due(self) -> int:
+        """Claim a batch of due rows and queue them for the senders"""
+        # SQLite has no row locks, so serialise claims within this process
+        async with self._claim_lock:
+            batch = await asyncio.to_thread(self._claim_due)
+        for row in batch:
+            await self._queue.put(row)
+        return len(batch)
+    
+    async def _send_loop(self):
+        while True:
+            notification_id, notification_type, phone, message, attempts = await self._queue.get()
+            try:
+                error = None
+                try:
+                    delivered = await self.provider.send(notification_type, phone, message)
+                except Exception as e:
+                    delivered = False
+                    error = str(e)
+                await asyncio.to_thread(self._record_result, notification_id, attempts + 1, delivered, error)
+            except Exception as e:
+                logger.error(f"Notification {notification_id} could not be recorded: {e}")
+            finally:
+                self._queue.task_done()
+    
+    def _claim_due(self) -> List[Tuple[int, str, str, str, int]]:
+        """Mark up to BATCH_SIZE due rows as `sending` and return them"""
+        now = datetime.utcnow()
+        db = self.session_factory()
+        try:
+            due = db.query(Notification).filter(
+                or_(
+                    and_(
+                        Notification.status == "pending",
+                        or_(Notification.next_attempt_at.is_(None), Notification.next_attempt_at <= now)
+                    ),
+                    # Lease expired: the process that claimed it died mid-send
+                    and_(Notification.status == "sending", Notification.next_attempt_at <= now)
+                )
+            ).order_by(Notification.id).limit(self.BATCH_SIZE).with_for_update(skip_locked=True).all()
+            
+            batch = []
+            for notification in due:
+                notification.status = "sending"
+                notification.next_attempt_at = now + self.LEASE
+                batch.append((
+                    notification.id,
+                    notification.notification_type,
+                    notification.recipient_phone,
+                    notification.message,
+                    notification.attempts or 0
+                ))
+            db.commit()
+            return batch
+        finally:
+            db.close()
+    
+    def _record_result(self, notification_id: int, attempts: int, delivered: bool, error: Optional[str]):
+        """Mark a row sent, schedule its retry, or give up on it"""
+        now = datetime.utcnow()
+        values = {Notification.attempts: attempts}
+        if delivered:
+            values.update({
+                Notification.status: "sent",
+                Notification.sent_at: now,
+                Notification.next_attempt_at: None,
+                Notification.last_error: None
+            })
+        elif attempts >= self.max_attempts:
+            values.update({
+                Notification.status: "failed",
+                Notification.next_attempt_at: None,
+                Notification.last_error: error or "Provider rejected the message"
+            })
+        else:
+            backoff = self.retry_backoff * (2 ** (attempts - 1))
+            values.update({
+                Notification.status: "pending",
+                Notification.next_attempt_at: now + timedelta(seconds=backoff),
+                Notification.last_error: error or "Provider rejected the message"
+            })
+        
+        db = self.session_factory()
+        try:
+            db.query(Notification).filter(Notification.id == notification_id).update(
+                values, synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+
+def get_notification_provider():
+    """Provider selected by NOTIFICATION_PROVIDER"""
+    if settings.NOTIFICATION_PROVIDER == "fake":
+        return FakeNotificationProvider()
+    return NotificationService()
+
+
+# Shared instance started and drained by the app lifespan in main.py
+notification_worker = NotificationWorker()
@@ -0,0 +1,148 @@
+from collections import deque
+from itertools import islice
+from typing import AsyncIterator, Deque, List, Optional, Tuple
+from models import Order
+from schemas import OrderResponse
+from config import settings
+import asyncio
+import threading
+import time
+
+
+class OrderFeed:
+    """In-process broadcast of committed order changes, served as Server-Sent Events.
+    
+    OrderService publishes each change right after its commit, with the order
+    it already reloaded, so an event is serialized once and every subscriber
+    receives the same bytes; subscribers never query the database.
+    
+    Recent events are kept in a bounded ring buffer. Event ids are
+    `<boot>-<seq>`, so a client reconnecting with Last-Event-ID gets what it
+    missed from the buffer. If the id comes from an earlier process, or is
+    older than the buffer, the client gets a `reset` event instead and
+    should refetch the pending orders.
+    
+    Events are only seen by subscribers of the process that committed the
+    change, so the board should be served from a single worker (the default
+    start.sh setup).
+    """
+    
+    ORDER_CREATED = "order_created"
+    ORDER_STATUS_CHANGED = "order_status_changed"
+    RESET = "reset"
+    
+    def __init__(
+        self,
+        buffer_size: Optional[int] = None,
+        keepalive: Optional[float] = None,
+        max_stream: Optional[float] = None
+    ):
+        self.keepalive = keepalive if keepalive is not None else settings.ORDER_FEED_KEEPALIVE_SECONDS
+        self.max_stream = max_stream if max_stream is not None else settings.ORDER_FEED_MAX_STREAM_SECONDS
+        self.boot = format(int(time.time()), "x")
+        
+        self._buffer: Deque[Tuple[int, bytes]] = deque(maxlen=buffer_size or settings.ORDER_FEED_BUFFER_SIZE)
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._changed: Optional[asyncio.Event] = None
+        self._closed = False
+        self.subscribers = 0
+    
+    def start(self):
+        """Bind to the running event loop (called on app startup)"""
+        self._loop = asyncio.get_running_loop()
+        self._changed = asyncio.Event()
+        self._closed = False
+    
+    def close(self):
+        """End every open stream (called on app shutdown)"""
+        self._closed = True
+        self._notify()
+    
+    def publish(self, event_type: str, order: Order):
+        """Broadcast a committed change; safe to call from any thread"""
+        data = OrderResponse.from_orm_with_items(order).model_dump_json()
+        with self._lock:
+            self._seq += 1
+            message = (
+                f"id: {self.boot}-{self._seq}\n"
+                f"event: {event_type}\n"
+                f"data: {data}\n\n"
+            ).encode()
+            self._buffer.append((self._seq, message))
+        
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._notify)
+    
+    def _notify(self):
+        # Wake everyone waiting on the current event, then arm a fresh one
+        changed, self._changed = self._changed, asyncio.Event()
+        if changed is not None:
+            changed.set()
+    
+    def _position(self, last_event_id: Optional[str]) -> Optional[int]:
+        """Sequence number to resume after, or None if the client must reset"""
+        with self._lock:
+            head = self._seq
+            oldest = self._buffer[0][0] if self._buffer else head + 1
+        if not last_event_id:
+            return head
+        
+        boot, _, seq = last_event_id.partition("-")
+        if boot != self.boot or not seq.isdigit():
+            return None
+        seq = int(seq)
+        if seq > head or seq < oldest - 1:
+            return None
+        return seq
+    
+    def _since(self, seq: int) -> List[Tuple[int, bytes]]:
+        with self._lock:
+            if not self._buffer:
+                return []
+            start = max(seq - self._buffer[0][0] + 1, 0)
+            return list(islice(self._buffer, start, None))
+    
+    async def subscribe(self, last_event_id: Optional[str] = None) -> AsyncIterator[bytes]:
+        """Yield SSE messages from `last_event_id` on, with keepalive comments.
+        
+        The stream ends after ORDER_FEED_MAX_STREAM_SECONDS; EventSource
+        reconnects with Last-Event-ID and resumes where it left off, which
+        also keeps long-lived connections from holding up a shutdown.
+        """
+        if self._loop is not asyncio.get_running_loop():
+            self.start()
+        
+        self.subscribers += 1
+        try:
+            yield b"retry: 3000\n\n"
+            
+            seq = self._position(last_event_id)
+            if seq is None:
+                seq = self._position(None)
+                yield (
+                    f"id: {self.boot}-{seq}\n"
+                    f"event: {self.RESET}\n"
+                    "data: {}\n\n"
+                ).encode()
+            
+            deadline = time.monotonic() + self.max_stream
+            while not self._closed and time.monotonic() < deadline:
+                changed = self._changed
+                events = self._since(seq)
+                if events:
+                    seq = events[-1][0]
+                    yield b"".join(message for _, message in events)
+                    continue
+                
+                try:
+                    await asyncio.wait_for(changed.wait(), self.keepalive)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+        finally:
+            self.subscribers -= 1
+
+
+# Shared instance fed by OrderService and started by the app lifespan
+order_feed = OrderFeed()
@@ -0,0 +1,137 @@
+from datetime import datetime, timezone
+from typing import Optional
+from config import settings
+import logging
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, ORDER_NUMBER_WORKER_ID must be set
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class OrderNumberGenerator:
+    """Unique `CHK-YYYYMMDD-XXXXXX` order numbers without asking the database.
+    
+    The six base-36 characters encode (second of the UTC day, worker, sequence):
+        
+        value = (second * WORKERS + worker) * SEQUENCE + sequence
+    
+    86400 seconds x 64 workers x 256 numbers fits in 36^6, so two numbers can
+    only match if the same worker issued the same sequence in the same second,
+    which the generator never does:
+    
+    - The clock is logical: it never goes backwards, and when a worker uses
+      up a second's 256 numbers it moves on to the next second early.
+    - Each process holds a distinct worker slot. Slots are claimed with an
+      flock on a per-slot file, so processes on one host never share one, and
+      a slot is freed when its process exits. Deployments spanning several
+      hosts pin ORDER_NUMBER_WORKER_ID per process instead (still locked, so
+      a duplicate on the same host fails loudly).
+    - The slot file records the last second used, so a process that takes
+      over a slot resumes after its predecessor, even if that one had run
+      ahead of the wall clock.
+    
+    Numbers from one worker sort in issue order within a day.
+    """
+    
+    PREFIX = "CHK"
+    WORKERS = 64
+    SEQUENCE = 256
+    ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    WIDTH = 6
+    
+    def __init__(self, worker_id: Optional[int] = None, lock_dir: Optional[str] = None):
+        self.worker_id = worker_id if worker_id is not None else settings.ORDER_NUMBER_WORKER_ID
+        self.lock_dir = lock_dir or settings.ORDER_NUMBER_LOCK_DIR or os.path.join(
+            tempfile.gettempdir(), "chickorder-order-numbers"
+        )
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._worker: Optional[int] = None
+        self._slot_fd: Optional[int] = None
+        self._second = 0  # logical clock, unix seconds
+        self._sequence = 0
+    
+    def _claim_worker(self):
+        """Pick this process's worker slot (again after a fork)"""
+        if self._slot_fd is not None and self._pid != os.getpid():
+            # Inherited from the parent, which keeps holding that slot's lock
+            os.close(self._slot_fd)
+            self._slot_fd = None
+        
+        if self.worker_id is not None:
+            if not 0 <= self.worker_id < self.WORKERS:
+                raise ValueError(f"ORDER_NUMBER_WORKER_ID must be between 0 and {self.WORKERS - 1}")
+            slots = [self.worker_id]
+        elif fcntl is None:
+            raise RuntimeError("ORDER_NUMBER_WORKER_ID must be set on platforms without fcntl")
+        else:
+            slots = range(self.WORKERS)
+        
+        last_second = 0
+        if fcntl is None:
+            self._worker = self.worker_id
+        else:
+            os.makedirs(self.lock_dir, exist_ok=True)
+            for slot in slots:
+                fd = os.open(os.path.join(self.lock_dir, f"worker-{slot}"), os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    os.close(fd)
+                    continue
+                self._worker = slot
+                self._slot_fd = fd
+                last_second = int(os.pread(fd, 32, 0).decode().strip() or 0)
+                break
+            else:
+                if self.worker_id is not None:
+                    raise RuntimeError(f"Order number worker {self.worker_id} is already in use on this host")
+                raise RuntimeError(f"All {self.WORKERS} order number worker slots are in use")
+        
+        self._pid = os.getpid()
+        self._advance(max(int(time.time()), last_second + 1))
+        logger.info(f"Order numbers: worker slot {self._worker}")
+    
+    def _advance(self, second: int):
+        """Move the logical clock to `second` and record it for successors"""
+        self._second = second
+        self._sequence = 0
+        if self._slot_fd is not None:
+            os.pwrite(self._slot_fd, str(second).encode().ljust(32), 0)
+    
+    def next(self) -> str:
+        """Issue the next order number"""
+        with self._lock:
+            if self._pid != os.getpid():
+                self._claim_worker()
+            
+            now = int(time.time())
+            if now > self._second:
+                self._advance(now)
+            elif self._sequence >= self.SEQUENCE:
+                # Out of numbers for this second: borrow the next one
+                self._advance(self._second + 1)
+            
+            second, sequence = self._second, self._sequence
+            self._sequence += 1
+        
+        day = datetime.fromtimestamp(second, tz=timezone.utc)
+        second_of_day = day.hour * 3600 + day.minute * 60 + day.second
+        value = (second_of_day * self.WORKERS + self._worker) * self.SEQUENCE + sequence
+        
+        digits = []
+        for _ in range(self.WIDTH):
+            value, digit = divmod(value, len(self.ALPHABET))
+            digits.append(self.ALPHABET[digit])
+        return f"{self.PREFIX}-{day.strftime('%Y%m%d')}-{''.join(reversed(digits))}"
+
+
+# Shared per-process instance used by OrderService
+order_numbers = OrderNumberGenerator()
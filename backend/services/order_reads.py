@@ -0,0 +1,111 @@
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from sqlalchemy import select
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+from models import Order, OrderItem, Product
+from pagination import paginate_select
+
+# Columns read for an order and for an item, in OrderResponse / OrderItemResponse field order
+ORDER_COLUMNS = (
+    Order.id, Order.order_number, Order.customer_id, Order.customer_name, Order.customer_phone,
+    Order.customer_email, Order.status, Order.total_amount, Order.payment_status, Order.payment_method,
+    Order.payment_reference, Order.notes, Order.pickup_time, Order.created_at, Order.updated_at,
+    Order.completed_at,
+)
+ITEM_COLUMNS = (
+    OrderItem.order_id, OrderItem.id, OrderItem.product_id, Product.name, OrderItem.quantity,
+    OrderItem.unit_price, OrderItem.customization, OrderItem.subtotal,
+)
+
+
+class OrderReads:
+    """Read-only order queries for list and report endpoints, bypassing the ORM.
+    
+    Selects just the response columns with Core select() and turns the rows
+    straight into OrderResponse-shaped dicts (serialize them with
+    ORJSONResponse), so no Order, OrderItem or Product objects are built,
+    tracked in the identity map or validated. A page of orders is two
+    statements: the orders, then all of their items with product names.
+    
+    Only for output; anything that changes orders goes through OrderService.
+    """
+    
+    @staticmethod
+    def page(
+        db: Session,
+        cursor: Optional[str],
+        limit: int,
+        *conditions: ColumnElement,
+        descending: bool = True
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """One keyset page of orders matching `conditions`, with items, and the next cursor"""
+        stmt = select(*ORDER_COLUMNS).where(*conditions)
+        rows, next_cursor = paginate_select(db, stmt, Order, cursor, limit, descending=descending)
+        return OrderReads.with_items(db, rows), next_cursor
+    
+    @staticmethod
+    def batches(db: Session, *conditions: ColumnElement, batch_size: int = 500) -> Iterator[List[Dict]]:
+        """All orders matching `conditions` in id order, `batch_size` at a time"""
+        after_id = 0
+        while True:
+            rows = db.execute(
+                select(*ORDER_COLUMNS).where(*conditions, Order.id > after_id).order_by(Order.id).limit(batch_size)
+            ).all()
+            if not rows:
+                return
+            yield OrderReads.with_items(db, rows)
+            if len(rows) < batch_size:
+                return
+            after_id = rows[-1].id
+    
+    @staticmethod
+    def with_items(db: Session, rows: Sequence[Row]) -> List[Dict]:
+        """Order rows (selected with ORDER_COLUMNS) as dicts, their items loaded in one query"""
+        if not rows:
+            return []
+        
+        items: Dict[int, List[Dict]] = {row.id: [] for row in rows}
+        item_rows = db.execute(
+            select(*ITEM_COLUMNS)
+            .outerjoin(Product, OrderItem.product_id == Product.id)
+            .where(OrderItem.order_id.in_(list(items)))
+            .order_by(OrderItem.order_id, OrderItem.id)
+        )
+        for order_id, item_id, product_id, product_name, quantity, unit_price, customization, subtotal in item_rows:
+            items[order_id].append({
+                "id": item_id,
+                "product_id": product_id,
+                "product_name": product_name,
+                "quantity": quantity,
+                "unit_price": float(unit_price),
+                "customization": customization,
+                "subtotal": float(subtotal),
+            })
+        
+        return [
+            {
+                "id": order_id,
+                "order_number": order_number,
+                "customer_id": customer_id,
+                "customer_name": customer_name,
+                "customer_phone": customer_phone,
+                "customer_email": customer_email,
+                "status": status,
+                "total_amount": float(total_amount),
+                "payment_status": payment_status,
+                "payment_method": payment_method,
+                "payment_reference": payment_reference,
+                "notes": notes,
+                "pickup_time": pickup_time,
+                "items": items[order_id],
+                "created_at": created_at,
+                "updated_at": updated_at,
+                "completed_at": completed_at,
+            }
+            for (
+                order_id, order_number, customer_id, customer_name, customer_phone, customer_email, status,
+                total_amount, payment_status, payment_method, payment_reference, notes, pickup_time,
+                created_at, updated_at, completed_at,
+            ) in rows
+        ]
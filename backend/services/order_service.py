@@ -1,31 +1,74 @@
-from sqlalchemy.orm import Session
-from typing import Optional
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import func, insert
+from typing import Dict, List, Optional, Tuple
 from models import Order, OrderItem, Product, OrderStatus, PaymentStatus
 from schemas import OrderCreate, OrderUpdate
+from services.stats_service import StatsService
+from services.sales_rollup_service import SalesRollupService
+from services.notification_service import NotificationService
+from services.catalog_cache import catalog_cache
+from services.order_numbers import order_numbers
+from services.order_feed import order_feed, OrderFeed
+from services.pickup_slots import pickup_slots, Booking
 from datetime import datetime
-import random
-import string
 
 
 class OrderService:
     """Service for order management and state machine"""
     
+    # State machine validation - simplified flow
+    VALID_TRANSITIONS = {
+        OrderStatus.PENDING: [OrderStatus.CONFIRMED, OrderStatus.CANCELLED],
+        OrderStatus.CONFIRMED: [OrderStatus.READY, OrderStatus.CANCELLED],
+        OrderStatus.READY: [OrderStatus.COMPLETED],
+        OrderStatus.COMPLETED: [],
+        OrderStatus.CANCELLED: []
+    }
+    
     @staticmethod
     def generate_order_number() -> str:
-        """Generate unique order number"""
-        timestamp = datetime.now().strftime("%Y%m%d")
-        random_str = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-        return f"CHK-{timestamp}-{random_str}"
+        """Generate unique order number (see OrderNumberGenerator)"""
+        return order_numbers.next()
+    
+    @staticmethod
+    def get_order_with_items(db: Session, order_id: int) -> Optional[Order]:
+        """Load an order with its items and their products in a single query"""
+        return db.query(Order).options(
+            joinedload(Order.items).joinedload(OrderItem.product)
+        ).filter(Order.id == order_id).one_or_none()
     
     @staticmethod
-    def create_order(db: Session, order_data: OrderCreate, customer_id: Optional[int] = None) -> Order:
-        """Create a new order"""
+    def create_order(
+        db: Session,
+        order_data: OrderCreate,
+        customer_id: Optional[int] = None,
+        use_catalog_cache: bool = True
+    ) -> Order:
+        """Create a new order
+        
+        Items are priced from the in-process catalog cache; products missing
+        from it (e.g. created by another worker) are resolved in one query.
+        """
+        product_ids = {item_data.product_id for item_data in order_data.items}
+        products = {}
+        if use_catalog_cache and product_ids:
+            catalog = catalog_cache.get(db)
+            products = {pid: catalog.products[pid] for pid in product_ids if pid in catalog.products}
+        
+        # Resolve the rest in one query instead of one per line item
+        missing_ids = product_ids - products.keys()
+        if missing_ids:
+            products.update({
+                product.id: product
+                for product in db.query(Product).filter(Product.id.in_(missing_ids)).all()
+            })
+        
         # Calculate total and create order items
         total_amount = 0.0
         order_items_data = []
         
         for item_data in order_data.items:
-            product = db.query(Product).filter(Product.id == item_data.product_id).first()
+            product = products.get(item_data.product_id)
             if not product:
                 raise ValueError(f"Product with id {item_data.product_id} not found")
             if not product.is_available:
@@ -35,13 +78,18 @@ class OrderService:
             total_amount += subtotal
             
             order_items_data.append({
-                "product": product,
+                "product_id": product.id,
                 "quantity": item_data.quantity,
                 "unit_price": product.price,
                 "customization": item_data.customization,
                 "subtotal": subtotal
             })
         
+        # Reserve kitchen capacity in the pickup slot; rolled back with the order if anything fails
+        booking = pickup_slots.book(
+            db, sum(item_data["quantity"] for item_data in order_items_data), order_data.pickup_time
+        )
+        
         # Create order
         order = Order(
             order_number=OrderService.generate_order_number(),
@@ -53,28 +101,41 @@ class OrderService:
             total_amount=total_amount,
             payment_status=PaymentStatus.PENDING,
             payment_method=order_data.payment_method,
-            notes=order_data.notes
+            notes=order_data.notes,
+            pickup_time=booking.slot_start
         )
         
         db.add(order)
         db.flush()  # Get order ID
+        order_id = order.id
         
-        # Create order items
-        for item_data in order_items_data:
-            order_item = OrderItem(
-                order_id=order.id,
-                product_id=item_data["product"].id,
-                quantity=item_data["quantity"],
-                unit_price=item_data["unit_price"],
-                customization=item_data["customization"],
-                subtotal=item_data["subtotal"]
-            )
-            db.add(order_item)
+        # Create all order items in a single multi-row INSERT
+        if order_items_data:
+            for item_data in order_items_data:
+                item_data["order_id"] = order_id
+            db.execute(insert(OrderItem), order_items_data)
         
+        StatsService.record_order_created(db, order)
+        NotificationService.queue_order_confirmation(db, order)
         db.commit()
-        db.refresh(order)
+        pickup_slots.record([booking])
+        
+        order = OrderService.get_order_with_items(db, order_id)
+        order_feed.publish(OrderFeed.ORDER_CREATED, order)
         return order
     
+    @staticmethod
+    def _release_pickup_slots(db: Session, orders: List[Order]) -> List[Booking]:
+        """Free the pickup slot capacity held by cancelled orders; returns releases to record after commit"""
+        slots = {order.id: order.pickup_time for order in orders if order.pickup_time}
+        if not slots:
+            return []
+        
+        birds = db.query(OrderItem.order_id, func.sum(OrderItem.quantity)).filter(
+            OrderItem.order_id.in_(list(slots))
+        ).group_by(OrderItem.order_id)
+        return pickup_slots.release(db, [Booking(slots[order_id], quantity) for order_id, quantity in birds])
+    
     @staticmethod
     def update_order_status(
         db: Session,
@@ -83,24 +144,19 @@ class OrderService:
         payment_status: Optional[PaymentStatus] = None
     ) -> Order:
         """Update order status with state machine validation"""
-        order = db.query(Order).filter(Order.id == order_id).first()
+        # Lock the row (PostgreSQL) so two concurrent changes can't both pass the
+        # transition check and apply the stats/rollup deltas or slot release twice
+        order = db.query(Order).filter(Order.id == order_id).with_for_update().first()
         if not order:
             raise ValueError("Order not found")
         
-        # State machine validation - simplified flow
-        valid_transitions = {
-            OrderStatus.PENDING: [OrderStatus.CONFIRMED, OrderStatus.CANCELLED],
-            OrderStatus.CONFIRMED: [OrderStatus.READY, OrderStatus.CANCELLED],
-            OrderStatus.READY: [OrderStatus.COMPLETED],
-            OrderStatus.COMPLETED: [],
-            OrderStatus.CANCELLED: []
-        }
-        
-        if status not in valid_transitions.get(order.status, []):
+        if status not in OrderService.VALID_TRANSITIONS.get(order.status, []):
             raise ValueError(
                 f"Invalid status transition from {order.status.value} to {status.value}"
             )
         
+        old_status = order.status
+        old_payment_status = order.payment_status
         order.status = status
         
         if status == OrderStatus.COMPLETED:
@@ -110,7 +166,87 @@ class OrderService:
             order.payment_status = payment_status
         
         order.updated_at = datetime.utcnow()
+        
+        # Slot rows before the stats row, the order create_order locks them in,
+        # so a cancellation and a booking of the same slot can't deadlock
+        released = []
+        if status == OrderStatus.CANCELLED:
+            released = OrderService._release_pickup_slots(db, [order])
+        StatsService.record_status_change(db, order, old_status)
+        StatsService.record_payment_change(db, order, old_payment_status)
+        if status == OrderStatus.COMPLETED:
+            SalesRollupService.record_completed(db, [order])
+        NotificationService.queue_status_update(db, order)
         db.commit()
-        db.refresh(order)
+        pickup_slots.record(released)
+        
+        order = OrderService.get_order_with_items(db, order_id)
+        order_feed.publish(OrderFeed.ORDER_STATUS_CHANGED, order)
         return order
-
+    
+    @staticmethod
+    def bulk_update_status(
+        db: Session,
+        order_ids: List[int],
+        status: OrderStatus
+    ) -> Tuple[Dict[int, Order], Dict[int, str]]:
+        """Move many orders to `status` in one transaction
+        
+        Every order is validated against the state machine first; the valid
+        ones are changed with a single UPDATE, and their stats and status SMS
+        are written with one statement each. Returns the updated orders (with
+        items) and an error message for each order left unchanged, both keyed
+        by order id.
+        """
+        order_ids = list(dict.fromkeys(order_ids))
+        
+        # Lock the rows (PostgreSQL) so nothing moves them between validation and the UPDATE
+        orders = {
+            order.id: order
+            for order in db.query(Order).filter(Order.id.in_(order_ids)).order_by(Order.id).with_for_update()
+        }
+        
+        errors = {}
+        changes = []
+        for order_id in order_ids:
+            order = orders.get(order_id)
+            if not order:
+                errors[order_id] = "Order not found"
+            elif status not in OrderService.VALID_TRANSITIONS.get(order.status, []):
+                errors[order_id] = f"Invalid status transition from {order.status.value} to {status.value}"
+            else:
+                changes.append((order, order.status))
+        
+        if not changes:
+            db.rollback()
+            return {}, errors
+        
+        now = datetime.utcnow()
+        values = {Order.status: status, Order.updated_at: now}
+        if status == OrderStatus.COMPLETED:
+            values[Order.completed_at] = now
+        
+        # "evaluate" applies the new values to the loaded orders without per-row UPDATEs
+        changed_ids = [order.id for order, _ in changes]
+        db.query(Order).filter(Order.id.in_(changed_ids)).update(values, synchronize_session="evaluate")
+        
+        # Slot rows before the stats row, as in create_order (see update_order_status)
+        released = []
+        if status == OrderStatus.CANCELLED:
+            released = OrderService._release_pickup_slots(db, [order for order, _ in changes])
+        StatsService.record_status_changes(db, changes)
+        if status == OrderStatus.COMPLETED:
+            SalesRollupService.record_completed(db, [order for order, _ in changes])
+        NotificationService.queue_status_updates(db, [order for order, _ in changes])
+        db.commit()
+        pickup_slots.record(released)
+        
+        updated = {
+            order.id: order
+            for order in db.query(Order).options(
+                selectinload(Order.items).joinedload(OrderItem.product)
+            ).filter(Order.id.in_(changed_ids))
+        }
+        for order_id in changed_ids:
+            order_feed.publish(OrderFeed.ORDER_STATUS_CHANGED, updated[order_id])
+        return updated, errors
@@ -0,0 +1,116 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple, TypeVar
+from config import settings
+import asyncio
+import threading
+import time
+
+T = TypeVar("T")
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing queue is full"""
+
+
+class PasswordHasher:
+    """Bounded thread pool for bcrypt hashing and verification.
+    
+    A bcrypt call costs a few hundred milliseconds of CPU. The bcrypt
+    library releases the GIL while it works, so running it in a thread keeps
+    the event loop free for other requests. The pool size caps how many
+    hashes run at once, and at most `max_queue` more may wait behind them;
+    beyond that `run` raises PasswordHasherBusy instead of letting a login
+    burst queue without limit.
+    """
+    
+    def __init__(self, workers: Optional[int] = None, max_queue: Optional[int] = None):
+        self.workers = workers or settings.PASSWORD_HASH_WORKERS
+        self.max_queue = max_queue if max_queue is not None else settings.PASSWORD_HASH_MAX_QUEUE
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        
+        self.queued = 0
+        self.in_flight = 0
+        self.peak_queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds_total = 0.0
+        self.run_seconds_total = 0.0
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+    
+    async def run(self, fn: Callable[..., T], *args) -> T:
+        """Run a hashing call in the pool and await its result"""
+        with self._lock:
+            if self.queued + self.in_flight >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise PasswordHasherBusy("Password hashing queue is full")
+            self.queued += 1
+            self.peak_queued = max(self.peak_queued, self.queued)
+            executor = self._get_executor()
+        
+        enqueued_at = time.perf_counter()
+        
+        def job():
+            started_at = time.perf_counter()
+            with self._lock:
+                self.queued -= 1
+                self.in_flight += 1
+                self.wait_seconds_total += started_at - enqueued_at
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+                    self.completed += 1
+                    self.run_seconds_total += time.perf_counter() - started_at
+        
+        def on_done(future: Future):
+            # Cancelled before a worker picked it up, so job() never ran
+            if future.cancelled():
+                with self._lock:
+                    self.queued -= 1
+        
+        future = executor.submit(job)
+        future.add_done_callback(on_done)
+        return await asyncio.wrap_future(future)
+    
+    def stats(self) -> dict:
+        """Queue depth and timing counters"""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "queued": self.queued,
+                "in_flight": self.in_flight,
+                "peak_queued": self.peak_queued,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_wait_ms": self.wait_seconds_total / self.completed * 1000 if self.completed else 0.0,
+                "avg_run_ms": self.run_seconds_total / self.completed * 1000 if self.completed else 0.0,
+            }
+    
+    def samples(self) -> List[Tuple[str, str, str, float]]:
+        """Counters and gauges for /metrics"""
+        with self._lock:
+            return [
+                ("password_hash_queued", "gauge", "Hashing calls waiting for a bcrypt worker", self.queued),
+                ("password_hash_in_flight", "gauge", "Hashing calls running on a bcrypt worker", self.in_flight),
+                ("password_hash_completed_total", "counter", "Hashing calls completed", self.completed),
+                ("password_hash_rejected_total", "counter", "Hashing calls rejected with 503 (queue full)", self.rejected),
+                ("password_hash_wait_seconds_total", "counter", "Time hashing calls spent queued", self.wait_seconds_total),
+                ("password_hash_run_seconds_total", "counter", "Time spent hashing", self.run_seconds_total),
+            ]
+    
+    def close(self):
+        """Stop the pool (called on app shutdown)"""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Shared instance used by the auth helpers and closed by the app lifespan
+password_hasher = PasswordHasher()
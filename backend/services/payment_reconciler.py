@@ -0,0 +1,260 @@
+from typing import Dict, List, NamedTuple, Optional
+from datetime import datetime, timedelta, timezone
+from database import SessionLocal
+from models import Order, PaymentMethod, PaymentStatus
+from config import settings
+from services.payment_service import PaymentService
+from services.stats_service import StatsService
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+# Payment method -> provider that verifies it (the PAYMENT_RECONCILE_RATE_LIMITS key);
+# mobile money is collected through Hubtel
+PROVIDERS = {
+    PaymentMethod.MOBILE_MONEY: "hubtel",
+    PaymentMethod.HUBTEL: "hubtel",
+    PaymentMethod.PAYSTACK: "paystack",
+}
+
+
+class PendingPayment(NamedTuple):
+    order_id: int
+    payment_reference: Optional[str]
+    payment_method: Optional[PaymentMethod]
+    initiated_at: Optional[datetime]  # naive UTC
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart (rate <= 0 means unlimited)"""
+    
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+    
+    async def acquire(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        slot = max(now, self._next)
+        self._next = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class PaymentReconciler:
+    """Background job settling orders stuck in payment PROCESSING.
+    
+    Every `interval` seconds it walks the PROCESSING orders in id order, a
+    batch at a time, and verifies each with the provider (PaymentService by
+    default) concurrently: at most `concurrency` calls in flight overall and
+    no more than the configured rate per payment provider. Each batch is
+    written back in one transaction: verified payments become COMPLETED,
+    payments still unverified `max_age` after initiation become FAILED, and
+    the rest are checked again on the next pass. Payment methods the
+    verifier can't really check (its VERIFIED_METHODS) are skipped and left
+    PROCESSING for an admin to verify by hand.
+    
+    With PaymentService as the verifier this settles nothing today: only
+    Paystack is verified for real, and initiate_payment doesn't accept
+    Paystack yet, so every PROCESSING order (mobile money) is skipped. The
+    job is in place for when Hubtel verification is implemented.
+    
+    Write-back only touches orders that are still PROCESSING, so it is safe
+    alongside admins verifying by hand or several app processes reconciling
+    (which would only duplicate provider calls).
+    """
+    
+    BATCH_SIZE = 100
+    
+    def __init__(
+        self,
+        verifier=None,
+        session_factory=SessionLocal,
+        concurrency: Optional[int] = None,
+        rate_limits: Optional[Dict[str, float]] = None,
+        default_rate_limit: Optional[float] = None,
+        interval: Optional[float] = None,
+        min_age: Optional[timedelta] = None,
+        max_age: Optional[timedelta] = None
+    ):
+        self.verifier = verifier
+        self.session_factory = session_factory
+        self.concurrency = concurrency or settings.PAYMENT_RECONCILE_CONCURRENCY
+        self.rate_limits = rate_limits if rate_limits is not None else settings.PAYMENT_RECONCILE_RATE_LIMITS
+        self.default_rate_limit = (
+            default_rate_limit if default_rate_limit is not None else settings.PAYMENT_RECONCILE_DEFAULT_RATE_LIMIT
+        )
+        self.interval = interval if interval is not None else settings.PAYMENT_RECONCILE_INTERVAL_SECONDS
+        self.min_age = min_age if min_age is not None else timedelta(seconds=settings.PAYMENT_RECONCILE_MIN_AGE_SECONDS)
+        self.max_age = max_age if max_age is not None else timedelta(hours=settings.PAYMENT_RECONCILE_MAX_AGE_HOURS)
+        
+        self._limiters: Dict[str, RateLimiter] = {}  # provider -> limiter
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._pass_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+    
+    async def start(self):
+        """Run a reconciliation pass every `interval` seconds on the running event loop"""
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run_loop())
+        logger.info(f"Payment reconciler started (every {self.interval:g}s, {self.concurrency} concurrent checks)")
+    
+    async def stop(self):
+        if not self.running:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+    
+    async def _run_loop(self):
+        while True:
+            try:
+                summary = await self.run_once()
+                if summary["checked"]:
+                    logger.info(f"Payment reconciliation: {summary}")
+            except Exception as e:
+                logger.error(f"Payment reconciliation failed: {e}")
+            await asyncio.sleep(self.interval)
+    
+    async def run_once(self) -> Dict[str, int]:
+        """Reconcile every due PROCESSING order once and return counts"""
+        if self.verifier is None:
+            self.verifier = PaymentService()
+        if self._loop is not asyncio.get_running_loop():
+            self._loop = asyncio.get_running_loop()
+            self._pass_lock = asyncio.Lock()
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        
+        summary = {"checked": 0, "completed": 0, "failed": 0, "unverified": 0, "errors": 0, "skipped": 0}
+        # One pass at a time, whether scheduled or triggered by an admin
+        async with self._pass_lock:
+            after_id = 0
+            while True:
+                batch = await asyncio.to_thread(self._load_batch, after_id)
+                if not batch:
+                    break
+                after_id = batch[-1].order_id
+                
+                now = datetime.utcnow()
+                due = [
+                    payment for payment in batch
+                    if payment.payment_reference and payment.payment_method
+                    and (payment.initiated_at is None or payment.initiated_at <= now - self.min_age)
+                ]
+                verifiable = [payment for payment in due if self._verifiable(payment.payment_method)]
+                summary["skipped"] += len(due) - len(verifiable)
+                due = verifiable
+                results = await asyncio.gather(
+                    *(self._verify(payment) for payment in due), return_exceptions=True
+                )
+                
+                completed: List[int] = []
+                failed: List[int] = []
+                for payment, result in zip(due, results):
+                    if isinstance(result, Exception):
+                        logger.warning(f"Verifying payment for order {payment.order_id} failed: {result}")
+                        summary["errors"] += 1
+                    elif result.get("verified"):
+                        completed.append(payment.order_id)
+                    elif payment.initiated_at is not None and payment.initiated_at <= now - self.max_age:
+                        failed.append(payment.order_id)
+                    else:
+                        summary["unverified"] += 1
+                
+                summary["checked"] += len(due)
+                if completed or failed:
+                    written = await asyncio.to_thread(self._write_results, completed, failed)
+                    summary["completed"] += written[PaymentStatus.COMPLETED]
+                    summary["failed"] += written[PaymentStatus.FAILED]
+                
+                if len(batch) < self.BATCH_SIZE:
+                    break
+        return summary
+    
+    def _verifiable(self, method: PaymentMethod) -> bool:
+        """Whether the verifier really checks `method` (verifiers without VERIFIED_METHODS check everything)"""
+        methods = getattr(self.verifier, "VERIFIED_METHODS", None)
+        return methods is None or method in methods
+    
+    async def _verify(self, payment: PendingPayment) -> Dict:
+        async with self._semaphore:
+            await self._limiter(payment.payment_method).acquire()
+            return await self.verifier.verify_payment(payment.payment_reference, payment.payment_method)
+    
+    def _limiter(self, method: PaymentMethod) -> RateLimiter:
+        """The rate limiter shared by every payment method verified through the same provider"""
+        provider = PROVIDERS.get(method, method.value)
+        limiter = self._limiters.get(provider)
+        if limiter is None:
+            limiter = self._limiters[provider] = RateLimiter(
+                self.rate_limits.get(provider, self.default_rate_limit)
+            )
+        return limiter
+    
+    def _load_batch(self, after_id: int) -> List[PendingPayment]:
+        """Next BATCH_SIZE PROCESSING orders after `after_id`"""
+        db = self.session_factory()
+        try:
+            rows = db.query(
+                Order.id, Order.payment_reference, Order.payment_method, Order.updated_at, Order.created_at
+            ).filter(
+                Order.payment_status == PaymentStatus.PROCESSING,
+                Order.id > after_id
+            ).order_by(Order.id).limit(self.BATCH_SIZE).all()
+        finally:
+            db.close()
+        
+        # The last write before reconciliation is recording the payment reference
+        return [
+            PendingPayment(order_id, reference, method, _utc_naive(updated_at or created_at))
+            for order_id, reference, method, updated_at, created_at in rows
+        ]
+    
+    def _write_results(self, completed: List[int], failed: List[int]) -> Dict[PaymentStatus, int]:
+        """Apply a batch of outcomes in one transaction; returns how many orders changed per status"""
+        db = self.session_factory()
+        try:
+            # Skip orders settled elsewhere since they were loaded
+            orders = db.query(Order).filter(
+                Order.id.in_(completed + failed),
+                Order.payment_status == PaymentStatus.PROCESSING
+            ).order_by(Order.id).with_for_update().all()
+            locked = {order.id for order in orders}
+            
+            now = datetime.utcnow()
+            written = {}
+            for payment_status, order_ids in ((PaymentStatus.COMPLETED, completed), (PaymentStatus.FAILED, failed)):
+                order_ids = [order_id for order_id in order_ids if order_id in locked]
+                written[payment_status] = len(order_ids)
+                if order_ids:
+                    db.query(Order).filter(Order.id.in_(order_ids)).update(
+                        {Order.payment_status: payment_status, Order.updated_at: now},
+                        synchronize_session="evaluate"
+                    )
+            
+            StatsService.record_payment_changes(db, [(order, PaymentStatus.PROCESSING) for order in orders])
+            db.commit()
+            return written
+        finally:
+            db.close()
+
+
+def _utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    # PostgreSQL returns aware timestamps; compare everything as naive UTC
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+# Shared instance started by the app lifespan when PAYMENT_RECONCILE_ENABLED is set
+payment_reconciler = PaymentReconciler()
@@ -1,13 +1,17 @@
 from typing import Optional, Dict
 from models import PaymentMethod, Order
 from config import settings
-import httpx
+from services.http_clients import http_clients
 import requests
 
 
 class PaymentService:
     """Service for handling payment integrations"""
     
+    # Methods verify_payment actually checks with the provider; the others
+    # (Hubtel, mobile money) are still placeholders that always report success
+    VERIFIED_METHODS = frozenset({PaymentMethod.PAYSTACK})
+    
     @staticmethod
     async def initiate_payment(order: Order, payment_method: PaymentMethod) -> Dict:
         """Initiate payment based on payment method"""
@@ -54,17 +58,17 @@ class PaymentService:
         }
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, json=payload, headers=headers, timeout=10.0)
-                response.raise_for_status()
-                data = response.json()
-                
-                return {
-                    "payment_reference": data.get("invoice_id", f"MOBILE-{order.order_number}"),
-                    "payment_url": data.get("invoice_url"),
-                    "status": "processing",
-                    "message": f"You will receive a USSD prompt on {order.customer_phone} to authorize payment."
-                }
+            client = http_clients.get("hubtel")
+            response = await client.post(url, json=payload, headers=headers)
+            response.raise_for_status()
+            data = response.json()
+            
+            return {
+                "payment_reference": data.get("invoice_id", f"MOBILE-{order.order_number}"),
+                "payment_url": data.get("invoice_url"),
+                "status": "processing",
+                "message": f"You will receive a USSD prompt on {order.customer_phone} to authorize payment."
+            }
         except Exception as e:
             # Fallback for development
             return {
@@ -103,16 +107,16 @@ class PaymentService:
         }
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, json=payload, headers=headers, timeout=10.0)
-                response.raise_for_status()
-                data = response.json()
-                
-                return {
-                    "payment_reference": data.get("invoice_id", f"HUBTEL-{order.order_number}"),
-                    "payment_url": data.get("invoice_url"),
-                    "status": "processing"
-                }
+            client = http_clients.get("hubtel")
+            response = await client.post(url, json=payload, headers=headers)
+            response.raise_for_status()
+            data = response.json()
+            
+            return {
+                "payment_reference": data.get("invoice_id", f"HUBTEL-{order.order_number}"),
+                "payment_url": data.get("invoice_url"),
+                "status": "processing"
+            }
         except Exception as e:
             # Fallback for development
             return {
@@ -153,16 +157,16 @@ class PaymentService:
         }
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, json=payload, headers=headers, timeout=10.0)
-                response.raise_for_status()
-                data = response.json()
-                
-                return {
-                    "payment_reference": data["data"]["reference"],
-                    "payment_url": data["data"]["authorization_url"],
-                    "status": "processing"
-                }
+            client = http_clients.get("paystack")
+            response = await client.post(url, json=payload, headers=headers)
+            response.raise_for_status()
+            data = response.json()
+            
+            return {
+                "payment_reference": data["data"]["reference"],
+                "payment_url": data["data"]["authorization_url"],
+                "status": "processing"
+            }
         except Exception as e:
             # Fallback for development
             return {
@@ -193,15 +197,15 @@ class PaymentService:
         }
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, headers=headers, timeout=10.0)
-                response.raise_for_status()
-                data = response.json()
-                
-                return {
-                    "status": "completed" if data["data"]["status"] == "success" else "failed",
-                    "verified": data["data"]["status"] == "success"
-                }
+            client = http_clients.get("paystack")
+            response = await client.get(url, headers=headers)
+            response.raise_for_status()
+            data = response.json()
+            
+            return {
+                "status": "completed" if data["data"]["status"] == "success" else "failed",
+                "verified": data["data"]["status"] == "success"
+            }
         except Exception as e:
             return {"status": "failed", "verified": False}
     
@@ -0,0 +1,250 @@
+from sqlalchemy import bindparam, func, literal, select, update
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from database import SessionLocal, upsert_insert
+from models import PickupSlot
+from config import settings
+from datetime import date, datetime, timedelta, timezone
+import threading
+import time
+
+
+class Booking(NamedTuple):
+    """Birds added to (or, if negative, released from) a slot in the current transaction"""
+    slot_start: datetime
+    birds: int
+
+
+class PickupSlotIndex:
+    """Capacity-aware pickup slot scheduler.
+    
+    The `pickup_slots` table decides: a booking is one conditional upsert that
+    only adds an order's birds if the slot still has room, in the order's own
+    transaction, so concurrent orders (on any worker) can never overfill a
+    slot. This index mirrors the table's upcoming rows in memory, so
+    create_order can go straight to a slot with room and listing
+    availability is one dict lookup per slot, with no query.
+    
+    It is loaded at startup and updated after each booking this process
+    commits; bookings made by other workers show up once the index is older
+    than PICKUP_SLOT_INDEX_TTL_SECONDS. A stale index can offer a slot that
+    has filled up meanwhile, in which case the booking moves on to the next
+    slot (or, for a requested time, is refused).
+    
+    An order with more birds than a slot's capacity can still have an empty
+    slot to itself (unless the slot is closed, i.e. its capacity is 0), so
+    large orders aren't refused outright.
+    """
+    
+    def __init__(self):
+        self._slots: Dict[datetime, Tuple[Optional[int], int]] = {}  # slot_start -> (capacity override, booked)
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _utc_naive(value: datetime) -> datetime:
+        # Requests may send offsets and PostgreSQL returns aware timestamps;
+        # slots are kept as naive UTC like the rest of the schema
+        if value.tzinfo is not None:
+            return value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+    
+    @staticmethod
+    def capacity(override: Optional[int]) -> int:
+        return settings.PICKUP_SLOT_CAPACITY if override is None else override
+    
+    @staticmethod
+    def fits(capacity: int, booked: int, birds: int) -> bool:
+        """Whether `birds` more fit in a slot; an open empty slot takes an order of any size"""
+        return capacity > 0 and (booked + birds <= capacity or booked == 0)
+    
+    @staticmethod
+    def slot_start(when: datetime) -> datetime:
+        """Start of the slot containing `when` (naive UTC); ValueError outside opening hours"""
+        when = PickupSlotIndex._utc_naive(when)
+        day_start = datetime.combine(when.date(), datetime.min.time())
+        minutes = (when - day_start) // timedelta(minutes=1)
+        if not settings.PICKUP_OPENING_HOUR * 60 <= minutes < settings.PICKUP_CLOSING_HOUR * 60:
+            raise ValueError(
+                f"Pickup is between {settings.PICKUP_OPENING_HOUR:02d}:00 and {settings.PICKUP_CLOSING_HOUR:02d}:00 UTC"
+            )
+        offset = minutes - settings.PICKUP_OPENING_HOUR * 60
+        return day_start + timedelta(
+            minutes=settings.PICKUP_OPENING_HOUR * 60 + offset - offset % settings.PICKUP_SLOT_MINUTES
+        )
+    
+    @staticmethod
+    def _day_slots(day: date) -> Iterator[datetime]:
+        start = datetime.combine(day, datetime.min.time()) + timedelta(hours=settings.PICKUP_OPENING_HOUR)
+        close = datetime.combine(day, datetime.min.time()) + timedelta(hours=settings.PICKUP_CLOSING_HOUR)
+        step = timedelta(minutes=settings.PICKUP_SLOT_MINUTES)
+        while start < close:
+            yield start
+            start += step
+    
+    @staticmethod
+    def bookable_slots(days: int, now: Optional[datetime] = None) -> Iterator[datetime]:
+        """Slot starts open for booking: after the lead time and within `days` days (24h periods) from now"""
+        now = now or datetime.utcnow()
+        earliest = now + timedelta(minutes=settings.PICKUP_LEAD_MINUTES)
+        latest = now + timedelta(days=min(days, settings.PICKUP_BOOKING_DAYS))
+        for offset in range((latest.date() - now.date()).days + 1):
+            for slot in PickupSlotIndex._day_slots(now.date() + timedelta(days=offset)):
+                if earliest <= slot < latest:
+                    yield slot
+    
+    def load(self, db: Session) -> None:
+        """Replace the index with the table's rows from today on"""
+        today = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+        rows = db.execute(
+            select(PickupSlot.slot_start, PickupSlot.capacity, PickupSlot.booked)
+            .where(PickupSlot.slot_start >= today)
+        )
+        slots = {self._utc_naive(slot_start): (capacity, booked) for slot_start, capacity, booked in rows}
+        with self._lock:
+            self._slots = slots
+            self._loaded_at = time.monotonic()
+    
+    def rebuild(self) -> None:
+        """Load the index in a session of its own (at startup)"""
+        db = SessionLocal()
+        try:
+            self.load(db)
+        finally:
+            db.close()
+    
+    def _fresh(self, db: Session) -> None:
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at >= settings.PICKUP_SLOT_INDEX_TTL_SECONDS:
+            self.load(db)
+    
+    def get(self, slot_start: datetime) -> Tuple[int, int]:
+        """(capacity, booked) of a slot as of the index"""
+        override, booked = self._slots.get(slot_start, (None, 0))
+        return self.capacity(override), booked
+    
+    def available(self, db: Session, days: int, birds: int = 1) -> List[Dict]:
+        """Bookable slots in the next `days` days with room for `birds`, as PickupSlotResponse dicts"""
+        self._fresh(db)
+        slots = []
+        for slot in self.bookable_slots(days):
+            capacity, booked = self.get(slot)
+            if self.fits(capacity, booked, birds):
+                slots.append({"slot_start": slot, "capacity": capacity, "booked": booked, "remaining": capacity - booked})
+        return slots
+    
+    def book(self, db: Session, birds: int, requested: Optional[datetime] = None) -> Booking:
+        """Reserve room for `birds` in the requested slot, or the earliest one with room.
+        
+        Runs in the caller's transaction; call `record()` with the result
+        once it has committed. Raises ValueError if there is no room.
+        """
+        self._fresh(db)
+        
+        if requested is not None:
+            slot = self.slot_start(requested)
+            if slot not in set(self.bookable_slots(settings.PICKUP_BOOKING_DAYS)):
+                raise ValueError(
+                    f"Pickup time must be at least {settings.PICKUP_LEAD_MINUTES} minutes from now "
+                    f"and within the next {settings.PICKUP_BOOKING_DAYS} days"
+                )
+            if not self._reserve(db, slot, birds):
+                capacity, booked = self.get(slot)
+                raise ValueError(
+                    f"The {slot:%Y-%m-%d %H:%M} UTC pickup slot has room for {max(capacity - booked, 0)} "
+                    f"more birds; choose another time"
+                )
+            return Booking(slot, birds)
+        
+        for slot in self.bookable_slots(settings.PICKUP_BOOKING_DAYS):
+            capacity, booked = self.get(slot)
+            if self.fits(capacity, booked, birds) and self._reserve(db, slot, birds):
+                return Booking(slot, birds)
+        raise ValueError(f"No pickup slot has room for {birds} birds in the next {settings.PICKUP_BOOKING_DAYS} days")
+    
+    def _reserve(self, db: Session, slot: datetime, birds: int) -> bool:
+        """Add `birds` to the slot's row if they fit (see `fits`), creating the row if needed"""
+        # A missing row is an empty slot with the default capacity; an existing
+        # row is checked against its own capacity (override) in the DO UPDATE's WHERE
+        stmt = upsert_insert(db)(PickupSlot)
+        if settings.PICKUP_SLOT_CAPACITY > 0:
+            stmt = stmt.values(slot_start=slot, booked=birds)
+        else:
+            # Slots are closed by default, so only existing rows (opened by an admin) take bookings
+            stmt = stmt.from_select(
+                [PickupSlot.slot_start, PickupSlot.booked],
+                select(literal(slot), literal(birds)).where(
+                    select(PickupSlot.slot_start).where(PickupSlot.slot_start == slot).exists()
+                )
+            )
+        capacity = func.coalesce(PickupSlot.capacity, settings.PICKUP_SLOT_CAPACITY)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[PickupSlot.slot_start],
+            set_={"booked": PickupSlot.booked + stmt.excluded.booked},
+            where=(capacity > 0) & (
+                (PickupSlot.booked + stmt.excluded.booked <= capacity) | (PickupSlot.booked == 0)
+            )
+        ).returning(PickupSlot.booked)
+        if db.execute(stmt).first() is not None:
+            return True
+        
+        # Full: bookings this index hasn't seen yet (another worker's) got there first
+        row = db.execute(
+            select(PickupSlot.capacity, PickupSlot.booked).where(PickupSlot.slot_start == slot)
+        ).first()
+        if row is not None:
+            with self._lock:
+                self._slots[slot] = (row.capacity, row.booked)
+        return False
+    
+    def release(self, db: Session, bookings: Iterable[Booking]) -> List[Booking]:
+        """Give booked birds back (cancelled orders) in the caller's transaction.
+        
+        Past slots are left alone. Returns the negative bookings to pass to
+        `record()` after committing.
+        """
+        now = datetime.utcnow()
+        freed: Dict[datetime, int] = {}
+        for slot, birds in bookings:
+            slot = self._utc_naive(slot)
+            if slot >= now and birds:
+                freed[slot] = freed.get(slot, 0) + birds
+        if not freed:
+            return []
+        
+        # One executemany for all slots, in key order so concurrent releases lock rows alike
+        slots = PickupSlot.__table__
+        db.connection().execute(
+            update(slots).where(slots.c.slot_start == bindparam("slot")).values(
+                booked=slots.c.booked - bindparam("birds")
+            ),
+            [{"slot": slot, "birds": birds} for slot, birds in sorted(freed.items())]
+        )
+        return [Booking(slot, -birds) for slot, birds in freed.items()]
+    
+    def set_capacity(self, db: Session, when: datetime, capacity: Optional[int]) -> Dict:
+        """Override one slot's capacity (None = back to the default); returns it as a PickupSlotResponse dict"""
+        slot = self.slot_start(when)
+        stmt = upsert_insert(db)(PickupSlot).values(slot_start=slot, capacity=capacity, booked=0)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[PickupSlot.slot_start],
+            set_={"capacity": stmt.excluded.capacity}
+        ).returning(PickupSlot.booked)
+        booked = db.execute(stmt).scalar_one()
+        db.commit()
+        
+        with self._lock:
+            self._slots[slot] = (capacity, booked)
+        capacity = self.capacity(capacity)
+        return {"slot_start": slot, "capacity": capacity, "booked": booked, "remaining": max(capacity - booked, 0)}
+    
+    def record(self, bookings: Iterable[Booking]) -> None:
+        """Apply committed bookings (and releases) to the index"""
+        with self._lock:
+            for slot, birds in bookings:
+                override, booked = self._slots.get(slot, (None, 0))
+                self._slots[slot] = (override, max(booked + birds, 0))
+
+
+# Shared instance used by OrderService and the orders/admin routers
+pickup_slots = PickupSlotIndex()
@@ -0,0 +1,119 @@
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models import User
+from config import settings
+import threading
+import time
+
+
+class Principal:
+    """The authenticated caller: only what authorization checks need"""
+    
+    __slots__ = ("id", "is_admin", "is_active")
+    
+    def __init__(self, id: int, is_admin: bool, is_active: bool):
+        self.id = id
+        self.is_admin = is_admin
+        self.is_active = is_active
+    
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(user.id, bool(user.is_admin), bool(user.is_active))
+
+
+class PrincipalCache:
+    """Bounded, short-TTL LRU of resolved principals keyed by (user id, token).
+    
+    Also remembers when each user last changed, so tokens whose signed
+    admin/active claims predate the change are resolved from the database
+    again. Changes made through the ORM in this process invalidate
+    immediately (see the User events below). Changes made in other worker
+    processes or directly in the database are seen once cache entries
+    expire, and once claims pass AUTH_TOKEN_CLAIMS_MAX_AGE_SECONDS.
+    """
+    
+    def __init__(self, ttl: Optional[float] = None, max_size: Optional[int] = None):
+        self.ttl = ttl if ttl is not None else settings.AUTH_PRINCIPAL_CACHE_TTL_SECONDS
+        self.max_size = max_size or settings.AUTH_PRINCIPAL_CACHE_SIZE
+        self._entries: "OrderedDict[Tuple[int, str], Tuple[Principal, float]]" = OrderedDict()
+        self._changed_at: Dict[int, float] = {}  # user id -> wall-clock time of last change
+        self._lock = threading.Lock()
+    
+    def get(self, user_id: int, token: str) -> Optional[Principal]:
+        key = (user_id, token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            principal, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return principal
+    
+    def put(self, token: str, principal: Principal, loaded_at: float):
+        """Cache a principal read from the database at `loaded_at` (time.time())"""
+        with self._lock:
+            # The user changed while we were reading it: don't keep the old row
+            changed_at = self._changed_at.get(principal.id)
+            if changed_at is not None and changed_at >= loaded_at:
+                return
+            key = (principal.id, token)
+            self._entries[key] = (principal, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def trusts_claims(self, user_id: int, issued_at: Optional[int]) -> bool:
+        """Whether a token's admin/active claims are still current"""
+        if not settings.AUTH_TRUST_TOKEN_CLAIMS or issued_at is None:
+            return False
+        # Past this age the database is checked again: _changed_at only
+        # knows about changes made through this process
+        if time.time() - issued_at > settings.AUTH_TOKEN_CLAIMS_MAX_AGE_SECONDS:
+            return False
+        changed_at = self._changed_at.get(user_id)
+        return changed_at is None or issued_at > changed_at
+    
+    def invalidate(self, user_id: int):
+        """Forget cached principals for a user and distrust claims issued so far"""
+        now = time.time()
+        # Claims in older tokens aren't trusted anyway
+        horizon = now - settings.AUTH_TOKEN_CLAIMS_MAX_AGE_SECONDS
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == user_id]:
+                del self._entries[key]
+            self._changed_at = {
+                uid: changed_at for uid, changed_at in self._changed_at.items()
+                if changed_at > horizon
+            }
+            self._changed_at[user_id] = now
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._changed_at.clear()
+
+
+# Shared instance used by the auth dependencies
+principal_cache = PrincipalCache()
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, target: User):
+    principal_cache.invalidate(target.id)
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_user_ids", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _user_changes_committed(session: Session):
+    # Invalidate again once the change is visible, in case a concurrent
+    # request re-cached the old row between flush and commit
+    for user_id in session.info.pop("changed_user_ids", ()):
+        principal_cache.invalidate(user_id)
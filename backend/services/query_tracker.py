@@ -0,0 +1,194 @@
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from config import settings
+import logging
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+QUERY_COUNT_HEADER = "X-Query-Count"
+QUERY_TIME_HEADER = "X-Query-Time-Ms"
+N_PLUS_ONE_HEADER = "X-Query-N-Plus-One"
+
+# Expanded IN lists render one placeholder per value; collapse them so
+# `IN (?, ?)` and `IN (?, ?, ?)` count as the same statement shape
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%s|\$\d+|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|\$\d+|%\(\w+\)s|:\w+))+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Statement text with whitespace and IN-list lengths normalized"""
+    return _PLACEHOLDER_LIST.sub("(?)", _WHITESPACE.sub(" ", statement).strip())
+
+
+class QueryStats:
+    """Statements one request (or one tracked block) sent to the database"""
+    
+    __slots__ = ("count", "seconds", "shapes")
+    
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes: Counter = Counter()
+    
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        self.shapes[statement_shape(statement)] += 1
+    
+    def n_plus_one(self, threshold: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Statement shapes repeated at least `threshold` times, most repeated first"""
+        threshold = threshold or settings.QUERY_N_PLUS_ONE_THRESHOLD
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+    
+    def merge(self, other: "QueryStats"):
+        self.count += other.count
+        self.seconds += other.seconds
+        self.shapes.update(other.shapes)
+    
+    def describe(self) -> str:
+        lines = [f"{self.count} queries in {self.seconds * 1000:.1f} ms"]
+        for shape, count in self.shapes.most_common():
+            lines.append(f"  {count}x {shape[:200]}")
+        return "\n".join(lines)
+
+
+# Stats for the request being handled. Threadpool and run_sync calls copy the
+# context, so every query issued on behalf of a request lands in its stats.
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+# Called with the stats of each finished request (used by assert_max_queries)
+_listeners: List[Callable[[QueryStats], None]] = []
+_listeners_lock = threading.Lock()
+
+
+class QueryTracker:
+    """Counts statements and database time per request via engine events.
+    
+    `instrument_engine` hooks the cursor events of an engine; the middleware
+    opens a QueryStats for each HTTP request, so queries from sync helpers,
+    run_sync and threadpool work are all attributed to it. Queries outside a
+    request (background workers, startup) are not tracked.
+    """
+    
+    def __init__(self):
+        self._engines = set()
+    
+    def instrument_engine(self, engine: Engine):
+        if engine in self._engines:
+            return
+        self._engines.add(engine)
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine, "handle_error", self._handle_error)
+    
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None:
+            conn.info.setdefault("query_started", []).append(time.perf_counter())
+    
+    @staticmethod
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = _current.get()
+        started = conn.info.get("query_started")
+        if stats is not None and started:
+            stats.record(statement, time.perf_counter() - started.pop())
+    
+    @staticmethod
+    def _handle_error(exception_context):
+        started = exception_context.connection.info.get("query_started") if exception_context.connection else None
+        stats = _current.get()
+        if stats is not None and started:
+            stats.record(exception_context.statement or "", time.perf_counter() - started.pop())
+
+
+class QueryTrackingMiddleware:
+    """ASGI middleware opening a QueryStats per HTTP request.
+    
+    With DEBUG on, the query count, database time and number of repeated
+    statement shapes go out as response headers, and N+1 patterns are logged.
+    Headers reflect the queries made before the response started, which is
+    all of them except for streaming responses.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        stats = QueryStats()
+        token = _current.set(stats)
+        
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and settings.DEBUG:
+                headers = list(message.get("headers", []))
+                headers += [
+                    (QUERY_COUNT_HEADER.encode(), str(stats.count).encode()),
+                    (QUERY_TIME_HEADER.encode(), f"{stats.seconds * 1000:.1f}".encode()),
+                    (N_PLUS_ONE_HEADER.encode(), str(len(stats.n_plus_one())).encode()),
+                ]
+                message = {**message, "headers": headers}
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            if settings.DEBUG:
+                for shape, count in stats.n_plus_one():
+                    logger.warning(f"Possible N+1 in {scope['method']} {scope['path']}: {count}x {shape[:200]}")
+            with _listeners_lock:
+                listeners = list(_listeners)
+            for listener in listeners:
+                listener(stats)
+
+
+@contextmanager
+def assert_max_queries(max_queries: int, allow_n_plus_one: bool = False) -> Iterator[QueryStats]:
+    """Fail if the enclosed block sends more than `max_queries` statements.
+    
+    Counts queries made directly in the block and by every HTTP request that
+    finishes inside it (e.g. through a TestClient), so an endpoint can be
+    pinned to a query budget:
+        
+        with assert_max_queries(4):
+            client.get(f"/orders/{order_id}")
+    
+    Repeated statement shapes fail the check too unless `allow_n_plus_one`.
+    Requests served concurrently by other threads are counted as well, so
+    use it where the block is the only traffic.
+    """
+    total = QueryStats()
+    own = QueryStats()
+    token = _current.set(own)
+    with _listeners_lock:
+        _listeners.append(total.merge)
+    try:
+        yield total
+    finally:
+        with _listeners_lock:
+            _listeners.remove(total.merge)
+        _current.reset(token)
+        total.merge(own)
+    
+    if total.count > max_queries:
+        raise AssertionError(f"Expected at most {max_queries} queries, got {total.describe()}")
+    repeated = total.n_plus_one()
+    if repeated and not allow_n_plus_one:
+        raise AssertionError(
+            "Repeated statement shapes (N+1?): "
+            + "; ".join(f"{count}x {shape[:200]}" for shape, count in repeated)
+        )
+
+
+# Shared instance whose events are attached to the app's engines in main.py
+query_tracker = QueryTracker()
@@ -0,0 +1,263 @@
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, List, Optional, Tuple
+from database import upsert_insert
+from models import Order, OrderItem, OrderStatus, PaymentMethod, Product, SalesRollup
+from schemas import PaymentMethodSales, ProductSales, SalesBucket, SalesReport
+from datetime import date, datetime, timedelta, timezone
+
+
+# (granularity, bucket_start, product_id, payment_method) -> [quantity, revenue, order_count]
+Deltas = Dict[Tuple[str, datetime, int, str], List]
+
+
+class SalesRollupService:
+    """Service maintaining the `sales_rollups` table behind /admin/sales.
+    
+    When orders complete, their items are added to the hour and day buckets
+    of their completion time with one INSERT ... ON CONFLICT DO UPDATE that
+    increments the existing counters, inside the caller's transaction. Range
+    reports then read at most a few rows per bucket instead of scanning
+    `orders` and `order_items`.
+    """
+    
+    HOUR = "hour"
+    DAY = "day"
+    GRANULARITIES = ("hour", "day", "week", "month", "year")
+    
+    ORDER_TOTALS = 0  # product_id of the whole-order rows
+    NO_PAYMENT_METHOD = "none"
+    
+    MAX_HOURLY_DAYS = 31  # hourly reports read hourly rows, so keep their range bounded
+    
+    @staticmethod
+    def _utc_naive(value: datetime) -> datetime:
+        # PostgreSQL returns aware timestamps; completed_at is set from utcnow()
+        if value.tzinfo is not None:
+            return value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+    
+    @staticmethod
+    def _add(
+        deltas: Deltas,
+        completed_at: datetime,
+        payment_method: Optional[PaymentMethod],
+        product_id: int,
+        quantity: int,
+        revenue: float,
+        orders: int
+    ) -> None:
+        completed_at = SalesRollupService._utc_naive(completed_at)
+        method = payment_method.value if payment_method else SalesRollupService.NO_PAYMENT_METHOD
+        for granularity, bucket_start in (
+            (SalesRollupService.HOUR, completed_at.replace(minute=0, second=0, microsecond=0)),
+            (SalesRollupService.DAY, datetime.combine(completed_at.date(), datetime.min.time())),
+        ):
+            row = deltas.setdefault((granularity, bucket_start, product_id, method), [0, 0.0, 0])
+            row[0] += quantity
+            row[1] += revenue
+            row[2] += orders
+    
+    @staticmethod
+    def record_completed(db: Session, orders: Iterable[Order]) -> None:
+        """Add newly completed orders to the rollup (call after completed_at is set)"""
+        orders = {order.id: order for order in orders if order.status == OrderStatus.COMPLETED}
+        if not orders:
+            return
+        
+        # Item columns only; no need to load the items relationship
+        items = db.query(
+            OrderItem.order_id, OrderItem.product_id, OrderItem.quantity, OrderItem.subtotal
+        ).filter(OrderItem.order_id.in_(list(orders))).all()
+        
+        deltas: Deltas = {}
+        quantities: Dict[int, int] = {}
+        for order_id, product_id, quantity, subtotal in items:
+            order = orders[order_id]
+            SalesRollupService._add(deltas, order.completed_at, order.payment_method, product_id, quantity, subtotal, 0)
+            quantities[order_id] = quantities.get(order_id, 0) + quantity
+        
+        # An order counts once per product it contains, however many lines it has
+        for order_id, product_id in {(order_id, product_id) for order_id, product_id, _, _ in items}:
+            order = orders[order_id]
+            SalesRollupService._add(deltas, order.completed_at, order.payment_method, product_id, 0, 0.0, 1)
+        
+        for order in orders.values():
+            SalesRollupService._add(
+                deltas, order.completed_at, order.payment_method,
+                SalesRollupService.ORDER_TOTALS, quantities.get(order.id, 0), order.total_amount, 1
+            )
+        
+        SalesRollupService._increment(db, deltas)
+    
+    @staticmethod
+    def _increment(db: Session, deltas: Deltas) -> None:
+        """Add deltas to their rows, creating missing ones"""
+        if not deltas:
+            return
+        
+        stmt = upsert_insert(db)(SalesRollup)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["granularity", "bucket_start", "product_id", "payment_method"],
+            set_={
+                "quantity": SalesRollup.quantity + stmt.excluded.quantity,
+                "revenue": SalesRollup.revenue + stmt.excluded.revenue,
+                "order_count": SalesRollup.order_count + stmt.excluded.order_count,
+            }
+        )
+        # One executemany of a fixed statement (compiled once and cached), sorted so
+        # concurrent completions lock shared rows in the same order
+        db.execute(stmt, [
+            {
+                "granularity": granularity,
+                "bucket_start": bucket_start,
+                "product_id": product_id,
+                "payment_method": method,
+                "quantity": quantity,
+                "revenue": revenue,
+                "order_count": order_count,
+            }
+            for (granularity, bucket_start, product_id, method), (quantity, revenue, order_count) in sorted(deltas.items())
+        ])
+    
+    @staticmethod
+    def backfill(db: Session, start: Optional[date] = None, end: Optional[date] = None) -> int:
+        """Rebuild the rollup for orders completed on days start..end (inclusive, UTC; None = unbounded).
+        
+        Runs within the caller's transaction and returns the number of orders
+        counted. Orders completing while it runs may be counted twice or
+        missed, so run it when the shop is quiet (or run it again).
+        """
+        db.flush()
+        conditions = [Order.status == OrderStatus.COMPLETED]
+        rollup_conditions = []
+        if start:
+            start_at = datetime.combine(start, datetime.min.time())
+            conditions.append(Order.completed_at >= start_at)
+            rollup_conditions.append(SalesRollup.bucket_start >= start_at)
+        if end:
+            end_at = datetime.combine(end + timedelta(days=1), datetime.min.time())
+            conditions.append(Order.completed_at < end_at)
+            rollup_conditions.append(SalesRollup.bucket_start < end_at)
+        
+        db.query(SalesRollup).filter(*rollup_conditions).delete(synchronize_session=False)
+        
+        # Stream just the columns needed; bucketing is done in Python so it works on any dialect
+        deltas: Deltas = {}
+        order_quantities: Dict[int, List] = {}
+        rows = db.query(
+            Order.id, Order.completed_at, Order.payment_method, Order.total_amount,
+            OrderItem.product_id, OrderItem.quantity, OrderItem.subtotal
+        ).outerjoin(OrderItem, OrderItem.order_id == Order.id).filter(
+            *conditions, Order.completed_at.isnot(None)
+        ).order_by(Order.id).yield_per(5000)
+        
+        counted_products = set()
+        for order_id, completed_at, payment_method, total_amount, product_id, quantity, subtotal in rows:
+            order = order_quantities.setdefault(order_id, [completed_at, payment_method, total_amount, 0])
+            if product_id is None:
+                continue
+            order[3] += quantity
+            first = (order_id, product_id) not in counted_products
+            counted_products.add((order_id, product_id))
+            SalesRollupService._add(deltas, completed_at, payment_method, product_id, quantity, subtotal, int(first))
+        
+        for completed_at, payment_method, total_amount, quantity in order_quantities.values():
+            SalesRollupService._add(
+                deltas, completed_at, payment_method, SalesRollupService.ORDER_TOTALS, quantity, total_amount, 1
+            )
+        
+        SalesRollupService._increment(db, deltas)
+        db.flush()
+        return len(order_quantities)
+    
+    @staticmethod
+    def _bucket(day_or_hour: datetime, granularity: str) -> datetime:
+        """Start of the report bucket containing an hourly or daily rollup row"""
+        if granularity in (SalesRollupService.HOUR, SalesRollupService.DAY):
+            return day_or_hour
+        day = day_or_hour.date()
+        if granularity == "week":
+            day -= timedelta(days=day.weekday())  # weeks start on Monday
+        elif granularity == "month":
+            day = day.replace(day=1)
+        else:
+            day = day.replace(month=1, day=1)
+        return datetime.combine(day, datetime.min.time())
+    
+    @staticmethod
+    def report(db: Session, start: date, end: date, granularity: str) -> SalesReport:
+        """Sales for days start..end (inclusive, UTC) in hour/day/week/month/year buckets"""
+        if granularity not in SalesRollupService.GRANULARITIES:
+            raise ValueError(f"granularity must be one of: {', '.join(SalesRollupService.GRANULARITIES)}")
+        if end < start:
+            raise ValueError("`to` must not be before `from`")
+        if granularity == SalesRollupService.HOUR and (end - start).days >= SalesRollupService.MAX_HOURLY_DAYS:
+            raise ValueError(f"Hourly reports cover at most {SalesRollupService.MAX_HOURLY_DAYS} days")
+        
+        source = SalesRollupService.HOUR if granularity == SalesRollupService.HOUR else SalesRollupService.DAY
+        # Core select: plain rows, no ORM overhead per rollup row
+        rows = db.execute(select(
+            SalesRollup.bucket_start, SalesRollup.product_id, SalesRollup.payment_method,
+            SalesRollup.quantity, SalesRollup.revenue, SalesRollup.order_count
+        ).where(
+            SalesRollup.granularity == source,
+            SalesRollup.bucket_start >= datetime.combine(start, datetime.min.time()),
+            SalesRollup.bucket_start < datetime.combine(end + timedelta(days=1), datetime.min.time())
+        ))
+        
+        # bucket -> ({product_id: totals}, {payment_method: totals}); totals are [quantity, revenue, order_count]
+        buckets: Dict[datetime, Tuple[Dict[int, List], Dict[str, List]]] = {}
+        bucket_of: Dict[datetime, Tuple[Dict[int, List], Dict[str, List]]] = {}  # per rollup bucket_start
+        for bucket_start, product_id, method, quantity, revenue, order_count in rows:
+            if bucket_start not in bucket_of:
+                bucket = SalesRollupService._bucket(SalesRollupService._utc_naive(bucket_start), granularity)
+                bucket_of[bucket_start] = buckets.setdefault(bucket, ({}, {}))
+            by_product, by_method = bucket_of[bucket_start]
+            target = by_method.setdefault(method, [0, 0.0, 0]) if product_id == SalesRollupService.ORDER_TOTALS \
+                else by_product.setdefault(product_id, [0, 0.0, 0])
+            target[0] += quantity
+            target[1] += revenue
+            target[2] += order_count
+        
+        product_ids = {product_id for by_product, _ in buckets.values() for product_id in by_product}
+        names = dict(db.query(Product.id, Product.name).filter(Product.id.in_(product_ids)).all()) if product_ids else {}
+        
+        report_buckets = []
+        for bucket_start in sorted(buckets):
+            by_product, by_method = buckets[bucket_start]
+            report_buckets.append(SalesBucket(
+                bucket_start=bucket_start,
+                quantity=sum(totals[0] for totals in by_method.values()),
+                revenue=round(sum(totals[1] for totals in by_method.values()), 2),
+                order_count=sum(totals[2] for totals in by_method.values()),
+                products=[
+                    ProductSales(
+                        product_id=product_id,
+                        product_name=names.get(product_id),
+                        quantity=quantity,
+                        revenue=round(revenue, 2),
+                        order_count=order_count
+                    )
+                    for product_id, (quantity, revenue, order_count) in sorted(by_product.items())
+                ],
+                payment_methods=[
+                    PaymentMethodSales(
+                        payment_method=None if method == SalesRollupService.NO_PAYMENT_METHOD else PaymentMethod(method),
+                        quantity=quantity,
+                        revenue=round(revenue, 2),
+                        order_count=order_count
+                    )
+                    for method, (quantity, revenue, order_count) in sorted(by_method.items())
+                ],
+            ))
+        
+        return SalesReport(
+            start=start,
+            end=end,
+            granularity=granularity,
+            quantity=sum(bucket.quantity for bucket in report_buckets),
+            revenue=round(sum(bucket.revenue for bucket in report_buckets), 2),
+            order_count=sum(bucket.order_count for bucket in report_buckets),
+            buckets=report_buckets
+        )
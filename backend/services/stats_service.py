@@ -0,0 +1,239 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, case
+from typing import Dict, List, Optional, Tuple
+from database import upsert_insert
+from models import Order, OrderStats, OrderStatus, PaymentStatus, PaymentMethod
+from datetime import date, datetime, timezone
+
+
+class StatsService:
+    """Service maintaining the dashboard stats rollup row.
+    
+    Every order write applies its delta to the single `order_stats` row with
+    an atomic `SET col = col + :delta` UPDATE inside the caller's transaction,
+    so the dashboard reads one row instead of scanning `orders`.
+    """
+    
+    STATS_ID = 1
+    
+    OPEN_STATUSES = (OrderStatus.PENDING, OrderStatus.CONFIRMED, OrderStatus.READY)
+    
+    DIGITAL_METHODS = (
+        PaymentMethod.HUBTEL,
+        PaymentMethod.PAYSTACK,
+        PaymentMethod.MOBILE_MONEY,
+        PaymentMethod.CARD
+    )
+    
+    @staticmethod
+    def wait_time_minutes(created_at: datetime, completed_at: datetime) -> float:
+        """Minutes between order creation and completion"""
+        # PostgreSQL returns aware timestamps while completed_at is set from utcnow()
+        if created_at.tzinfo is not None:
+            created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+        if completed_at.tzinfo is not None:
+            completed_at = completed_at.astimezone(timezone.utc).replace(tzinfo=None)
+        return (completed_at - created_at).total_seconds() / 60
+    
+    @staticmethod
+    def record_order_created(db: Session, order: Order) -> None:
+        """Count a newly created order"""
+        StatsService._apply(db, {
+            OrderStats.total_orders: OrderStats.total_orders + 1,
+            OrderStats.pending_orders: OrderStats.pending_orders + (
+                1 if order.status in StatsService.OPEN_STATUSES else 0
+            ),
+        })
+    
+    @staticmethod
+    def record_status_change(db: Session, order: Order, old_status: OrderStatus) -> None:
+        """Apply an order status transition (call after the order has been updated)"""
+        StatsService.record_status_changes(db, [(order, old_status)])
+    
+    @staticmethod
+    def record_status_changes(db: Session, changes: List[Tuple[Order, OrderStatus]]) -> None:
+        """Apply several (order, old status) transitions with a single UPDATE"""
+        changes = [(order, old_status) for order, old_status in changes if order.status != old_status]
+        if not changes:
+            return
+        
+        open_delta = 0
+        completed = 0
+        revenue_by_day: Dict[date, float] = {}
+        wait_time_total = 0.0
+        wait_time_count = 0
+        for order, old_status in changes:
+            open_delta += (
+                (1 if order.status in StatsService.OPEN_STATUSES else 0)
+                - (1 if old_status in StatsService.OPEN_STATUSES else 0)
+            )
+            # The state machine never leaves COMPLETED, so only entering it is counted
+            if order.status == OrderStatus.COMPLETED:
+                completed += 1
+                day = order.completed_at.date()
+                revenue_by_day[day] = revenue_by_day.get(day, 0.0) + order.total_amount
+                if order.created_at:
+                    wait_time_total += StatsService.wait_time_minutes(order.created_at, order.completed_at)
+                    wait_time_count += 1
+        
+        values = {OrderStats.pending_orders: OrderStats.pending_orders + open_delta}
+        
+        if completed:
+            today = max(revenue_by_day)
+            values.update({
+                OrderStats.completed_orders: OrderStats.completed_orders + completed,
+                OrderStats.total_revenue: OrderStats.total_revenue + sum(revenue_by_day.values()),
+                OrderStats.today_revenue: case(
+                    (OrderStats.revenue_date == today, OrderStats.today_revenue + revenue_by_day[today]),
+                    else_=revenue_by_day[today]
+                ),
+                OrderStats.revenue_date: today,
+            })
+        if wait_time_count:
+            values.update({
+                OrderStats.wait_time_total: OrderStats.wait_time_total + wait_time_total,
+                OrderStats.wait_time_count: OrderStats.wait_time_count + wait_time_count,
+            })
+        
+        StatsService._apply(db, values)
+    
+    @staticmethod
+    def record_payment_change(db: Session, order: Order, old_payment_status: PaymentStatus) -> None:
+        """Apply a payment status change (call after the order has been updated)"""
+        StatsService.record_payment_changes(db, [(order, old_payment_status)])
+    
+    @staticmethod
+    def record_payment_changes(db: Session, changes: List[Tuple[Order, PaymentStatus]]) -> None:
+        """Apply several (order, old payment status) changes with a single UPDATE"""
+        paid_delta = 0
+        digital_paid_delta = 0
+        for order, old_payment_status in changes:
+            delta = (
+                (1 if order.payment_status == PaymentStatus.COMPLETED else 0)
+                - (1 if old_payment_status == PaymentStatus.COMPLETED else 0)
+            )
+            paid_delta += delta
+            if order.payment_method in StatsService.DIGITAL_METHODS:
+                digital_paid_delta += delta
+        
+        if not paid_delta and not digital_paid_delta:
+            return
+        
+        values = {OrderStats.paid_orders: OrderStats.paid_orders + paid_delta}
+        if digital_paid_delta:
+            values[OrderStats.digital_paid_orders] = OrderStats.digital_paid_orders + digital_paid_delta
+        
+        StatsService._apply(db, values)
+    
+    @staticmethod
+    def _apply(db: Session, values: dict) -> None:
+        """Atomically apply column deltas to the stats row"""
+        updated = db.query(OrderStats).filter(
+            OrderStats.id == StatsService.STATS_ID
+        ).update(values, synchronize_session=False)
+        
+        if not updated and not StatsService._seed(db, StatsService._totals(db)):
+            # A concurrent transaction created the row first: apply the delta to it
+            db.query(OrderStats).filter(
+                OrderStats.id == StatsService.STATS_ID
+            ).update(values, synchronize_session=False)
+    
+    @staticmethod
+    def _seed(db: Session, totals: Dict) -> bool:
+        """Create the stats row with `totals` (see _totals) unless it exists.
+        
+        Uses INSERT ... ON CONFLICT DO NOTHING, so concurrent first writes
+        don't fail; returns False if another transaction created it first.
+        """
+        stmt = upsert_insert(db)(OrderStats).values(id=StatsService.STATS_ID, **totals)
+        stmt = stmt.on_conflict_do_nothing(index_elements=[OrderStats.id]).returning(OrderStats.id)
+        return db.execute(stmt).first() is not None
+    
+    @staticmethod
+    def get(db: Session) -> OrderStats:
+        """Return the stats row, building it on first use"""
+        stats = db.query(OrderStats).filter(OrderStats.id == StatsService.STATS_ID).first()
+        if stats is None:
+            StatsService._seed(db, StatsService._totals(db))
+            db.commit()
+            stats = db.query(OrderStats).filter(OrderStats.id == StatsService.STATS_ID).one()
+        return stats
+    
+    @staticmethod
+    def today_revenue(stats: OrderStats) -> float:
+        """Revenue completed today (UTC), or 0 if nothing has completed yet today"""
+        if stats.revenue_date != datetime.utcnow().date():
+            return 0.0
+        return stats.today_revenue
+    
+    @staticmethod
+    def average_wait_time(stats: OrderStats) -> Optional[float]:
+        """Average minutes from order creation to completion"""
+        if not stats.wait_time_count:
+            return None
+        return stats.wait_time_total / stats.wait_time_count
+    
+    @staticmethod
+    def rebuild(db: Session) -> OrderStats:
+        """Recompute the stats row from scratch within the caller's transaction"""
+        totals = StatsService._totals(db)
+        if not StatsService._seed(db, totals):
+            db.query(OrderStats).filter(
+                OrderStats.id == StatsService.STATS_ID
+            ).update(totals, synchronize_session=False)
+        
+        return db.query(OrderStats).filter(OrderStats.id == StatsService.STATS_ID).populate_existing().one()
+    
+    @staticmethod
+    def _totals(db: Session) -> Dict:
+        """Every stats column computed from the orders table (including pending changes), as {column: value}"""
+        db.flush()
+        
+        completed = Order.status == OrderStatus.COMPLETED
+        paid = Order.payment_status == PaymentStatus.COMPLETED
+        today = datetime.utcnow().date()
+        today_start = datetime.combine(today, datetime.min.time())
+        
+        (
+            total_orders,
+            pending_orders,
+            completed_orders,
+            total_revenue,
+            today_revenue,
+            paid_orders,
+            digital_paid_orders,
+        ) = db.query(
+            func.count(Order.id),
+            func.sum(case((Order.status.in_(StatsService.OPEN_STATUSES), 1), else_=0)),
+            func.sum(case((completed, 1), else_=0)),
+            func.sum(case((completed, Order.total_amount), else_=0.0)),
+            func.sum(case((completed & (Order.completed_at >= today_start), Order.total_amount), else_=0.0)),
+            func.sum(case((paid, 1), else_=0)),
+            func.sum(case((paid & Order.payment_method.in_(StatsService.DIGITAL_METHODS), 1), else_=0)),
+        ).one()
+        
+        # Timestamp arithmetic differs per dialect, so sum wait times in Python,
+        # streaming only the two columns needed
+        wait_time_total = 0.0
+        wait_time_count = 0
+        timestamps = db.query(Order.created_at, Order.completed_at).filter(
+            completed,
+            Order.created_at.isnot(None),
+            Order.completed_at.isnot(None)
+        ).yield_per(1000)
+        for created_at, completed_at in timestamps:
+            wait_time_total += StatsService.wait_time_minutes(created_at, completed_at)
+            wait_time_count += 1
+        
+        return {
+            "total_orders": total_orders or 0,
+            "pending_orders": pending_orders or 0,
+            "completed_orders": completed_orders or 0,
+            "total_revenue": float(total_revenue or 0.0),
+            "today_revenue": float(today_revenue or 0.0),
+            "revenue_date": today,
+            "wait_time_total": wait_time_total,
+            "wait_time_count": wait_time_count,
+            "paid_orders": paid_orders or 0,
+            "digital_paid_orders": digital_paid_orders or 0,
+        }
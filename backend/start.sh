@@ -6,6 +6,9 @@
 
 set -e  # Exit immediately if any command fails
 
+echo "==> Applying database migrations..."
+alembic upgrade head
+
 echo "==> Creating database tables and seeding (admin user + sample products)..."
 python init_db.py
 